@@ -1,29 +1,133 @@
 import os
 import sys
-import subprocess
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-def process_memreports(input_directory):
+from CompressedIO import COMPRESSIONS, compression_suffix, split_compression
+from MemReportManifest import MemReportManifest, file_signature
+from MemReportPipeline import HierarchyStage, StatsStage, TextureCsvStage, run_pipeline
+
+# Bump whenever a change alters the generated outputs, so incremental runs rebuild everything
+TOOL_VERSION = '2'
+
+DEFAULT_MANIFEST_NAME = '.memreports.manifest.json'
+
+def find_memreports(input_directory):
+    # Walk the directory tree, including subdirectories
+    for dirpath, dirnames, filenames in os.walk(input_directory):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            file_path = os.path.join(dirpath, filename)
+            if split_compression(filename)[0].lower().endswith(MEMREPORT_SUFFIX):
+                yield file_path
+            elif filename == DEFAULT_MANIFEST_NAME:
+                continue
+            else:
+                print(f"Skipping '{file_path}' (not a .memreport file).")
+
+MEMREPORT_SUFFIX = '.memreport'
+
+def output_paths(file_path, compression=None):
+    """Return the (stats CSV, texture CSV, hierarchy) paths generated for a memreport.
+
+    All three replace the report's .memreport extension, matched in any case as
+    find_memreports() does, and any compression suffix.
+    """
+    base = split_compression(file_path)[0]
+    if not base.lower().endswith(MEMREPORT_SUFFIX):
+        raise ValueError(f"'{file_path}' does not have a .memreport extension")
+    stem = base[:-len(MEMREPORT_SUFFIX)]
+    suffix = compression_suffix(compression)
+    return stem + '.stats.csv' + suffix, stem + '.csv' + suffix, stem + '.hierarchy' + suffix
+
+def convert_memreport(file_path, compression=None):
+    """Produce the stats, texture and hierarchy outputs for one memreport in-process.
+
+    The report, which may itself be compressed, is read once: parsed rows go straight to
+    the stats, texture CSV and hierarchy stages without re-reading the texture CSV. With
+    compression set, every output is written compressed.
+    """
+    output_csv_path, texture_file, hierarchy_file = output_paths(file_path, compression)
+    run_pipeline(file_path, [StatsStage(output_csv_path), TextureCsvStage(texture_file), HierarchyStage(hierarchy_file)])
+
+def _convert_task(file_path, with_signature=False, compression=None):
+    # Runs in a worker process; failures are reported back instead of raised
+    try:
+        # Take the signature first so a report modified mid-conversion is rebuilt next time
+        signature = file_signature(file_path) if with_signature else None
+        convert_memreport(file_path, compression)
+        return file_path, None, signature
+    except Exception as e:
+        return file_path, f"{type(e).__name__}: {e}", None
+
+def process_memreports(input_directory, workers=None, manifest_path=None, compression=None):
+    """Convert every .memreport under input_directory and return the list of (file, error) failures.
+
+    When manifest_path is given, reports whose content and outputs are unchanged since
+    the run that wrote the manifest are skipped, and the manifest is updated afterwards.
+    """
     # Ensure the directory exists
     if not os.path.isdir(input_directory):
         print(f"Error: The directory '{input_directory}' does not exist.")
         sys.exit(1)
-    
-    # Iterate over all files in the directory
-    for filename in os.listdir(input_directory):
-        file_path = os.path.join(input_directory, filename)
-        # Check if it's a file and has the .memreport extension
-        if os.path.isfile(file_path) and filename.lower().endswith('.memreport'):
-            print(f"Processing '{filename}'...")
-            # Execute MemReportToStats.py on the file
-            subprocess.run(['python', 'MemReportToStats.py', file_path])
-            subprocess.run(['python', 'MemReportToTextures.py', file_path])
-            subprocess.run(['python', 'MakeFileHierarchy.py', file_path.replace('.memreport', '.csv'), file_path.replace('.memreport', '.hierarchy')])
+
+    manifest = MemReportManifest(manifest_path, TOOL_VERSION) if manifest_path else None
+    failures = []
+
+    def report(file_path, error, signature):
+        if error:
+            print(f"Failed '{file_path}': {error}")
+            failures.append((file_path, error))
+            if manifest:
+                manifest.forget(file_path)
+        elif manifest:
+            manifest.record(file_path, output_paths(file_path, compression), signature)
+
+    file_paths = []
+    skipped = 0
+    for file_path in find_memreports(input_directory):
+        # A report that cannot even be checked fails alone, like one that fails to convert
+        try:
+            up_to_date = manifest is not None and manifest.is_up_to_date(file_path, output_paths(file_path, compression))
+        except Exception as e:
+            report(file_path, f"{type(e).__name__}: {e}", None)
+            continue
+        if up_to_date:
+            skipped += 1
         else:
-            print(f"Skipping '{filename}' (not a .memreport file).")
+            file_paths.append(file_path)
+
+    if workers == 1:
+        for file_path in file_paths:
+            print(f"Processing '{file_path}'...")
+            report(*_convert_task(file_path, manifest is not None, compression))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = []
+            for file_path in file_paths:
+                print(f"Processing '{file_path}'...")
+                futures.append(executor.submit(_convert_task, file_path, manifest is not None, compression))
+            for future in as_completed(futures):
+                report(*future.result())
+
+    if manifest:
+        manifest.save()
+        print(f"Skipped {skipped} unchanged memreport(s).")
+    print(f"Processed {len(file_paths)} memreport(s), {len(failures)} failed.")
+    return failures
 
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print("Usage: python process_memreports.py <input_directory>")
+    parser = argparse.ArgumentParser(description="Convert every .memreport in a directory tree to stats, texture and hierarchy files.")
+    parser.add_argument("input_directory", type=str, help="Directory searched recursively for .memreport files (plain or .gz/.bz2/.xz)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Number of worker processes (default: one per CPU)")
+    parser.add_argument("--incremental", action="store_true", help="Only rebuild outputs whose memreport changed or whose outputs are missing")
+    parser.add_argument("--manifest", type=str, default=None, help=f"Manifest file used by --incremental (default: <input_directory>/{DEFAULT_MANIFEST_NAME})")
+    parser.add_argument("--compress", choices=COMPRESSIONS, default=None, help="Write every output compressed with this format")
+
+    args = parser.parse_args()
+    manifest_path = None
+    if args.incremental or args.manifest:
+        manifest_path = args.manifest or os.path.join(args.input_directory, DEFAULT_MANIFEST_NAME)
+    failures = process_memreports(args.input_directory, workers=args.workers, manifest_path=manifest_path, compression=args.compress)
+    if failures:
         sys.exit(1)
-    input_directory = sys.argv[1]
-    process_memreports(input_directory)
@@ -0,0 +1,293 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+
+from Profiling import peak_rss_mb
+from SyntheticReports import GENERATOR_VERSION, format_size, generate_memreport, generate_objrefs_log, parse_size
+
+DEFAULT_SIZES = ('10MB', '100MB', '1GB')
+DEFAULT_WORK_DIR = os.path.join('.', '.benchmark-inputs')
+RESULTS_VERSION = 2
+
+# Each case times one script's core function. It gets the prepared input paths and a
+# scratch directory, and the input named in CASES is the one its throughput is measured on.
+
+def bench_parse_memreport(inputs, scratch_dir):
+    import MemReportToStats
+    MemReportToStats.parse_memreport(_scratch_copy(inputs['memreport'], scratch_dir))
+
+def bench_extract_texture_report(inputs, scratch_dir):
+    import MemReportToTextures
+    MemReportToTextures.extract_texture_report(_scratch_copy(inputs['memreport'], scratch_dir))
+
+def bench_convert_memreport(inputs, scratch_dir):
+    import AllMemReportsToCSVs
+    AllMemReportsToCSVs.convert_memreport(_scratch_copy(inputs['memreport'], scratch_dir))
+
+def bench_build_hierarchy(inputs, scratch_dir):
+    import MakeFileHierarchy
+    MakeFileHierarchy.main(inputs['textures_csv'], os.path.join(scratch_dir, 'out.hierarchy'))
+
+def bench_hierarchy_total(inputs, scratch_dir):
+    import HierarchyTotalSizeKB
+    HierarchyTotalSizeKB.main(inputs['hierarchy'])
+
+def bench_hierarchy_total_stream(inputs, scratch_dir):
+    import HierarchyTotalSizeKB
+    HierarchyTotalSizeKB.main_stream(inputs['hierarchy'])
+
+def bench_filter_common(inputs, scratch_dir):
+    import FilterCommonTextures
+    FilterCommonTextures.main(inputs['textures_csv'], inputs['textures_csv_2'], os.path.join(scratch_dir, 'common.csv'))
+
+def bench_filter_different(inputs, scratch_dir):
+    import FilterDifferentTextures
+    FilterDifferentTextures.main(inputs['textures_csv'], inputs['textures_csv_2'], os.path.join(scratch_dir, 'different.csv'))
+
+def bench_filter_usability(inputs, scratch_dir):
+    import FilterUsability
+    FilterUsability.main(inputs['textures_csv'], inputs['assets'],
+                         os.path.join(scratch_dir, 'used.csv'), os.path.join(scratch_dir, 'unused.csv'))
+
+def bench_delta_stats(inputs, scratch_dir):
+    import DeltaMemStats
+    stats1 = DeltaMemStats.read_stats(inputs['stats_csv'])
+    stats2 = DeltaMemStats.read_stats(inputs['stats_csv_2'])
+    DeltaMemStats.write_deltas(DeltaMemStats.calculate_deltas(stats1, stats2), os.path.join(scratch_dir, 'delta.csv'))
+
+def bench_diff_textures(inputs, scratch_dir):
+    import DiffTextures
+    DiffTextures.diff_textures(inputs['textures_csv'], inputs['textures_csv_2'], os.path.join(scratch_dir, 'diff.csv'))
+
+def bench_texture_budget(inputs, scratch_dir):
+    import TextureBudget
+    scenarios = [TextureBudget.parse_scenario(f'drop-mips:*:{mips}') for mips in range(1, 4)]
+    scenarios.append(TextureBudget.parse_scenario('drop-mips:*:1+drop-mips:*:1+force-streaming:*+drop-mips:*:2'))
+    TextureBudget.main(inputs['textures_csv'], os.path.join(scratch_dir, 'budget.csv'), scenarios=scenarios)
+
+def bench_fleet_stats(inputs, scratch_dir):
+    import FleetStats
+    fleet = FleetStats.aggregate([inputs['memreport'], inputs['memreport_2']])
+    FleetStats.write_summary(fleet, os.path.join(scratch_dir, 'fleet.csv'), top=0)
+
+def bench_parse_objrefs(inputs, scratch_dir):
+    import ParseObjRefs
+    parser = ParseObjRefs.parse_log(inputs['objrefs_log'])
+    ParseObjRefs.write_graph(parser.graph, os.path.join(scratch_dir, 'objrefs.json'))
+
+def bench_parse_objrefs_parallel(inputs, scratch_dir):
+    import ParseObjRefs
+    parser = ParseObjRefs.parse_log(inputs['objrefs_log'], workers=os.cpu_count() or 1)
+    ParseObjRefs.write_graph(parser.graph, os.path.join(scratch_dir, 'objrefs.json'))
+
+def bench_objrefs_query(inputs, scratch_dir):
+    import ObjRefsQuery
+    ObjRefsQuery.load_index(inputs['objrefs_log']).most_referenced(20)
+
+def bench_objlist_summary(inputs, scratch_dir):
+    import MemReportObjList
+    MemReportObjList.summarize(inputs['memreport'], os.path.join(scratch_dir, 'objlist.csv'))
+
+def bench_memreport_db(inputs, scratch_dir):
+    import MemReportDB
+    connection = MemReportDB.connect(os.path.join(scratch_dir, 'snapshots.db'))
+    try:
+        MemReportDB.ingest_memreport(connection, inputs['memreport'])
+    finally:
+        connection.close()
+
+# name -> (function, input whose size the throughput is measured against)
+CASES = {
+    'parse_memreport': (bench_parse_memreport, 'memreport'),
+    'extract_texture_report': (bench_extract_texture_report, 'memreport'),
+    'convert_memreport': (bench_convert_memreport, 'memreport'),
+    'build_hierarchy': (bench_build_hierarchy, 'textures_csv'),
+    'hierarchy_total': (bench_hierarchy_total, 'hierarchy'),
+    'hierarchy_total_stream': (bench_hierarchy_total_stream, 'hierarchy'),
+    'filter_common': (bench_filter_common, 'textures_csv'),
+    'filter_different': (bench_filter_different, 'textures_csv'),
+    'filter_usability': (bench_filter_usability, 'textures_csv'),
+    'delta_stats': (bench_delta_stats, 'stats_csv'),
+    'diff_textures': (bench_diff_textures, 'textures_csv'),
+    'texture_budget': (bench_texture_budget, 'textures_csv'),
+    'fleet_stats': (bench_fleet_stats, 'memreport'),
+    'parse_objrefs': (bench_parse_objrefs, 'objrefs_log'),
+    'parse_objrefs_parallel': (bench_parse_objrefs_parallel, 'objrefs_log'),
+    'objrefs_query': (bench_objrefs_query, 'objrefs_log'),
+    'objlist_summary': (bench_objlist_summary, 'memreport'),
+    'memreport_db': (bench_memreport_db, 'memreport'),
+}
+
+def _scratch_copy(file_path, scratch_dir):
+    # Scripts that write next to their input get a private copy, leaving the shared inputs alone
+    copy_path = os.path.join(scratch_dir, os.path.basename(file_path))
+    if not os.path.exists(copy_path):
+        shutil.copyfile(file_path, copy_path)
+    return copy_path
+
+def _write_asset_list(textures_csv, assets_path, exact_every=50):
+    # A usability list mixing exact asset paths with a few whole-directory rules
+    directories = set()
+    with open(textures_csv, 'r') as csvfile, open(assets_path, 'w') as assets:
+        next(csvfile)
+        for line_number, line in enumerate(csvfile):
+            path = line.split(',')[9]
+            if line_number % exact_every == 0:
+                assets.write(path.rsplit('.', 1)[0] + '\n')
+            directories.add(path.rsplit('/', 1)[0])
+        for directory in sorted(directories)[::25]:
+            assets.write(directory + '/*\n')
+
+def prepare_inputs(size, work_dir, seed=0):
+    """Generate (or reuse) every input the cases need at one size, and return their paths.
+
+    Derived inputs (texture CSVs, stats CSVs, hierarchy, asset list) are produced with the
+    current scripts but are never part of a timed run.
+    """
+    # Inputs of another generator version are regenerated rather than reused
+    size_dir = os.path.join(work_dir, f"{format_size(size)}-seed{seed}-v{GENERATOR_VERSION}")
+    os.makedirs(size_dir, exist_ok=True)
+    inputs = {
+        'memreport': os.path.join(size_dir, 'a.memreport'),
+        'memreport_2': os.path.join(size_dir, 'b.memreport'),
+        'textures_csv': os.path.join(size_dir, 'a.csv'),
+        'textures_csv_2': os.path.join(size_dir, 'b.csv'),
+        'stats_csv': os.path.join(size_dir, 'a.stats.csv'),
+        'stats_csv_2': os.path.join(size_dir, 'b.stats.csv'),
+        'hierarchy': os.path.join(size_dir, 'a.hierarchy'),
+        'assets': os.path.join(size_dir, 'assets.txt'),
+        'objrefs_log': os.path.join(size_dir, 'objrefs.log'),
+    }
+    if all(os.path.exists(path) for path in inputs.values()):
+        return inputs
+
+    import MakeFileHierarchy
+    import MemReportToStats
+    import MemReportToTextures
+
+    print(f"Generating {format_size(size)} inputs in {size_dir}")
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        generate_memreport(inputs['memreport'], size, seed)
+        generate_memreport(inputs['memreport_2'], size, seed + 1)
+        generate_objrefs_log(inputs['objrefs_log'], size, seed)
+        for memreport in (inputs['memreport'], inputs['memreport_2']):
+            MemReportToTextures.extract_texture_report(memreport)
+            MemReportToStats.parse_memreport(memreport)
+        MakeFileHierarchy.main(inputs['textures_csv'], inputs['hierarchy'])
+        _write_asset_list(inputs['textures_csv'], inputs['assets'])
+    return inputs
+
+def run_case(case_name, inputs, scratch_dir):
+    """Run one case and return its wall time and peak RSS. Meant to run in a fresh child process."""
+    function, _ = CASES[case_name]
+    baseline_rss_mb = peak_rss_mb()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        function(inputs, scratch_dir)
+        seconds = time.perf_counter() - start
+    return {'seconds': seconds, 'peak_rss_mb': peak_rss_mb(), 'baseline_rss_mb': baseline_rss_mb}
+
+def run_case_in_child(case_name, inputs, scratch_dir):
+    # A spawned process per run, so peak RSS belongs to this case alone
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return pool.submit(run_case, case_name, inputs, scratch_dir).result()
+
+def run_benchmarks(sizes, case_names, work_dir, seed=0, repeat=1):
+    results = []
+    for size in sizes:
+        inputs = prepare_inputs(size, work_dir, seed)
+        for case_name in case_names:
+            _, input_key = CASES[case_name]
+            input_bytes = os.path.getsize(inputs[input_key])
+            runs = []
+            for _ in range(repeat):
+                scratch_dir = os.path.join(work_dir, 'scratch')
+                shutil.rmtree(scratch_dir, ignore_errors=True)
+                os.makedirs(scratch_dir)
+                runs.append(run_case_in_child(case_name, inputs, scratch_dir))
+            shutil.rmtree(os.path.join(work_dir, 'scratch'), ignore_errors=True)
+
+            best = min(runs, key=lambda run: run['seconds'])
+            result = {
+                'case': case_name,
+                'size': format_size(size),
+                'input': input_key,
+                'input_bytes': input_bytes,
+                'seconds': round(best['seconds'], 4),
+                'mb_per_second': round(input_bytes / (1024 * 1024) / best['seconds'], 2) if best['seconds'] else None,
+                'peak_rss_mb': round(max(run['peak_rss_mb'] for run in runs), 1),
+                'baseline_rss_mb': round(best['baseline_rss_mb'], 1),
+                'runs': [round(run['seconds'], 4) for run in runs],
+            }
+            results.append(result)
+            print(f"{case_name:<24} {result['size']:>6} {result['seconds']:>10.3f} s {result['mb_per_second'] or 0:>10.2f} MB/s "
+                  f"{result['peak_rss_mb']:>10.1f} MB peak")
+    return results
+
+def write_results(results, output_path, seed):
+    document = {
+        'version': RESULTS_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'generator_version': GENERATOR_VERSION,
+        'results': results,
+    }
+    with open(output_path, 'w') as outfile:
+        json.dump(document, outfile, indent=4)
+    print(f"Benchmark results written to {output_path}")
+
+def compare_results(baseline_path, results):
+    """Print the time and peak memory ratio of each result against a previous results file.
+
+    Results measured on inputs of another generator version are not compared.
+    """
+    with open(baseline_path, 'r') as infile:
+        document = json.load(infile)
+    # Version 1 results predate the generator version, and were made with generator version 1
+    baseline_generator = document.get('generator_version', 1)
+    if baseline_generator != GENERATOR_VERSION:
+        print(f"Not compared with {baseline_path}: its inputs came from synthetic generator version {baseline_generator}, "
+              f"these from version {GENERATOR_VERSION}")
+        return
+    baseline = {(result['case'], result['size']): result for result in document['results']}
+    print(f"Compared with {baseline_path} (ratio < 1 is better):")
+    for result in results:
+        previous = baseline.get((result['case'], result['size']))
+        if previous is None:
+            continue
+        time_ratio = result['seconds'] / previous['seconds'] if previous['seconds'] else float('inf')
+        rss_ratio = result['peak_rss_mb'] / previous['peak_rss_mb'] if previous['peak_rss_mb'] else float('inf')
+        print(f"{result['case']:<24} {result['size']:>6} time x{time_ratio:.2f} ({previous['seconds']:.3f} -> {result['seconds']:.3f} s), "
+              f"peak RSS x{rss_ratio:.2f} ({previous['peak_rss_mb']:.1f} -> {result['peak_rss_mb']:.1f} MB)")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Time each tool's core function on synthetic inputs and record throughput and peak memory.")
+    parser.add_argument("--sizes", nargs="+", default=list(DEFAULT_SIZES), help="Input sizes (default: 10MB 100MB 1GB)")
+    parser.add_argument("--cases", nargs="+", choices=sorted(CASES), default=list(CASES), help="Cases to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case; the fastest is reported")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic inputs")
+    parser.add_argument("--work-dir", type=str, default=DEFAULT_WORK_DIR, help="Where generated inputs are kept between runs")
+    parser.add_argument("--output", type=str, default='benchmark-results.json', help="JSON results file")
+    parser.add_argument("--compare", type=str, default=None, help="Previous results file to compare against")
+
+    args = parser.parse_args()
+    try:
+        sizes = [parse_size(size) for size in args.sizes]
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    results = run_benchmarks(sizes, args.cases, args.work_dir, args.seed, args.repeat)
+    write_results(results, args.output, args.seed)
+    if args.compare:
+        compare_results(args.compare, results)
@@ -0,0 +1,36 @@
+import bz2
+import gzip
+import lzma
+
+# Compression is chosen by file extension; anything else is plain text
+COMPRESSION_SUFFIXES = ('.gz', '.bz2', '.xz')
+COMPRESSIONS = ('gz', 'bz2', 'xz')
+
+# gzip's default level 9 costs several times level 6 for a few percent on these files
+GZIP_LEVEL = 6
+
+def split_compression(path):
+    """Return (path without its compression suffix, suffix), e.g. ('a.memreport', '.gz')."""
+    lower = path.lower()
+    for suffix in COMPRESSION_SUFFIXES:
+        if lower.endswith(suffix):
+            return path[:-len(suffix)], path[-len(suffix):]
+    return path, ''
+
+def compression_suffix(compression):
+    """Map a --compress choice ('gz', 'bz2', 'xz', or None) to the extension to append."""
+    return '.' + compression if compression else ''
+
+def open_text(path, mode='r', newline=None, encoding=None):
+    """open() for text files that transparently (de)compresses .gz, .bz2 and .xz paths."""
+    _, suffix = split_compression(path)
+    if not suffix:
+        return open(path, mode, newline=newline, encoding=encoding)
+    text_mode = mode if 't' in mode else mode + 't'
+    if suffix == '.gz':
+        if 'r' in mode:
+            return gzip.open(path, text_mode, newline=newline, encoding=encoding)
+        return gzip.open(path, text_mode, compresslevel=GZIP_LEVEL, newline=newline, encoding=encoding)
+    if suffix == '.bz2':
+        return bz2.open(path, text_mode, newline=newline, encoding=encoding)
+    return lzma.open(path, text_mode, newline=newline, encoding=encoding)
@@ -1,10 +1,15 @@
 import csv
 import sys
 import os
+from array import array
+
+from CompressedIO import open_text, split_compression
+
+NO_STAT = (0.0, '', '', '')
 
 def read_stats(file_path):
     stats = {}
-    with open(file_path, 'r') as csvfile:
+    with open_text(file_path, 'r') as csvfile:
         csvreader = csv.reader(csvfile)
         next(csvreader)  # Skip the header
         for row in csvreader:
@@ -20,27 +25,146 @@ def calculate_deltas(stats1, stats2):
     delta_stats = []
     all_stats = set(stats1.keys()).union(stats2.keys())
     for stat in all_stats:
-        usage1 = stats1.get(stat, (0.0, '', '', ''))[0]
-        usage2 = stats2.get(stat, (0.0, '', '', ''))[0]
+        usage1, group1, category1, description1 = stats1.get(stat, NO_STAT)
+        usage2, group2, category2, description2 = stats2.get(stat, NO_STAT)
         delta = usage2 - usage1
-        stat_group = stats1.get(stat, ('', '', '', ''))[1] or stats2.get(stat, ('', '', '', ''))[1]
-        stat_category = stats1.get(stat, ('', '', '', ''))[2] or stats2.get(stat, ('', '', '', ''))[2]
-        description = stats1.get(stat, ('', '', '', ''))[3] or stats2.get(stat, ('', '', '', ''))[3]
-        delta_stats.append((delta, stat, stat_group, stat_category, description))
+        delta_stats.append((delta, stat, group1 or group2, category1 or category2, description1 or description2))
     # Sort delta stats by the delta memory usage (high to low)
     delta_stats.sort(key=lambda x: float(x[0]), reverse=True)
     return delta_stats
 
 def write_deltas(delta_stats, output_file_path):
-    with open(output_file_path, 'w', newline='') as csvfile:
+    with open_text(output_file_path, 'w', newline='') as csvfile:
         csvwriter = csv.writer(csvfile)
         csvwriter.writerow(['Delta Memory Usage (MB)', 'Stat Name', 'STAT Group', 'STAT Category', 'Description'])
         csvwriter.writerows(delta_stats)
     print(f"Delta memory usage stats have been written to {output_file_path}.")
 
+def snapshot_label(file_path):
+    name = os.path.basename(split_compression(file_path)[0])
+    return name[:-len('.stats.csv')] if name.lower().endswith('.stats.csv') else os.path.splitext(name)[0]
+
+class StatsTimeline:
+    """Stat x snapshot matrix built from N .stats.csv files.
+
+    Stats are aligned by name; a stat missing from a snapshot counts as 0 MB, as in
+    calculate_deltas. Each snapshot is one array('d') column indexed by stat row.
+    """
+
+    def __init__(self):
+        self.labels = []
+        self.stat_names = []
+        self.stat_info = []  # [group, category, description], first non-empty value wins
+        self._stat_rows = {}
+        self.columns = []
+
+    def add_snapshot(self, file_path):
+        # Single pass over the file, filling a new column as rows are read
+        column = array('d', bytes(8 * len(self.stat_names)))
+        with open_text(file_path, 'r') as csvfile:
+            csvreader = csv.reader(csvfile)
+            next(csvreader)  # Skip the header
+            for row in csvreader:
+                stat_name = row[1]
+                index = self._stat_rows.get(stat_name)
+                if index is None:
+                    index = self._stat_rows[stat_name] = len(self.stat_names)
+                    self.stat_names.append(stat_name)
+                    self.stat_info.append([row[2], row[3], row[4]])
+                    column.append(0.0)
+                else:
+                    info = self.stat_info[index]
+                    for i in range(3):
+                        info[i] = info[i] or row[2 + i]
+                column[index] = float(row[0])
+        self.labels.append(snapshot_label(file_path))
+        self.columns.append(column)
+
+    def _padded_columns(self):
+        # Stats first seen in later snapshots are absent (0 MB) from earlier columns
+        num_stats = len(self.stat_names)
+        for column in self.columns:
+            if len(column) < num_stats:
+                column.extend(array('d', bytes(8 * (num_stats - len(column)))))
+        return self.columns
+
+    def step_deltas(self):
+        """Return one delta column per consecutive pair of snapshots."""
+        columns = self._padded_columns()
+        return [array('d', map(float.__sub__, after, before)) for before, after in zip(columns, columns[1:])]
+
+    def total_deltas(self):
+        columns = self._padded_columns()
+        return array('d', map(float.__sub__, columns[-1], columns[0]))
+
+    def ranges(self):
+        """Largest minus smallest value of every stat across the snapshots."""
+        columns = self._padded_columns()
+        return array('d', (max(values) - min(values) for values in zip(*columns)))
+
+    def slopes(self):
+        """Least-squares slope of every stat over the snapshot index, in MB per snapshot."""
+        columns = self._padded_columns()
+        count = len(columns)
+        mean_x = (count - 1) / 2
+        sxx = sum((x - mean_x) ** 2 for x in range(count))
+        slopes = array('d', bytes(8 * len(self.stat_names)))
+        if sxx == 0:
+            return slopes
+        # slope = sum_x (x - mean_x) * y_x / sxx, accumulated one column at a time
+        for x, column in enumerate(columns):
+            weight = (x - mean_x) / sxx
+            slopes = array('d', (slope + weight * value for slope, value in zip(slopes, column)))
+        return slopes
+
+def build_timeline(file_paths):
+    timeline = StatsTimeline()
+    for file_path in file_paths:
+        timeline.add_snapshot(file_path)
+    return timeline
+
+def write_timeline(timeline, output_file_path, top=10):
+    step_deltas = timeline.step_deltas()
+    total_deltas = timeline.total_deltas()
+    slopes = timeline.slopes()
+    ranges = timeline.ranges()
+    columns = timeline.columns
+
+    # Biggest movers first, by range: a spike that settles back has no total delta but is a mover
+    order = sorted(range(len(timeline.stat_names)), key=lambda i: ranges[i], reverse=True)
+
+    with open_text(output_file_path, 'w', newline='') as csvfile:
+        csvwriter = csv.writer(csvfile)
+        csvwriter.writerow(
+            ['Stat Name', 'STAT Group', 'STAT Category', 'Description'] +
+            [f'{label} (MB)' for label in timeline.labels] +
+            [f'Delta {before} -> {after} (MB)' for before, after in zip(timeline.labels, timeline.labels[1:])] +
+            ['Total Delta (MB)', 'Slope (MB/snapshot)', 'Range (MB, sort order)']
+        )
+        for i in order:
+            csvwriter.writerow(
+                [timeline.stat_names[i]] + timeline.stat_info[i] +
+                [column[i] for column in columns] +
+                [deltas[i] for deltas in step_deltas] +
+                [total_deltas[i], slopes[i], ranges[i]]
+            )
+    print(f"Memory usage timeline for {len(columns)} snapshots has been written to {output_file_path}.")
+
+    print("Biggest movers by range (max - min):")
+    for i in order[:top]:
+        print(f"{ranges[i]:12.2f} MB range  {total_deltas[i]:+12.2f} MB total  {slopes[i]:+10.2f} MB/snapshot  {timeline.stat_names[i]}")
+
 if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == '--timeline':
+        if len(sys.argv) < 5:
+            print("Usage: python delta_memory_usage.py --timeline <output_file> <input_stat_file1> <input_stat_file2> [<input_stat_file3> ...]")
+            sys.exit(1)
+        write_timeline(build_timeline(sys.argv[3:]), sys.argv[2])
+        sys.exit(0)
+
     if len(sys.argv) != 4:
         print("Usage: python delta_memory_usage.py <input_stat_file1> <input_stat_file2> <output_file>")
+        print("       python delta_memory_usage.py --timeline <output_file> <input_stat_file1> <input_stat_file2> [<input_stat_file3> ...]")
         sys.exit(1)
     input_file1 = sys.argv[1]
     input_file2 = sys.argv[2]
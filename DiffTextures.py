@@ -0,0 +1,199 @@
+import os
+import csv
+import sys
+import heapq
+import argparse
+import tempfile
+from itertools import groupby
+from operator import itemgetter
+
+from CompressedIO import open_text
+
+# Fields carried through the join, in this order, for every texture
+JOIN_FIELDS = ('path', 'texgroup', 'texformat', 'memsize_kb', 'disksize_kb', 'num_mips')
+PATH, TEXGROUP, TEXFORMAT, MEMSIZE_KB, DISKSIZE_KB, NUM_MIPS = range(len(JOIN_FIELDS))
+
+# A shared texture is reported as changed when any of these differ
+CHANGE_FIELDS = (TEXFORMAT, MEMSIZE_KB, DISKSIZE_KB, NUM_MIPS)
+
+DIFF_HEADER = [
+    'status', 'path', 'texgroup', 'texformat_1', 'texformat_2',
+    'memsize_kb_1', 'memsize_kb_2', 'memsize_kb_delta',
+    'disksize_kb_1', 'disksize_kb_2', 'disksize_kb_delta',
+    'num_mips_1', 'num_mips_2', 'num_mips_delta'
+]
+MEMSIZE_DELTA = DIFF_HEADER.index('memsize_kb_delta')
+DISKSIZE_DELTA = DIFF_HEADER.index('disksize_kb_delta')
+
+DEFAULT_MEMORY_LIMIT_MB = 512
+DEFAULT_CHUNK_ROWS = 500000
+
+def read_texture_rows(file_path):
+    """Yield the JOIN_FIELDS of every row of a texture CSV, as lists of strings."""
+    with open_text(file_path, newline='') as csvfile:
+        reader = csv.reader(csvfile, delimiter=',')
+        header = next(reader, [])
+        try:
+            columns = [header.index(name) for name in JOIN_FIELDS]
+        except ValueError as e:
+            raise ValueError(f"{file_path} is not a texture CSV: {e}")
+        for row in reader:
+            yield [row[i] for i in columns]
+
+def diff_row(old, new):
+    """Return the diff row for a texture present in old, new or both (missing side is None)."""
+    def value(row, field):
+        return row[field] if row else ''
+
+    def delta(field):
+        return int(value(new, field) or 0) - int(value(old, field) or 0)
+
+    if old is None:
+        status = 'added'
+    elif new is None:
+        status = 'removed'
+    elif any(old[field] != new[field] for field in CHANGE_FIELDS):
+        status = 'changed'
+    else:
+        return None
+
+    either = new or old
+    return [
+        status, either[PATH], either[TEXGROUP], value(old, TEXFORMAT), value(new, TEXFORMAT),
+        value(old, MEMSIZE_KB), value(new, MEMSIZE_KB), delta(MEMSIZE_KB),
+        value(old, DISKSIZE_KB), value(new, DISKSIZE_KB), delta(DISKSIZE_KB),
+        value(old, NUM_MIPS), value(new, NUM_MIPS), delta(NUM_MIPS)
+    ]
+
+def impact_key(row):
+    # Largest absolute memory change first, then disk change, then path for a stable order
+    return (-abs(int(row[MEMSIZE_DELTA])), -abs(int(row[DISKSIZE_DELTA])), row[1])
+
+def diff_in_memory(old_rows, new_rows):
+    """Hash join: only the old side is held in memory, the new side is streamed once."""
+    old_by_path = {}
+    for row in old_rows:
+        # The first row for a path wins on both sides
+        old_by_path.setdefault(row[PATH], row)
+    seen = set()
+    for new in new_rows:
+        path = new[PATH]
+        if path in seen:
+            continue
+        seen.add(path)
+        row = diff_row(old_by_path.pop(path, None), new)
+        if row:
+            yield row
+    for old in old_by_path.values():
+        yield diff_row(old, None)
+
+def _write_chunk(rows, temp_dir):
+    handle, chunk_path = tempfile.mkstemp(suffix='.csv', dir=temp_dir)
+    with os.fdopen(handle, 'w', newline='') as chunk_file:
+        csv.writer(chunk_file).writerows(rows)
+    return chunk_path
+
+def _read_chunk(chunk_path):
+    with open(chunk_path, newline='') as chunk_file:
+        yield from csv.reader(chunk_file)
+
+def external_sort(rows, key, chunk_rows, temp_dir):
+    """Sort an arbitrarily long stream of CSV rows using sorted temporary chunk files.
+
+    The sort is stable: rows with equal keys keep their input order.
+    """
+    chunk_paths = []
+    try:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_rows:
+                chunk.sort(key=key)
+                chunk_paths.append(_write_chunk(chunk, temp_dir))
+                chunk = []
+        chunk.sort(key=key)
+        if not chunk_paths:
+            yield from chunk
+            return
+        chunk_paths.append(_write_chunk(chunk, temp_dir))
+        yield from heapq.merge(*(_read_chunk(chunk_path) for chunk_path in chunk_paths), key=key)
+    finally:
+        for chunk_path in chunk_paths:
+            os.remove(chunk_path)
+
+def _unique_by_path(sorted_rows):
+    # The first row for a path wins, as in the in-memory join; the sort is stable
+    for _, group in groupby(sorted_rows, key=itemgetter(PATH)):
+        yield next(group)
+
+def diff_sort_merge(old_rows, new_rows, chunk_rows, temp_dir):
+    """Sort-merge join over two streams, for inputs too large to hold in memory."""
+    by_path = itemgetter(PATH)
+    old_iter = _unique_by_path(external_sort(old_rows, by_path, chunk_rows, temp_dir))
+    new_iter = _unique_by_path(external_sort(new_rows, by_path, chunk_rows, temp_dir))
+    old = next(old_iter, None)
+    new = next(new_iter, None)
+    while old is not None or new is not None:
+        if new is None or (old is not None and old[PATH] < new[PATH]):
+            row = diff_row(old, None)
+            old = next(old_iter, None)
+        elif old is None or new[PATH] < old[PATH]:
+            row = diff_row(None, new)
+            new = next(new_iter, None)
+        else:
+            row = diff_row(old, new)
+            old = next(old_iter, None)
+            new = next(new_iter, None)
+        if row:
+            yield row
+
+def diff_textures(file1_path, file2_path, output_path, external=None,
+                  memory_limit_mb=DEFAULT_MEMORY_LIMIT_MB, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Write the added, removed and changed textures between two texture CSVs, sorted by impact.
+
+    external=None picks the sort-merge join when the first file exceeds memory_limit_mb.
+    """
+    if external is None:
+        external = os.path.getsize(file1_path) > memory_limit_mb * 1024 * 1024
+
+    old_rows = read_texture_rows(file1_path)
+    new_rows = read_texture_rows(file2_path)
+    counts = {'added': 0, 'removed': 0, 'changed': 0}
+    total_delta_kb = 0
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if external:
+            diff_rows = external_sort(diff_sort_merge(old_rows, new_rows, chunk_rows, temp_dir), impact_key, chunk_rows, temp_dir)
+        else:
+            diff_rows = sorted(diff_in_memory(old_rows, new_rows), key=impact_key)
+
+        with open_text(output_path, mode='w', newline='') as csvfile:
+            writer = csv.writer(csvfile, delimiter=',')
+            writer.writerow(DIFF_HEADER)
+            for row in diff_rows:
+                writer.writerow(row)
+                counts[row[0]] += 1
+                total_delta_kb += int(row[MEMSIZE_DELTA])
+
+    print(f"{counts['added']} added, {counts['removed']} removed, {counts['changed']} changed textures "
+          f"({total_delta_kb:+d} KB memsize) written to {output_path}")
+    return counts
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Diff two texture CSVs by path, reporting added, removed and changed textures by size impact.")
+    parser.add_argument("file1", type=str, help="Baseline texture CSV")
+    parser.add_argument("file2", type=str, help="Texture CSV to compare against the baseline")
+    parser.add_argument("output", type=str, help="Output diff CSV")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--external", action="store_true", default=None, help="Always use the external sort-merge join")
+    mode.add_argument("--in-memory", dest="external", action="store_false", help="Always join in memory")
+    parser.add_argument("--memory-limit-mb", type=int, default=DEFAULT_MEMORY_LIMIT_MB,
+                        help=f"Switch to the external join above this baseline file size (default: {DEFAULT_MEMORY_LIMIT_MB})")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="Rows per sorted chunk in external mode")
+
+    args = parser.parse_args()
+    try:
+        diff_textures(args.file1, args.file2, args.output, args.external, args.memory_limit_mb, args.chunk_rows)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
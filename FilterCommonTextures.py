@@ -1,43 +1,37 @@
-import csv
 import sys
 
-def read_csv(file_path):
-    with open(file_path, newline='') as csvfile:
-        reader = csv.DictReader(csvfile, delimiter=',')
-        return list(reader)
+from Profiling import pop_profile_args, profile_stage, run
+from TextureTable import TextureTable
 
 def filter_common_resources(file1_data, file2_data):
-    file1_paths = {row['path'] for row in file1_data}
-    file2_paths = {row['path'] for row in file2_data}
-    common_paths = file1_paths.intersection(file2_paths)
-    
-    common_resources = [row for row in file1_data if row['path'] in common_paths]
-    return common_resources
-
-def write_csv(file_path, data, fieldnames):
-    with open(file_path, mode='w', newline='') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, delimiter=',')
-        writer.writeheader()
-        writer.writerows(data)
-
-def sort_csv(data):
-    return sorted(data, key=lambda row: row['path'])
+    # Return the indices of the file1 rows whose path also appears in file2
+    file2_paths = set(file2_data['path'])
+    return [i for i, path in enumerate(file1_data['path']) if path in file2_paths]
 
 def main(file1_path, file2_path, output_path):
-    file1_data = read_csv(file1_path)
-    file2_data = read_csv(file2_path)
+    with profile_stage('read_csv') as stage:
+        file1_data = TextureTable.read_csv(file1_path)
+        file2_data = TextureTable.read_csv(file2_path, usecols=('path',))
+        stage.items += len(file1_data) + len(file2_data)
     
-    common_resources = filter_common_resources(file1_data, file2_data)
+    with profile_stage('filter') as stage:
+        common_resources = filter_common_resources(file1_data, file2_data)
+        stage.items += len(file1_data)
     
     if common_resources:
-        sorted_common_resources = sort_csv(common_resources)
-        write_csv(output_path, sorted_common_resources, fieldnames=file1_data[0].keys())
+        with profile_stage('sort') as stage:
+            sorted_common_resources = file1_data.argsort('path', common_resources)
+            stage.items += len(sorted_common_resources)
+        with profile_stage('write_csv') as stage:
+            file1_data.write_csv(output_path, sorted_common_resources)
+            stage.items += len(sorted_common_resources)
         print(f"Common texture resources written to {output_path}")
     else:
         print("No common texture resources found.")
 
 if __name__ == '__main__':
-    if len(sys.argv) != 4:
-        print("Usage: python script.py <file1.csv> <file2.csv> <output.csv>")
+    argv, profile_path, cprofile_path = pop_profile_args(sys.argv)
+    if len(argv) != 4:
+        print("Usage: python script.py <file1.csv> <file2.csv> <output.csv> [--profile PATH] [--cprofile PATH]")
     else:
-        main(sys.argv[1], sys.argv[2], sys.argv[3])
+        run('FilterCommonTextures', main, argv[1], argv[2], argv[3], profile_path=profile_path, cprofile_path=cprofile_path)
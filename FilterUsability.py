@@ -1,14 +1,16 @@
-import csv
-import sys
+import re
 import os
+import fnmatch
+import argparse
 
-def read_csv(file_path):
-    with open(file_path, newline='') as csvfile:
-        reader = csv.DictReader(csvfile, delimiter=',')
-        return list(reader)
+from CompressedIO import open_text
+from Profiling import add_profile_arguments, profile_stage, run
+from TextureTable import TextureTable
+
+GLOB_CHARS = re.compile(r'[*?\[]')
 
 def read_asset_list(file_path):
-    with open(file_path, newline='') as csvfile:
+    with open_text(file_path, newline='') as csvfile:
         return [line.strip() for line in csvfile]
 
 def normalize_path(path):
@@ -17,57 +19,139 @@ def normalize_path(path):
         path = path[:path.rfind('.')]
     return path
 
-def filter_assets(first_file_data, second_file_assets):
+class _RuleNode:
+    __slots__ = ('children', 'is_directory', 'globs')
+
+    def __init__(self):
+        self.children = {}
+        self.is_directory = False
+        self.globs = []
+
+class AssetMatcher:
+    """Precompiled asset-list rules, matched against extension-less texture paths.
+
+    A rule is one of:
+      - an exact path, e.g. /Game/UI/T_Icon (looked up in a set),
+      - a directory, e.g. /Game/UI/* or /Game/UI/**, matching everything below it
+        (stored in a path-segment trie),
+      - any other glob, e.g. /Game/*/T_Icon_?? (compiled with fnmatch and attached to
+        the trie node of its longest literal directory prefix).
+    Matching a path walks the trie once, one dict lookup per path segment, and only
+    tries the glob rules hanging off the directories on that path.
+    """
+
+    def __init__(self, rules=()):
+        self.exact = set()
+        self.root = _RuleNode()
+        for rule in rules:
+            self.add(rule)
+
+    def _node(self, segments):
+        node = self.root
+        for segment in segments:
+            child = node.children.get(segment)
+            if child is None:
+                child = node.children[segment] = _RuleNode()
+            node = child
+        return node
+
+    def add(self, rule):
+        if not rule:
+            return
+        if not GLOB_CHARS.search(rule):
+            self.exact.add(rule)
+            return
+
+        segments = rule.split('/')
+        literal = 0
+        while not GLOB_CHARS.search(segments[literal]):
+            literal += 1
+        # A bare '*' or '**' has no directory to stand for; as a glob it matches every path
+        if 0 < literal == len(segments) - 1 and segments[literal] in ('*', '**'):
+            self._node(segments[:literal]).is_directory = True
+        else:
+            self._node(segments[:literal]).globs.append(re.compile(fnmatch.translate(rule)))
+
+    def matches(self, path):
+        if path in self.exact:
+            return True
+        segments = path.split('/')
+        node = self.root
+        for depth, segment in enumerate(segments):
+            for glob in node.globs:
+                if glob.match(path):
+                    return True
+            node = node.children.get(segment)
+            if node is None:
+                return False
+            # A directory rule covers anything strictly below the directory
+            if node.is_directory and depth < len(segments) - 1:
+                return True
+        return any(glob.match(path) for glob in node.globs)
+
+def filter_assets(first_file_data, second_file_assets, verbose=False):
     assets_in_both = []
     assets_in_first_not_in_second = []
 
-    second_file_assets_set = set(second_file_assets)
+    matcher = AssetMatcher(second_file_assets)
 
-    for row in second_file_assets_set:
-        print(row)
+    if verbose:
+        for row in second_file_assets:
+            print(row)
 
-    for row in first_file_data:
-        path = row['path']
+    # Collect row indices rather than rows
+    for index, path in enumerate(first_file_data['path']):
         path = normalize_path(path)
-        print(path) 
-        if path in second_file_assets_set:
-            assets_in_both.append(row)
+        if verbose:
+            print(path)
+        if matcher.matches(path):
+            assets_in_both.append(index)
         else:
-            assets_in_first_not_in_second.append(row)
+            assets_in_first_not_in_second.append(index)
 
     return assets_in_both, assets_in_first_not_in_second
 
-def write_csv(file_path, data, fieldnames):
-    with open(file_path, mode='w', newline='') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, delimiter=',')
-        writer.writeheader()
-        writer.writerows(data)
-
-def sort_csv(data):
-    return sorted(data, key=lambda row: row['path'])
+def main(first_file_path, second_file_path, output_file_path_1, output_file_path_2, verbose=False):
+    with profile_stage('read_csv') as stage:
+        first_file_data = TextureTable.read_csv(first_file_path)
+        second_file_assets = read_asset_list(second_file_path)
+        stage.items += len(first_file_data) + len(second_file_assets)
 
-def main(first_file_path, second_file_path, output_file_path_1, output_file_path_2):
-    first_file_data = read_csv(first_file_path)
-    second_file_assets = read_asset_list(second_file_path)
-
-    assets_in_both, assets_in_first_not_in_second = filter_assets(first_file_data, second_file_assets)
+    with profile_stage('filter') as stage:
+        assets_in_both, assets_in_first_not_in_second = filter_assets(first_file_data, second_file_assets, verbose)
+        stage.items += len(first_file_data)
     
     if assets_in_both:
-        sorted_assets_in_both = sort_csv(assets_in_both)
-        write_csv(output_file_path_1, sorted_assets_in_both, fieldnames=first_file_data[0].keys())
+        with profile_stage('sort') as stage:
+            sorted_assets_in_both = first_file_data.argsort('path', assets_in_both)
+            stage.items += len(sorted_assets_in_both)
+        with profile_stage('write_csv') as stage:
+            first_file_data.write_csv(output_file_path_1, sorted_assets_in_both)
+            stage.items += len(sorted_assets_in_both)
         print(f"Assets existing in both files written to {output_file_path_1}")
     else:
         print("No assets found in both files.")
 
     if assets_in_first_not_in_second:
-        sorted_assets_in_first_not_in_second = sort_csv(assets_in_first_not_in_second)
-        write_csv(output_file_path_2, sorted_assets_in_first_not_in_second, fieldnames=first_file_data[0].keys())
+        with profile_stage('sort') as stage:
+            sorted_assets_in_first_not_in_second = first_file_data.argsort('path', assets_in_first_not_in_second)
+            stage.items += len(sorted_assets_in_first_not_in_second)
+        with profile_stage('write_csv') as stage:
+            first_file_data.write_csv(output_file_path_2, sorted_assets_in_first_not_in_second)
+            stage.items += len(sorted_assets_in_first_not_in_second)
         print(f"Assets existing in the first file but not in the second file written to {output_file_path_2}")
     else:
         print("No assets found only in the first file.")
 
 if __name__ == '__main__':
-    if len(sys.argv) != 5:
-        print("Usage: python script.py <first_file.csv> <second_file.txt> <output_file_1.csv> <output_file_2.csv>")
-    else:
-        main(sys.argv[1], sys.argv[2], sys.argv[3], sys.argv[4])
+    parser = argparse.ArgumentParser(description="Split a texture CSV by whether each texture is covered by an asset list.")
+    parser.add_argument("first_file", type=str, help="Texture CSV")
+    parser.add_argument("second_file", type=str, help="Asset list: one exact path, directory (/Game/UI/*) or glob rule per line")
+    parser.add_argument("output_file_1", type=str, help="CSV of textures matched by the asset list")
+    parser.add_argument("output_file_2", type=str, help="CSV of textures not matched by the asset list")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print every rule and normalized texture path")
+    add_profile_arguments(parser)
+
+    args = parser.parse_args()
+    run('FilterUsability', main, args.first_file, args.second_file, args.output_file_1, args.output_file_2, args.verbose,
+        profile_path=args.profile, cprofile_path=args.cprofile)
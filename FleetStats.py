@@ -0,0 +1,320 @@
+import os
+import sys
+import csv
+import json
+import math
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Tuple
+
+from CompressedIO import COMPRESSION_SUFFIXES, open_text, split_compression
+from MemReportParser import STATS, iter_memreport
+from MemReportToStats import stats_csv_path
+from Profiling import add_profile_arguments, profile_stage, run
+
+DEFAULT_ACCURACY = 0.01
+DEFAULT_PERCENTILES = (50, 90, 95, 99)
+# Smaller magnitudes are counted as zero; stats are in MB, so this is far below a byte
+MIN_MAGNITUDE = 1e-9
+
+SKETCH_FORMAT = 'fleet-stats-sketch'
+SKETCH_VERSION = 1
+
+class QuantileSketch:
+    """Mergeable quantile sketch with relative accuracy (DDSketch).
+
+    A value x > 0 is counted in bucket ceil(log(x) / log(gamma)), gamma being
+    (1 + accuracy) / (1 - accuracy); negative values use a mirrored set of buckets and
+    values near zero a plain counter. Any quantile is then within `accuracy` of the true
+    value, relatively. The bucket count grows with the logarithm of the value range, not
+    with the number of values, and two sketches with the same accuracy merge exactly by
+    adding bucket counts. Count, sum, min and max are kept exactly.
+    """
+
+    def __init__(self, accuracy=DEFAULT_ACCURACY):
+        if not 0 < accuracy < 1:
+            raise ValueError(f"Sketch accuracy must be between 0 and 1, not {accuracy}")
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive: Dict[int, int] = {}
+        self.negative: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _key(self, magnitude: float) -> int:
+        return math.ceil(math.log(magnitude) / self._log_gamma)
+
+    def _value(self, key: int) -> float:
+        # The point of bucket (gamma^(key-1), gamma^key] with the lowest relative error
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, value: float):
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        if value > MIN_MAGNITUDE:
+            key = self._key(value)
+            self.positive[key] = self.positive.get(key, 0) + 1
+        elif value < -MIN_MAGNITUDE:
+            key = self._key(-value)
+            self.negative[key] = self.negative.get(key, 0) + 1
+        else:
+            self.zero_count += 1
+
+    def merge(self, other: 'QuantileSketch'):
+        if other.accuracy != self.accuracy:
+            raise ValueError(f"Cannot merge sketches of accuracy {self.accuracy} and {other.accuracy}")
+        for buckets, other_buckets in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_buckets.items():
+                buckets[key] = buckets.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else math.nan
+
+    def quantile(self, q: float) -> float:
+        """Return the q-quantile (0 <= q <= 1), or NaN for an empty sketch."""
+        if not self.count:
+            return math.nan
+        rank = q * (self.count - 1)
+        seen = 0
+        # Most negative values first: the largest negative keys
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return max(-self._value(key), self.min)
+        seen += self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return min(self._value(key), self.max)
+        return self.max
+
+    def to_dict(self):
+        # JSON object keys are strings; bucket keys are written as such
+        return {
+            'count': self.count, 'sum': self.sum, 'min': self.min, 'max': self.max, 'zero_count': self.zero_count,
+            'positive': {str(key): count for key, count in self.positive.items()},
+            'negative': {str(key): count for key, count in self.negative.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data, accuracy) -> 'QuantileSketch':
+        sketch = cls(accuracy)
+        sketch.count = data['count']
+        sketch.sum = data['sum']
+        # An empty sketch's infinite bounds round-trip through json as Infinity
+        sketch.min = data['min']
+        sketch.max = data['max']
+        sketch.zero_count = data['zero_count']
+        sketch.positive = {int(key): count for key, count in data['positive'].items()}
+        sketch.negative = {int(key): count for key, count in data['negative'].items()}
+        return sketch
+
+class FleetStats:
+    """One QuantileSketch per stat name over any number of reports.
+
+    Memory is proportional to the number of distinct stats (times the sketch size), not
+    to the number of reports. A stat absent from a report is not counted for it, so each
+    stat has its own count. Partial results built elsewhere merge with merge().
+    """
+
+    def __init__(self, accuracy=DEFAULT_ACCURACY):
+        self.accuracy = accuracy
+        self.reports = 0
+        self.sketches: Dict[str, QuantileSketch] = {}
+        self.stat_info: Dict[str, List[str]] = {}  # [group, category, description], first non-empty value wins
+
+    def _sketch(self, stat_name, info) -> QuantileSketch:
+        sketch = self.sketches.get(stat_name)
+        if sketch is None:
+            sketch = self.sketches[stat_name] = QuantileSketch(self.accuracy)
+            self.stat_info[stat_name] = list(info)
+        else:
+            known = self.stat_info[stat_name]
+            for i in range(3):
+                known[i] = known[i] or info[i]
+        return sketch
+
+    def add_report(self, stats: Iterable[Tuple[float, str, str, str, str]]):
+        """Add one report's (memory MB, name, group, category, description) rows; a repeated name keeps the last."""
+        latest = {}
+        for memory_mb, stat_name, group, category, description in stats:
+            latest[stat_name] = (memory_mb, (group, category, description))
+        for stat_name, (memory_mb, info) in latest.items():
+            self._sketch(stat_name, info).add(memory_mb)
+        self.reports += 1
+
+    def add_file(self, file_path):
+        """Add a .stats.csv file or a memreport."""
+        if split_compression(file_path)[0].lower().endswith('.memreport'):
+            rows = iter_memreport(file_path, sections=(STATS,))
+            self.add_report((row.memory_mb, row.stat_name, row.stat_group, row.stat_category, row.description) for row in rows)
+            return
+        with open_text(file_path, 'r') as csvfile:
+            csvreader = csv.reader(csvfile)
+            next(csvreader)  # Skip the header
+            self.add_report((float(row[0]), row[1], row[2], row[3], row[4]) for row in csvreader)
+
+    def merge(self, other: 'FleetStats'):
+        if other.accuracy != self.accuracy:
+            raise ValueError(f"Cannot merge sketches of accuracy {self.accuracy} and {other.accuracy}")
+        for stat_name, sketch in other.sketches.items():
+            self._sketch(stat_name, other.stat_info[stat_name]).merge(sketch)
+        self.reports += other.reports
+
+    def to_dict(self):
+        return {
+            'format': SKETCH_FORMAT, 'version': SKETCH_VERSION, 'accuracy': self.accuracy, 'reports': self.reports,
+            'stats': {
+                stat_name: {'info': self.stat_info[stat_name], 'sketch': sketch.to_dict()}
+                for stat_name, sketch in self.sketches.items()
+            }
+        }
+
+    @classmethod
+    def from_dict(cls, data) -> 'FleetStats':
+        if data.get('format') != SKETCH_FORMAT or data.get('version') != SKETCH_VERSION:
+            raise ValueError("Not a fleet stats sketch file")
+        fleet = cls(data['accuracy'])
+        fleet.reports = data['reports']
+        for stat_name, entry in data['stats'].items():
+            fleet.stat_info[stat_name] = entry['info']
+            fleet.sketches[stat_name] = QuantileSketch.from_dict(entry['sketch'], fleet.accuracy)
+        return fleet
+
+    def save(self, file_path):
+        with open_text(file_path, 'w') as outfile:
+            json.dump(self.to_dict(), outfile, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, file_path) -> 'FleetStats':
+        with open_text(file_path, 'r') as infile:
+            return cls.from_dict(json.load(infile))
+
+def is_sketch_file(file_path) -> bool:
+    return split_compression(file_path)[0].lower().endswith('.json')
+
+def find_inputs(input_directory):
+    """Yield the .stats.csv files and memreports under a directory; a memreport whose stats CSV exists is skipped."""
+    for dirpath, dirnames, filenames in os.walk(input_directory):
+        dirnames.sort()
+        present = set(filenames)
+        for filename in sorted(filenames):
+            base = split_compression(filename)[0].lower()
+            if base.endswith('.stats.csv'):
+                yield os.path.join(dirpath, filename)
+            elif base.endswith('.memreport'):
+                stats_name = os.path.basename(stats_csv_path(split_compression(filename)[0]))
+                if not any(stats_name + suffix in present for suffix in ('',) + COMPRESSION_SUFFIXES):
+                    yield os.path.join(dirpath, filename)
+
+def _aggregate_task(file_paths, accuracy):
+    # Runs in a worker process: one partial result per batch of files
+    fleet = FleetStats(accuracy)
+    for file_path in file_paths:
+        fleet.add_file(file_path)
+    return fleet.to_dict()
+
+def aggregate(inputs, accuracy=DEFAULT_ACCURACY, workers=1) -> FleetStats:
+    """Aggregate stats CSVs, memreports, directories of them and saved sketch files into one FleetStats."""
+    files = []
+    sketch_files = []
+    for path in inputs:
+        if os.path.isdir(path):
+            files.extend(find_inputs(path))
+        elif is_sketch_file(path):
+            sketch_files.append(path)
+        else:
+            files.append(path)
+
+    fleet = FleetStats(accuracy)
+    with profile_stage('aggregate', unit='reports') as stage:
+        if workers == 1 or len(files) < 2:
+            for file_path in files:
+                fleet.add_file(file_path)
+        else:
+            batches = [files[i::workers] for i in range(workers)]
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for partial in executor.map(_aggregate_task, batches, [accuracy] * len(batches)):
+                    fleet.merge(FleetStats.from_dict(partial))
+        stage.items += len(files)
+    with profile_stage('merge', unit='sketch files') as stage:
+        for sketch_file in sketch_files:
+            fleet.merge(FleetStats.load(sketch_file))
+        stage.items += len(sketch_files)
+    return fleet
+
+def write_summary(fleet: FleetStats, output_file_path, percentiles=DEFAULT_PERCENTILES, top=10):
+    rows = []
+    for stat_name, sketch in fleet.sketches.items():
+        rows.append(
+            [stat_name] + fleet.stat_info[stat_name] + [sketch.count, round(sketch.mean, 2), round(sketch.min, 2)] +
+            [round(sketch.quantile(p / 100), 2) for p in percentiles] + [round(sketch.max, 2)]
+        )
+    # Highest upper percentile first
+    sort_column = 6 + len(percentiles)
+    rows.sort(key=lambda row: (-row[sort_column], row[0]))
+
+    with open_text(output_file_path, 'w', newline='') as csvfile:
+        csvwriter = csv.writer(csvfile)
+        csvwriter.writerow(
+            ['Stat Name', 'STAT Group', 'STAT Category', 'Description', 'Count', 'Mean (MB)', 'Min (MB)'] +
+            [f'P{p:g} (MB)' for p in percentiles] + ['Max (MB)']
+        )
+        csvwriter.writerows(rows)
+    print(f"Fleet statistics for {len(rows)} stats over {fleet.reports} reports have been written to {output_file_path}.")
+
+    for row in rows[:top]:
+        print(f"{row[5]:>12.2f} MB mean {row[sort_column]:>12.2f} MB p{percentiles[-1]:g} {row[-1]:>12.2f} MB max  {row[0]}")
+
+def main(inputs, output_path=None, save_path=None, accuracy=DEFAULT_ACCURACY, percentiles=DEFAULT_PERCENTILES,
+         workers=1, top=10):
+    try:
+        fleet = aggregate(inputs, accuracy, workers)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if save_path:
+        fleet.save(save_path)
+        print(f"Sketches for {len(fleet.sketches)} stats over {fleet.reports} reports saved to {save_path}")
+    if output_path:
+        with profile_stage('write_csv', unit='stats') as stage:
+            write_summary(fleet, output_path, percentiles, top)
+            stage.items += len(fleet.sketches)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Per-stat count, mean and percentiles of AssetRegistry stats across many reports.")
+    parser.add_argument("inputs", type=str, nargs="+",
+                        help=".stats.csv files, memreports, directories of them, or sketch files saved with --save")
+    parser.add_argument("-o", "--output", type=str, default=None, help="Write the per-stat summary CSV here")
+    parser.add_argument("--save", type=str, default=None, help="Save the mergeable sketches (JSON) for later runs to combine")
+    parser.add_argument("--accuracy", type=float, default=DEFAULT_ACCURACY,
+                        help=f"Relative accuracy of the percentiles (default: {DEFAULT_ACCURACY}); merged sketches must match")
+    parser.add_argument("--percentiles", type=float, nargs="+", default=list(DEFAULT_PERCENTILES),
+                        help="Percentiles to report (default: 50 90 95 99)")
+    parser.add_argument("-j", "--workers", type=int, default=1, help="Worker processes reading reports (default: 1)")
+    parser.add_argument("--top", type=int, default=10, help="Stats to print (default: 10)")
+    add_profile_arguments(parser)
+
+    args = parser.parse_args()
+    if not args.output and not args.save:
+        parser.error("name an --output summary CSV, a --save sketch file, or both")
+    if any(not 0 <= p <= 100 for p in args.percentiles):
+        parser.error("percentiles must be between 0 and 100")
+    run('FleetStats', main, args.inputs, args.output, args.save, args.accuracy, args.percentiles, args.workers, args.top,
+        profile_path=args.profile, cprofile_path=args.cprofile)
@@ -1,5 +1,14 @@
+import os
+import re
 import json
 import sys
+import heapq
+import argparse
+from collections import defaultdict
+
+from CompressedIO import open_text, split_compression
+from MakeFileHierarchy import build_hierarchy, read_trie
+from TextureTable import TextureTable
 
 def calculate_sizes(hierarchy):
     total_memsize_kb = 0
@@ -23,16 +32,176 @@ def calculate_sizes(hierarchy):
     traverse_hierarchy(hierarchy)
     return total_memsize_kb, total_disksize_kb
 
-def main(hierarchy_file_path):
-    with open(hierarchy_file_path, 'r') as infile:
-        hierarchy = json.load(infile)
+def calculate_csv_sizes(texture_csv_path):
+    # The flat texture CSV sums straight from its int columns, no hierarchy needed
+    table = TextureTable.read_csv(texture_csv_path, usecols=('memsize_kb', 'disksize_kb'))
+    return table.sum('memsize_kb'), table.sum('disksize_kb')
+
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+SIZE_KEYS = ('memsize_kb', 'disksize_kb')
+
+# One JSON token, skipping leading whitespace: a string, a structural character, or a scalar
+json_token_regex = re.compile(r'\s*(?:("(?:[^"\\]|\\.)*")|([{}\[\]:,])|([^\s{}\[\]:,"]+))', re.DOTALL)
+
+def iter_json_tokens(file, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield (kind, text) tokens from a JSON file read chunk by chunk.
+
+    kind is 'string' (raw text including quotes), 'punct' or 'scalar'. Only the current
+    chunk and any token straddling its end are held in memory.
+    """
+    buffer = ''
+    at_eof = False
+    while not at_eof:
+        chunk = file.read(chunk_size)
+        at_eof = not chunk
+        buffer += chunk
+        position = 0
+        while True:
+            # Anchored at position: a failed match must not search ahead through the buffer
+            match = json_token_regex.match(buffer, position)
+            if match is None:
+                break
+            string, punct, scalar = match.groups()
+            # A scalar touching the end of the buffer may continue in the next chunk
+            if scalar is not None and match.end() == len(buffer) and not at_eof:
+                break
+            position = match.end()
+            if string is not None:
+                yield 'string', string
+            elif punct is not None:
+                yield 'punct', punct
+            else:
+                yield 'scalar', scalar
+        buffer = buffer[position:]
+    if buffer.strip():
+        raise ValueError(f"Unexpected trailing data in JSON: {buffer[:40]!r}")
+
+def _decode_string(token):
+    return json.loads(token) if '\\' in token else token[1:-1]
+
+def directory_key(path):
+    # The '/'-separated form PathTrie.node_path prints, with '/' for the root
+    return '/' + '/'.join(part for part in path.split('/') if part)
+
+def stream_sizes(file):
+    """Sum every memsize_kb/disksize_kb value in a hierarchy JSON without loading it.
+
+    Returns {directory path: [memsize_kb, disksize_kb, texture count]} for every directory,
+    each including its whole subtree as in PathTrie, with '/' holding the grand total.
+    Containers are tracked with an explicit stack, so memory is bounded by the hierarchy
+    depth and the number of directories rather than the number of textures.
+    """
+    totals = defaultdict(lambda: [0, 0, 0])
+    # One entry per open container: the key currently being filled for objects, None for arrays
+    keys = []
+    is_object = []
+    expect_key = False
+    # Totals for the directory of the texture being read and all its ancestors, reused
+    # while consecutive values stay in the same directory
+    directory = None
+    directory_totals = []
+
+    for kind, token in iter_json_tokens(file):
+        if kind == 'punct':
+            if token == '{' or token == '[':
+                is_object.append(token == '{')
+                keys.append(None)
+                expect_key = token == '{'
+            elif token == '}' or token == ']':
+                is_object.pop()
+                keys.pop()
+                expect_key = False
+            elif token == ',':
+                expect_key = is_object[-1]
+            continue
+
+        if expect_key:
+            keys[-1] = _decode_string(token)
+            expect_key = False
+            continue
+
+        key = keys[-1] if keys else None
+        if key in SIZE_KEYS:
+            value = int(_decode_string(token) if kind == 'string' else token)
+            # keys ends with the texture name and the size key; the rest is its directory
+            if keys[:-2] != directory:
+                directory = keys[:-2]
+                parts = [part for part in directory if part is not None]
+                directory_totals = [totals['/' + '/'.join(parts[:depth])] for depth in range(len(parts) + 1)]
+            index = SIZE_KEYS.index(key)
+            for sizes in directory_totals:
+                sizes[index] += value
+                if index == 0:
+                    sizes[2] += 1
 
-    total_memsize_kb, total_disksize_kb = calculate_sizes(hierarchy)
+    return dict(totals)
+
+def file_kind(file_path):
+    # The extension that decides how to read a file, ignoring any compression suffix
+    return os.path.splitext(split_compression(file_path)[0])[1].lower()
+
+def load_trie(file_path):
+    # A compact .trie already has every directory total; a texture CSV is cheap to aggregate
+    if file_kind(file_path) == '.trie':
+        return read_trie(file_path)
+    table = TextureTable.read_csv(file_path, usecols=('path', 'memsize_kb', 'disksize_kb'))
+    return build_hierarchy(table.rows())
+
+def main_stream(hierarchy_file_path, by_folder=False, under=None, top=0):
+    with open_text(hierarchy_file_path, 'r') as infile:
+        totals = stream_sizes(infile)
+
+    if by_folder:
+        for folder, (memsize_kb, disksize_kb, texture_count) in sorted(totals.items(), key=lambda item: item[1][0], reverse=True):
+            print(f"{memsize_kb:>12} KB {disksize_kb:>12} KB {texture_count:>8}  {folder}")
+    total_memsize_kb, total_disksize_kb, texture_count = totals.get(directory_key(under or '/'), (0, 0, 0))
+    if under:
+        print(f"Under {under}: {texture_count} textures")
+    print(f"Total memsize_kb: {total_memsize_kb}")
+    print(f"Total disksize_kb: {total_disksize_kb}")
+
+    if top:
+        print(f"Top {top} directories by memsize_kb:")
+        directories = (item for item in totals.items() if item[0] != '/')
+        for path, (memsize_kb, disksize_kb, texture_count) in heapq.nlargest(top, directories, key=lambda item: item[1][0]):
+            print(f"{memsize_kb:>12} KB {disksize_kb:>12} KB {texture_count:>8}  {path}")
+
+def main(hierarchy_file_path, under=None, top=0):
+    kind = file_kind(hierarchy_file_path)
+    if under or top or kind == '.trie':
+        if kind not in ('.trie', '.csv'):
+            print("Error: --under and --top need --stream, a .trie file (MakeFileHierarchy.py --trie) or a texture CSV.")
+            sys.exit(1)
+        trie = load_trie(hierarchy_file_path)
+        total_memsize_kb, total_disksize_kb, texture_count = trie.total(under or '/')
+        if under:
+            print(f"Under {under}: {texture_count} textures")
+    elif kind == '.csv':
+        total_memsize_kb, total_disksize_kb = calculate_csv_sizes(hierarchy_file_path)
+    else:
+        with open_text(hierarchy_file_path, 'r') as infile:
+            hierarchy = json.load(infile)
+
+        total_memsize_kb, total_disksize_kb = calculate_sizes(hierarchy)
     print(f"Total memsize_kb: {total_memsize_kb}")
     print(f"Total disksize_kb: {total_disksize_kb}")
 
+    if top:
+        print(f"Top {top} directories by memsize_kb:")
+        for path, memsize_kb, disksize_kb, texture_count in trie.top_directories(top):
+            print(f"{memsize_kb:>12} KB {disksize_kb:>12} KB {texture_count:>8}  {path}")
+
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print("Usage: python script.py <hierarchy_file.json>")
+    parser = argparse.ArgumentParser(description="Total the memsize_kb and disksize_kb of a texture hierarchy.")
+    parser.add_argument("hierarchy_file", type=str, help=".hierarchy JSON, compact .trie, or texture CSV")
+    parser.add_argument("--under", type=str, default=None, help="Only total textures under this path, e.g. /Game/Characters")
+    parser.add_argument("--top", type=int, default=0, help="Also list the N directories using the most memory")
+    parser.add_argument("--stream", action="store_true", help="Tokenize the .hierarchy JSON incrementally instead of loading it")
+    parser.add_argument("--by-folder", action="store_true", help="With --stream, also print totals per directory")
+
+    args = parser.parse_args()
+    if args.stream or args.by_folder:
+        main_stream(args.hierarchy_file, args.by_folder, args.under, args.top)
     else:
-        main(sys.argv[1])
+        main(args.hierarchy_file, args.under, args.top)
@@ -1,47 +1,197 @@
-import csv
 import json
-import sys
-from collections import defaultdict
+import heapq
+import argparse
+from array import array
 
-def read_csv(file_path):
-    with open(file_path, newline='') as csvfile:
-        reader = csv.DictReader(csvfile, delimiter=',')
-        return list(reader)
+from CompressedIO import open_text
+from Profiling import add_profile_arguments, counted, profile_stage, run
+from TextureTable import TextureTable
+
+ROOT = 0
+
+class PathTrie:
+    """Texture hierarchy where every node carries the totals of its subtree.
+
+    Nodes live in parallel arrays indexed by node number, with node 0 the root. Each
+    insert adds the texture's memsize/disksize to every node on its path, so the totals
+    for any directory are available without walking its subtree. Nothing here recurses,
+    so arbitrarily deep paths are fine.
+    """
+
+    def __init__(self):
+        self.names = ['']
+        self.parents = array('i', [-1])
+        self.children = [{}]
+        self.rows = [None]
+        self.memsize_kb = array('q', [0])
+        self.disksize_kb = array('q', [0])
+        self.counts = array('q', [0])
+
+    def __len__(self):
+        return len(self.names)
+
+    def _add_node(self, parent, name):
+        index = len(self.names)
+        self.names.append(name)
+        self.parents.append(parent)
+        self.children.append({})
+        self.rows.append(None)
+        self.memsize_kb.append(0)
+        self.disksize_kb.append(0)
+        self.counts.append(0)
+        self.children[parent][name] = index
+        return index
+
+    def insert(self, row):
+        """Add a texture row (a dict with at least 'path', 'memsize_kb' and 'disksize_kb')."""
+        node_path = [ROOT]
+        node = ROOT
+        for part in row['path'].strip('/').split('/'):
+            child = self.children[node].get(part)
+            node = child if child is not None else self._add_node(node, part)
+            node_path.append(node)
+
+        memsize_kb = int(row['memsize_kb'])
+        disksize_kb = int(row['disksize_kb'])
+        count = 1
+        previous = self.rows[node]
+        if previous is not None:
+            # A repeated path replaces the earlier row, as the nested hierarchy always did
+            memsize_kb -= int(previous['memsize_kb'])
+            disksize_kb -= int(previous['disksize_kb'])
+            count = 0
+        self.rows[node] = row
+
+        for index in node_path:
+            self.memsize_kb[index] += memsize_kb
+            self.disksize_kb[index] += disksize_kb
+            self.counts[index] += count
+
+    def find(self, path):
+        """Return the node for a '/'-separated path, or None if it is not in the trie."""
+        node = ROOT
+        for part in path.strip('/').split('/'):
+            if not part:
+                continue
+            node = self.children[node].get(part)
+            if node is None:
+                return None
+        return node
+
+    def node_path(self, node):
+        parts = []
+        while node > ROOT:
+            parts.append(self.names[node])
+            node = self.parents[node]
+        return '/' + '/'.join(reversed(parts))
+
+    def total(self, path='/'):
+        """Return (memsize_kb, disksize_kb, texture count) under path."""
+        node = self.find(path)
+        if node is None:
+            return 0, 0, 0
+        return self.memsize_kb[node], self.disksize_kb[node], self.counts[node]
+
+    def is_directory(self, node):
+        return bool(self.children[node])
+
+    def top_directories(self, count, key='memsize_kb'):
+        """Return the count largest directories as (path, memsize_kb, disksize_kb, textures)."""
+        totals = getattr(self, key)
+        directories = (node for node in range(1, len(self.names)) if self.children[node])
+        return [
+            (self.node_path(node), self.memsize_kb[node], self.disksize_kb[node], self.counts[node])
+            for node in heapq.nlargest(count, directories, key=totals.__getitem__)
+        ]
 
 def build_hierarchy(data):
-    def nested_dict():
-        return defaultdict(nested_dict)
-    
-    hierarchy = nested_dict()
+    trie = PathTrie()
+    with profile_stage('build_hierarchy') as stage:
+        for row in counted(data, stage):
+            trie.insert(row)
+    return trie
 
-    for row in data:
-        path_parts = row['path'].strip('/').split('/')
-        current_level = hierarchy
+def _iter_hierarchy_json(trie, indent=4):
+    # Produces exactly what json.dump(nested_dicts, indent=4, sort_keys=True) wrote, using an
+    # explicit stack instead of recursion. A node's entries are its row fields and its children.
+    def entries(node):
+        items = [(name, child) for name, child in trie.children[node].items()]
+        if trie.rows[node] is not None:
+            items.extend((key, None) for key in trie.rows[node])
+        items.sort(key=lambda item: item[0])
+        return node, items
 
-        for part in path_parts[:-1]:
-            current_level = current_level[part]
-        
-        current_level[path_parts[-1]] = row
+    stack = [(entries(ROOT), 0)]
+    yield '{'
+    while stack:
+        (node, items), position = stack.pop()
+        depth = len(stack) + 1
+        if position == len(items):
+            yield '}' if not items else '\n' + ' ' * (indent * (depth - 1)) + '}'
+            continue
+        stack.append(((node, items), position + 1))
 
-    return hierarchy
+        key, child = items[position]
+        yield (',' if position else '') + '\n' + ' ' * (indent * depth) + json.dumps(key) + ': '
+        if child is None:
+            yield json.dumps(trie.rows[node][key])
+        else:
+            stack.append((entries(child), 0))
+            yield '{'
 
 def write_hierarchy(output_file_path, hierarchy):
-    def dicts(tree):
-        if isinstance(tree, defaultdict):
-            return {k: dicts(v) for k, v in tree.items()}
-        return tree
-
-    with open(output_file_path, 'w') as outfile:
-        json.dump(dicts(hierarchy), outfile, indent=4, sort_keys=True)
-
-def main(input_file_path, output_file_path):
-    data = read_csv(input_file_path)
-    hierarchy = build_hierarchy(data)
-    write_hierarchy(output_file_path, hierarchy)
+    with open_text(output_file_path, 'w') as outfile:
+        for chunk in _iter_hierarchy_json(hierarchy):
+            outfile.write(chunk)
+
+def write_trie(output_file_path, trie):
+    """Write the trie's structure and per-node totals as compact column arrays (no rows)."""
+    with open_text(output_file_path, 'w') as outfile:
+        json.dump({
+            'names': trie.names,
+            'parents': trie.parents.tolist(),
+            'memsize_kb': trie.memsize_kb.tolist(),
+            'disksize_kb': trie.disksize_kb.tolist(),
+            'counts': trie.counts.tolist()
+        }, outfile, separators=(',', ':'))
+
+def read_trie(input_file_path):
+    with open_text(input_file_path, 'r') as infile:
+        data = json.load(infile)
+    trie = PathTrie()
+    trie.names = data['names']
+    trie.parents = array('i', data['parents'])
+    trie.memsize_kb = array('q', data['memsize_kb'])
+    trie.disksize_kb = array('q', data['disksize_kb'])
+    trie.counts = array('q', data['counts'])
+    trie.rows = [None] * len(trie.names)
+    trie.children = [{} for _ in trie.names]
+    for node in range(1, len(trie.names)):
+        trie.children[trie.parents[node]][trie.names[node]] = node
+    return trie
+
+def main(input_file_path, output_file_path, trie_file_path=None):
+    with profile_stage('read_csv') as stage:
+        data = TextureTable.read_csv(input_file_path)
+        stage.items += len(data)
+    hierarchy = build_hierarchy(data.rows())
+    with profile_stage('write_json', unit='nodes') as stage:
+        write_hierarchy(output_file_path, hierarchy)
+        stage.items += len(hierarchy)
     print(f"Hierarchical visualization with row info written to {output_file_path}")
+    if trie_file_path:
+        with profile_stage('write_trie', unit='nodes') as stage:
+            write_trie(trie_file_path, hierarchy)
+            stage.items += len(hierarchy)
+        print(f"Size-aggregated trie written to {trie_file_path}")
 
 if __name__ == '__main__':
-    if len(sys.argv) != 3:
-        print("Usage: python script.py <input_file.csv> <output_file.json>")
-    else:
-        main(sys.argv[1], sys.argv[2])
+    parser = argparse.ArgumentParser(description="Build a texture hierarchy from a texture CSV.")
+    parser.add_argument("input_file", type=str, help="Texture CSV written by MemReportToTextures.py")
+    parser.add_argument("output_file", type=str, help="Nested .hierarchy JSON to write")
+    parser.add_argument("--trie", type=str, default=None, help="Also write the compact size-aggregated trie to this file")
+    add_profile_arguments(parser)
+
+    args = parser.parse_args()
+    run('MakeFileHierarchy', main, args.input_file, args.output_file, args.trie,
+        profile_path=args.profile, cprofile_path=args.cprofile)
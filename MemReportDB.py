@@ -0,0 +1,304 @@
+import os
+import sys
+import csv
+import sqlite3
+import argparse
+from datetime import datetime, timezone
+
+from CompressedIO import open_text, split_compression
+from MemReportParser import StatRow, TextureRow, iter_memreport
+from MemReportToStats import STATS_CSV_HEADER
+from ParseObjRefs import NO_OBJECT, parse_log
+from TextureTable import INT_COLUMNS
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    source TEXT,
+    ingested_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stats (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+    stat_name TEXT NOT NULL,
+    memory_mb REAL NOT NULL,
+    stat_group TEXT,
+    stat_category TEXT,
+    description TEXT
+);
+CREATE INDEX IF NOT EXISTS stats_by_name ON stats (stat_name, snapshot_id);
+CREATE INDEX IF NOT EXISTS stats_by_snapshot ON stats (snapshot_id);
+CREATE TABLE IF NOT EXISTS textures (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+    dir TEXT NOT NULL,
+    disksize_x INTEGER, disksize_y INTEGER, disksize_kb INTEGER, bias TEXT,
+    memsize_x INTEGER, memsize_y INTEGER, memsize_kb INTEGER,
+    texformat TEXT, texgroup TEXT, path TEXT NOT NULL,
+    bstreaming TEXT, unknown_ref TEXT, vt TEXT,
+    usagecount INTEGER, num_mips INTEGER, uncompressed TEXT
+);
+CREATE INDEX IF NOT EXISTS textures_by_snapshot_path ON textures (snapshot_id, path);
+CREATE INDEX IF NOT EXISTS textures_by_path ON textures (path);
+CREATE INDEX IF NOT EXISTS textures_by_texgroup ON textures (texgroup, snapshot_id);
+CREATE INDEX IF NOT EXISTS textures_by_texformat ON textures (texformat, snapshot_id);
+CREATE TABLE IF NOT EXISTS objrefs_objects (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+    object_index INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (snapshot_id, object_index)
+);
+CREATE INDEX IF NOT EXISTS objrefs_objects_by_path ON objrefs_objects (path, snapshot_id);
+CREATE TABLE IF NOT EXISTS objrefs_refs (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+    from_index INTEGER,
+    to_index INTEGER NOT NULL,
+    member_name TEXT
+);
+CREATE INDEX IF NOT EXISTS objrefs_refs_by_target ON objrefs_refs (snapshot_id, to_index);
+'''
+
+SNAPSHOT_TABLES = ('stats', 'textures', 'objrefs_objects', 'objrefs_refs')
+
+TEXTURE_COLUMNS = ('dir',) + TextureRow._fields
+INSERT_TEXTURE = f"INSERT INTO textures (snapshot_id, {', '.join(TEXTURE_COLUMNS)}) VALUES (?{', ?' * len(TEXTURE_COLUMNS)})"
+INSERT_STAT = "INSERT INTO stats (snapshot_id, stat_name, memory_mb, stat_group, stat_category, description) VALUES (?, ?, ?, ?, ?, ?)"
+
+def connect(db_path):
+    connection = sqlite3.connect(db_path)
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    connection.execute('PRAGMA foreign_keys=ON')
+    connection.executescript(SCHEMA)
+    return connection
+
+def texture_dir(path):
+    return path[:path.rfind('/')] if '/' in path else ''
+
+def snapshot_name(file_path):
+    name = os.path.basename(split_compression(file_path)[0])
+    for suffix in ('.memreport', '.stats.csv', '.csv'):
+        if name.lower().endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+def _create_snapshot(connection, name, source, replace):
+    existing = connection.execute("SELECT id FROM snapshots WHERE name = ?", (name,)).fetchone()
+    if existing:
+        if not replace:
+            raise ValueError(f"Snapshot '{name}' already exists (use --replace)")
+        for table in SNAPSHOT_TABLES:
+            connection.execute(f"DELETE FROM {table} WHERE snapshot_id = ?", existing)
+        connection.execute("DELETE FROM snapshots WHERE id = ?", existing)
+    cursor = connection.execute(
+        "INSERT INTO snapshots (name, source, ingested_at) VALUES (?, ?, ?)",
+        (name, source, datetime.now(timezone.utc).isoformat(timespec='seconds'))
+    )
+    return cursor.lastrowid
+
+def _stat_params(snapshot_id, rows):
+    for row in rows:
+        yield (snapshot_id, row.stat_name, row.memory_mb, row.stat_group, row.stat_category, row.description)
+
+def _texture_params(snapshot_id, rows):
+    for row in rows:
+        yield (snapshot_id, texture_dir(row.path)) + tuple(row)
+
+def _ingest_objrefs(connection, snapshot_id, log_file):
+    graph = parse_log(log_file).graph
+    connection.executemany(
+        "INSERT INTO objrefs_objects (snapshot_id, object_index, path) VALUES (?, ?, ?)",
+        ((snapshot_id, index, path) for index, path in enumerate(graph.object_ids))
+    )
+    member_names = graph.member_names
+    connection.executemany(
+        "INSERT INTO objrefs_refs (snapshot_id, from_index, to_index, member_name) VALUES (?, ?, ?, ?)",
+        (
+            (snapshot_id, None if from_index == NO_OBJECT else from_index, to_index, member_names[member])
+            for from_index, to_index, member in zip(graph.ref_from, graph.ref_to, graph.ref_member)
+        )
+    )
+
+def ingest_memreport(connection, memreport_path, name=None, objrefs_log=None, replace=False):
+    """Load one memreport (and optionally its obj refs log) as a snapshot in a single transaction."""
+    name = name or snapshot_name(memreport_path)
+    with connection:
+        snapshot_id = _create_snapshot(connection, name, memreport_path, replace)
+        stats = []
+
+        def textures():
+            # One read of the report: stats are set aside while textures stream into SQLite
+            for row in iter_memreport(memreport_path):
+                if isinstance(row, StatRow):
+                    stats.append(row)
+                else:
+                    yield row
+
+        connection.executemany(INSERT_TEXTURE, _texture_params(snapshot_id, textures()))
+        connection.executemany(INSERT_STAT, _stat_params(snapshot_id, stats))
+        if objrefs_log:
+            _ingest_objrefs(connection, snapshot_id, objrefs_log)
+    return snapshot_id
+
+def _read_stats_csv(stats_csv_path):
+    with open_text(stats_csv_path, 'r') as csvfile:
+        csvreader = csv.reader(csvfile)
+        next(csvreader)  # Skip the header
+        for row in csvreader:
+            yield StatRow(*row)
+
+def _read_textures_csv(textures_csv_path):
+    with open_text(textures_csv_path, newline='') as csvfile:
+        reader = csv.DictReader(csvfile, delimiter=',')
+        for row in reader:
+            yield TextureRow(*(int(row[field]) if field in INT_COLUMNS else row[field] for field in TextureRow._fields))
+
+def ingest_csvs(connection, name, stats_csv=None, textures_csv=None, objrefs_log=None, replace=False):
+    """Load already-converted .stats.csv / texture CSV outputs as a snapshot."""
+    with connection:
+        snapshot_id = _create_snapshot(connection, name, textures_csv or stats_csv, replace)
+        if stats_csv:
+            connection.executemany(INSERT_STAT, _stat_params(snapshot_id, _read_stats_csv(stats_csv)))
+        if textures_csv:
+            connection.executemany(INSERT_TEXTURE, _texture_params(snapshot_id, _read_textures_csv(textures_csv)))
+        if objrefs_log:
+            _ingest_objrefs(connection, snapshot_id, objrefs_log)
+    return snapshot_id
+
+def snapshot_id(connection, name):
+    row = connection.execute("SELECT id FROM snapshots WHERE name = ?", (name,)).fetchone()
+    if row is None:
+        raise ValueError(f"Unknown snapshot '{name}'")
+    return row[0]
+
+def query_delta(connection, name1, name2):
+    """Per-stat delta between two snapshots, in DeltaMemStats order and columns."""
+    id1, id2 = snapshot_id(connection, name1), snapshot_id(connection, name2)
+    return connection.execute('''
+        WITH names AS (
+            SELECT stat_name FROM stats WHERE snapshot_id = :a
+            UNION SELECT stat_name FROM stats WHERE snapshot_id = :b
+        )
+        SELECT COALESCE(s2.memory_mb, 0.0) - COALESCE(s1.memory_mb, 0.0) AS delta,
+               names.stat_name,
+               COALESCE(NULLIF(s1.stat_group, ''), s2.stat_group, ''),
+               COALESCE(NULLIF(s1.stat_category, ''), s2.stat_category, ''),
+               COALESCE(NULLIF(s1.description, ''), s2.description, '')
+        FROM names
+        LEFT JOIN stats s1 ON s1.snapshot_id = :a AND s1.stat_name = names.stat_name
+        LEFT JOIN stats s2 ON s2.snapshot_id = :b AND s2.stat_name = names.stat_name
+        ORDER BY delta DESC
+    ''', {'a': id1, 'b': id2}).fetchall()
+
+def query_textures(connection, name1, name2, common=True):
+    """Texture rows of name1 whose path is (common=True) or is not (common=False) in name2, by path."""
+    id1, id2 = snapshot_id(connection, name1), snapshot_id(connection, name2)
+    return connection.execute(f'''
+        SELECT {', '.join(TextureRow._fields)} FROM textures t
+        WHERE t.snapshot_id = ?
+          AND {'' if common else 'NOT '}EXISTS (SELECT 1 FROM textures o WHERE o.snapshot_id = ? AND o.path = t.path)
+        ORDER BY t.path
+    ''', (id1, id2)).fetchall()
+
+def query_hierarchy(connection, name, under='/', depth=1):
+    """Roll texture sizes up to the directories `depth` levels below `under`.
+
+    Returns (directory, memsize_kb, disksize_kb, textures) sorted by memsize_kb. The SQL
+    groups by each texture's own directory; only those few groups are rolled up here.
+    """
+    prefix = '/' + under.strip('/') if under.strip('/') else ''
+    rows = connection.execute('''
+        SELECT dir, SUM(memsize_kb), SUM(disksize_kb), COUNT(*) FROM textures
+        WHERE snapshot_id = ? AND path >= ? AND path < ?
+        GROUP BY dir
+    ''', (snapshot_id(connection, name), prefix + '/', prefix + '0')).fetchall()
+
+    base_depth = prefix.count('/')
+    rollup = {}
+    for directory, memsize_kb, disksize_kb, count in rows:
+        parts = directory.split('/')
+        key = '/'.join(parts[:base_depth + depth + 1]) or '/'
+        totals = rollup.setdefault(key, [0, 0, 0])
+        totals[0] += memsize_kb
+        totals[1] += disksize_kb
+        totals[2] += count
+    return sorted(((key,) + tuple(totals) for key, totals in rollup.items()), key=lambda row: row[1], reverse=True)
+
+def _write_rows(output_path, header, rows):
+    if output_path:
+        with open_text(output_path, 'w', newline='') as csvfile:
+            csvwriter = csv.writer(csvfile)
+            csvwriter.writerow(header)
+            csvwriter.writerows(rows)
+        print(f"{len(rows)} rows written to {output_path}")
+    else:
+        csvwriter = csv.writer(sys.stdout)
+        csvwriter.writerow(header)
+        csvwriter.writerows(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest memreports into a SQLite snapshot store and query across them.")
+    parser.add_argument("db", type=str, help="SQLite database file (created if missing)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    ingest_parser = subparsers.add_parser("ingest", help="Parse memreports and store each as a snapshot")
+    ingest_parser.add_argument("memreports", nargs="+", help=".memreport files; each snapshot is named after its file")
+    ingest_parser.add_argument("--objrefs", type=str, default=None, help="obj refs log to store with the (single) memreport")
+    ingest_parser.add_argument("--replace", action="store_true", help="Replace snapshots that already exist")
+
+    ingest_csv_parser = subparsers.add_parser("ingest-csv", help="Store existing .stats.csv / texture CSV outputs as a snapshot")
+    ingest_csv_parser.add_argument("name", type=str)
+    ingest_csv_parser.add_argument("--stats", type=str, default=None, help=".stats.csv written by MemReportToStats.py")
+    ingest_csv_parser.add_argument("--textures", type=str, default=None, help="Texture CSV written by MemReportToTextures.py")
+    ingest_csv_parser.add_argument("--objrefs", type=str, default=None, help="obj refs log")
+    ingest_csv_parser.add_argument("--replace", action="store_true")
+
+    subparsers.add_parser("snapshots", help="List snapshots")
+
+    delta_parser = subparsers.add_parser("delta", help="Stat deltas between two snapshots")
+    for name, help_text in (("common", "Textures of snapshot1 also in snapshot2"), ("different", "Textures of snapshot1 not in snapshot2")):
+        texture_parser = subparsers.add_parser(name, help=help_text)
+        texture_parser.add_argument("snapshot1")
+        texture_parser.add_argument("snapshot2")
+        texture_parser.add_argument("--output", type=str, default=None)
+    delta_parser.add_argument("snapshot1")
+    delta_parser.add_argument("snapshot2")
+    delta_parser.add_argument("--output", type=str, default=None)
+
+    hierarchy_parser = subparsers.add_parser("hierarchy", help="Texture sizes rolled up by directory")
+    hierarchy_parser.add_argument("snapshot")
+    hierarchy_parser.add_argument("--under", type=str, default='/')
+    hierarchy_parser.add_argument("--depth", type=int, default=1)
+    hierarchy_parser.add_argument("--output", type=str, default=None)
+
+    args = parser.parse_args()
+    connection = connect(args.db)
+    try:
+        if args.command == "ingest":
+            if args.objrefs and len(args.memreports) != 1:
+                parser.error("--objrefs needs exactly one memreport")
+            for memreport in args.memreports:
+                ingest_memreport(connection, memreport, objrefs_log=args.objrefs, replace=args.replace)
+                print(f"Ingested '{memreport}' as snapshot '{snapshot_name(memreport)}'")
+        elif args.command == "ingest-csv":
+            ingest_csvs(connection, args.name, args.stats, args.textures, args.objrefs, args.replace)
+            print(f"Ingested snapshot '{args.name}'")
+        elif args.command == "snapshots":
+            for row in connection.execute("SELECT name, source, ingested_at FROM snapshots ORDER BY id"):
+                print('\t'.join(str(value) for value in row))
+        elif args.command == "delta":
+            _write_rows(args.output, ['Delta Memory Usage (MB)'] + STATS_CSV_HEADER[1:],
+                        query_delta(connection, args.snapshot1, args.snapshot2))
+        elif args.command in ("common", "different"):
+            _write_rows(args.output, TextureRow._fields,
+                        query_textures(connection, args.snapshot1, args.snapshot2, common=args.command == "common"))
+        elif args.command == "hierarchy":
+            _write_rows(args.output, ['directory', 'memsize_kb', 'disksize_kb', 'textures'],
+                        query_hierarchy(connection, args.snapshot, args.under, args.depth))
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        connection.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import os
+import json
+import hashlib
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+def file_digest(file_path):
+    sha256 = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+def file_signature(file_path):
+    """Return the (size, mtime_ns, sha256) signature recorded for an input file."""
+    st = os.stat(file_path)
+    return st.st_size, st.st_mtime_ns, file_digest(file_path)
+
+class MemReportManifest:
+    """Records the inputs a batch has already converted so unchanged ones can be skipped.
+
+    Entries are keyed by input path relative to the manifest file and store the input's
+    size, mtime and sha256 plus the outputs produced from it. A manifest written by a
+    different tool version is discarded, forcing a full rebuild.
+    """
+
+    def __init__(self, manifest_path, tool_version):
+        self.manifest_path = manifest_path
+        self.tool_version = tool_version
+        self.entries = {}
+        if os.path.isfile(manifest_path):
+            with open(manifest_path, 'r') as infile:
+                data = json.load(infile)
+            if data.get('tool_version') == tool_version:
+                self.entries = data.get('entries', {})
+
+    def _key(self, input_path):
+        return os.path.relpath(input_path, os.path.dirname(os.path.abspath(self.manifest_path)))
+
+    def is_up_to_date(self, input_path, output_paths):
+        """Return True if input_path was converted before and neither it nor its outputs changed."""
+        entry = self.entries.get(self._key(input_path))
+        if entry is None:
+            return False
+        if not all(os.path.isfile(output_path) for output_path in output_paths):
+            return False
+
+        st = os.stat(input_path)
+        if entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+            return True
+        if entry['size'] != st.st_size:
+            return False
+
+        # Same size but touched: only the content hash can tell
+        if file_digest(input_path) != entry['sha256']:
+            return False
+        entry['mtime_ns'] = st.st_mtime_ns
+        return True
+
+    def record(self, input_path, output_paths, signature):
+        size, mtime_ns, sha256 = signature
+        self.entries[self._key(input_path)] = {
+            'size': size,
+            'mtime_ns': mtime_ns,
+            'sha256': sha256,
+            'outputs': [self._key(output_path) for output_path in output_paths]
+        }
+
+    def forget(self, input_path):
+        self.entries.pop(self._key(input_path), None)
+
+    def save(self):
+        # Write to a temporary file first so an interrupted run never leaves a corrupt manifest
+        temp_path = self.manifest_path + '.tmp'
+        with open(temp_path, 'w') as outfile:
+            json.dump({'tool_version': self.tool_version, 'entries': self.entries}, outfile, indent=4, sort_keys=True)
+        os.replace(temp_path, self.manifest_path)
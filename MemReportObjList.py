@@ -0,0 +1,199 @@
+import csv
+import sys
+import argparse
+from array import array
+from collections import Counter
+from typing import Iterable, List, NamedTuple
+
+from CompressedIO import open_text
+from MemReportParser import OBJ_LIST, ObjClassRow, ObjectRow, iter_memreport
+from TextureTable import CategoryColumn
+
+class ClassSummary(NamedTuple):
+    """Per-class totals. max_kb is the engine's MaxKB for the class, or the largest single
+    object's when built from a per-object listing; max_res_kb is the largest single
+    object's resource size, when known."""
+    class_name: str
+    count: int
+    num_kb: float
+    max_kb: float
+    res_kb: float
+    max_res_kb: float
+
+SUMMARY_HEADER = ['class', 'count', 'num_kb', 'max_kb', 'res_kb', 'max_res_kb']
+
+DELTA_HEADER = [
+    'class', 'count_1', 'count_2', 'count_delta',
+    'num_kb_1', 'num_kb_2', 'num_kb_delta',
+    'res_kb_1', 'res_kb_2', 'res_kb_delta',
+    'max_res_kb_1', 'max_res_kb_2'
+]
+
+class ObjListTable:
+    """Obj list rows stored column by column, with the class column category-coded.
+
+    count is the Count column for class summary rows and 1 for per-object rows; path is
+    empty for class summary rows. The group-by methods work a whole column at a time over
+    the class codes, so no per-row objects are built.
+    """
+
+    def __init__(self):
+        self.class_name = CategoryColumn()
+        self.path: List[str] = []
+        self.count = array('q')
+        self.num_kb = array('d')
+        self.max_kb = array('d')
+        self.res_kb = array('d')
+
+    def __len__(self):
+        return len(self.count)
+
+    def append(self, row):
+        self.class_name.append(row.class_name)
+        if isinstance(row, ObjClassRow):
+            self.path.append('')
+            self.count.append(row.count)
+        else:
+            self.path.append(row.path)
+            self.count.append(1)
+        self.num_kb.append(row.num_kb)
+        self.max_kb.append(row.max_kb)
+        self.res_kb.append(row.res_kb)
+
+    def _sum_by_class(self, column) -> array:
+        totals = array('d', bytes(8 * len(self.class_name.categories)))
+        for code, value in zip(self.class_name.codes, column):
+            totals[code] += value
+        return totals
+
+    def _max_by_class(self, column) -> array:
+        maxima = array('d', bytes(8 * len(self.class_name.categories)))
+        for code, value in zip(self.class_name.codes, column):
+            if value > maxima[code]:
+                maxima[code] = value
+        return maxima
+
+    def group_by_class(self, with_max_res=True) -> List[ClassSummary]:
+        """Return one ClassSummary per class, largest num_kb first."""
+        categories = self.class_name.categories
+        if self.count.count(1) == len(self.count):
+            # Per-object rows: counting codes is enough, and much faster than summing ones
+            counts = Counter(self.class_name.codes)
+        else:
+            counts = self._sum_by_class(self.count)
+        num_kb = self._sum_by_class(self.num_kb)
+        # Already a per-class figure on class summary rows: never a sum
+        max_kb = self._max_by_class(self.max_kb)
+        res_kb = self._sum_by_class(self.res_kb)
+        max_res_kb = self._max_by_class(self.res_kb) if with_max_res else array('d', bytes(8 * len(categories)))
+        summaries = [
+            ClassSummary(name, int(counts[code]), num_kb[code], max_kb[code], res_kb[code], max_res_kb[code])
+            for code, name in enumerate(categories)
+        ]
+        summaries.sort(key=lambda summary: summary.num_kb, reverse=True)
+        return summaries
+
+def read_obj_lists(memreport_path):
+    """Parse the obj lists of a memreport into (class summary table, per-object table).
+
+    Reports often list the same objects more than once (e.g. 'obj list -alphasort' and
+    'obj list -resourcesizesort'), so nothing is added up across listings: the class
+    summary comes from the first class summary block, and an object listed by several
+    per-object blocks is kept once.
+    """
+    classes = ObjListTable()
+    objects = ObjListTable()
+    summary_block = None
+    seen_objects = set()
+    for row in iter_memreport(memreport_path, sections=(OBJ_LIST,)):
+        if isinstance(row, ObjectRow):
+            key = (row.class_name, row.path)
+            if key not in seen_objects:
+                seen_objects.add(key)
+                objects.append(row)
+        else:
+            if summary_block is None:
+                summary_block = row.block
+            if row.block == summary_block:
+                classes.append(row)
+    return classes, objects
+
+def class_summaries(classes: ObjListTable, objects: ObjListTable) -> List[ClassSummary]:
+    """Per-class totals for a report.
+
+    The engine's own class summary is authoritative for counts and sizes when present (a
+    per-object listing usually covers only some classes). Per-object listings supply the
+    largest single object per class, and the totals for reports without a summary.
+    """
+    if not len(classes):
+        return objects.group_by_class()
+    largest = {summary.class_name: summary.max_res_kb for summary in objects.group_by_class()} if len(objects) else {}
+    return [
+        summary._replace(max_res_kb=largest.get(summary.class_name, 0.0))
+        for summary in classes.group_by_class(with_max_res=False)
+    ]
+
+def class_delta(summaries1: Iterable[ClassSummary], summaries2: Iterable[ClassSummary]):
+    """Class-level delta rows between two snapshots, largest absolute num_kb change first."""
+    by_class1 = {summary.class_name: summary for summary in summaries1}
+    by_class2 = {summary.class_name: summary for summary in summaries2}
+    empty = ClassSummary('', 0, 0.0, 0.0, 0.0, 0.0)
+    rows = []
+    for class_name in by_class1.keys() | by_class2.keys():
+        old = by_class1.get(class_name, empty)
+        new = by_class2.get(class_name, empty)
+        rows.append([
+            class_name, old.count, new.count, new.count - old.count,
+            round(old.num_kb, 2), round(new.num_kb, 2), round(new.num_kb - old.num_kb, 2),
+            round(old.res_kb, 2), round(new.res_kb, 2), round(new.res_kb - old.res_kb, 2),
+            round(old.max_res_kb, 2), round(new.max_res_kb, 2)
+        ])
+    rows.sort(key=lambda row: (-abs(row[6]), -abs(row[9]), row[0]))
+    return rows
+
+def _write_csv(output_path, header, rows):
+    with open_text(output_path, 'w', newline='') as csvfile:
+        csvwriter = csv.writer(csvfile)
+        csvwriter.writerow(header)
+        csvwriter.writerows(rows)
+
+def summarize(memreport_path, output_path, top=10):
+    summaries = class_summaries(*read_obj_lists(memreport_path))
+    if not summaries:
+        print(f"No obj list found in {memreport_path}.")
+        sys.exit(1)
+    _write_csv(output_path, SUMMARY_HEADER, (
+        [s.class_name, s.count, round(s.num_kb, 2), round(s.max_kb, 2), round(s.res_kb, 2), round(s.max_res_kb, 2)]
+        for s in summaries
+    ))
+    print(f"Obj list summary for {len(summaries)} classes written to {output_path}")
+    for summary in summaries[:top]:
+        print(f"{summary.num_kb:>14.2f} KB {summary.res_kb:>14.2f} KB res {summary.count:>9}  {summary.class_name}")
+
+def delta(memreport_path1, memreport_path2, output_path, top=10):
+    rows = class_delta(class_summaries(*read_obj_lists(memreport_path1)), class_summaries(*read_obj_lists(memreport_path2)))
+    _write_csv(output_path, DELTA_HEADER, rows)
+    print(f"Class delta for {len(rows)} classes written to {output_path}")
+    for row in rows[:top]:
+        print(f"{row[6]:>+14.2f} KB {row[9]:>+14.2f} KB res {row[3]:>+9}  {row[0]}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Per-class memory from the 'obj list' sections of memreports.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    summary_parser = subparsers.add_parser("summary", help="Per-class count, total and max sizes for one memreport")
+    summary_parser.add_argument("memreport", type=str)
+    summary_parser.add_argument("output_file", type=str, help="Class summary CSV")
+    summary_parser.add_argument("--top", type=int, default=10, help="Classes to print (default: 10)")
+
+    delta_parser = subparsers.add_parser("delta", help="Class-level delta between two memreports")
+    delta_parser.add_argument("memreport1", type=str, help="Baseline memreport")
+    delta_parser.add_argument("memreport2", type=str, help="Memreport to compare against the baseline")
+    delta_parser.add_argument("output_file", type=str, help="Class delta CSV")
+    delta_parser.add_argument("--top", type=int, default=10, help="Classes to print (default: 10)")
+
+    args = parser.parse_args()
+    if args.command == "summary":
+        summarize(args.memreport, args.output_file, args.top)
+    else:
+        delta(args.memreport1, args.memreport2, args.output_file, args.top)
@@ -0,0 +1,268 @@
+import re
+from typing import Iterable, Iterator, NamedTuple, Union
+
+from CompressedIO import open_text
+
+# Section names accepted by iter_memreport
+STATS = 'stats'
+TEXTURES = 'textures'
+OBJ_LIST = 'objlist'
+# The sections read when none are named; obj lists are only parsed on request
+ALL_SECTIONS = (STATS, TEXTURES)
+
+# Markers delimiting the sections inside a memreport
+STATS_MARKER = "AssetRegistry memory usage = "
+TEXTURES_MARKER = "Listing NONVT textures."
+TEXTURES_END_MARKER = "Total size:"
+OBJ_LIST_MARKER = "Obj List:"
+OBJ_LIST_TOTAL_MARKER = " Objects (Total:"
+OBJ_LIST_END_MARKER = "MemReport: "
+
+# Header names of the obj list columns we keep, across engine versions
+OBJ_LIST_COLUMNS = {
+    'count': ('Count',),
+    'num_kb': ('NumKB', 'NumKBytes'),
+    'max_kb': ('MaxKB', 'MaxKBytes'),
+    'res_kb': ('ResExcKB', 'ExclusiveResKBytes', 'ResKB', 'ResKBytes'),
+}
+
+# Regular expression to match memory usage lines with additional columns, including negative values
+memory_usage_pattern = re.compile(
+    r'^\s*([-+]?\d*\.?\d+)\s*MB\s*-\s*(.*?)\s*-\s*(.*?)\s*-\s*(.*?)\s*-\s*(.*)$'
+)
+
+texture_line_pattern = re.compile(
+    r"(?P<disksize_x>\d+)x(?P<disksize_y>\d+) \((?P<disksize_kb>\d+) KB, (?P<bias>.*?)\), (?P<memsize_x>\d+)x(?P<memsize_y>\d+) \((?P<memsize_kb>\d+) KB\), (?P<texformat>\w+), TEXTUREGROUP_(?P<texgroup>\w+), (?P<path>.*?), (?P<bstreaming>\w+), (?P<unknown_ref>\w+), (?P<vt>\w+), (?P<usagecount>\d+), (?P<num_mips>\d+), (?P<uncompressed>\w+)"
+)
+
+
+class StatRow(NamedTuple):
+    """One line of the AssetRegistry stats block, in .stats.csv column order."""
+    memory_usage: str
+    stat_name: str
+    stat_group: str
+    stat_category: str
+    description: str
+
+    @property
+    def memory_mb(self) -> float:
+        return float(self.memory_usage)
+
+
+class TextureRow(NamedTuple):
+    """One line of the NONVT texture listing, in texture CSV column order."""
+    disksize_x: int
+    disksize_y: int
+    disksize_kb: int
+    bias: str
+    memsize_x: int
+    memsize_y: int
+    memsize_kb: int
+    texformat: str
+    texgroup: str
+    path: str
+    bstreaming: str
+    unknown_ref: str
+    vt: str
+    usagecount: int
+    num_mips: int
+    uncompressed: str
+
+    def to_dict(self):
+        """Return the row as the string dict csv.DictReader would produce from the texture CSV."""
+        return {field: str(value) for field, value in zip(self._fields, self)}
+
+
+class ObjClassRow(NamedTuple):
+    """One class line of an 'obj list' class summary; block numbers the report's obj lists from 0."""
+    class_name: str
+    count: int
+    num_kb: float
+    max_kb: float
+    res_kb: float
+    block: int = 0
+
+
+class ObjectRow(NamedTuple):
+    """One object line of an 'obj list class=...' listing; block numbers the report's obj lists from 0."""
+    class_name: str
+    path: str
+    num_kb: float
+    max_kb: float
+    res_kb: float
+    block: int = 0
+
+
+MemReportRow = Union[StatRow, TextureRow, ObjClassRow, ObjectRow]
+
+
+class MissingTexturesError(ValueError):
+    """The report ended without a complete texture listing; the sections before it parsed fine."""
+
+
+def parse_stat_line(line: str):
+    match = memory_usage_pattern.match(line)
+    if not match:
+        return None
+    return StatRow(*(group.strip() for group in match.groups()))
+
+
+def parse_texture_line(line: str):
+    match = texture_line_pattern.match(line)
+    if not match:
+        return None
+    return TextureRow(
+        int(match.group('disksize_x')),
+        int(match.group('disksize_y')),
+        int(match.group('disksize_kb')),
+        match.group('bias'),
+        int(match.group('memsize_x')),
+        int(match.group('memsize_y')),
+        int(match.group('memsize_kb')),
+        match.group('texformat'),
+        match.group('texgroup'),
+        match.group('path'),
+        match.group('bstreaming'),
+        match.group('unknown_ref'),
+        match.group('vt'),
+        int(match.group('usagecount')),
+        int(match.group('num_mips')),
+        match.group('uncompressed')
+    )
+
+
+class ObjListHeader:
+    """Column layout of one obj list block, taken from its header line.
+
+    A header starting with 'Class' introduces a class summary (ObjClassRow lines), one
+    starting with 'Object' a per-object listing (ObjectRow lines). Data lines are split
+    on whitespace and the numeric columns are read from the right, so object names may
+    contain spaces.
+    """
+
+    def __init__(self, names, block=0):
+        self.block = block
+        self.is_class_summary = names[0] == 'Class'
+        self.num_values = len(names) - 1
+        # Positions counted from the end of a data line, None for a column this version lacks
+        self.count_index, self.num_kb_index, self.max_kb_index, self.res_kb_index = (
+            next((names.index(alias) - len(names) for alias in aliases if alias in names), None)
+            for aliases in OBJ_LIST_COLUMNS.values()
+        )
+
+    def parse(self, line: str):
+        tokens = line.split()
+        if len(tokens) <= self.num_values:
+            return None
+        try:
+            num_kb = float(tokens[self.num_kb_index])
+            max_kb = float(tokens[self.max_kb_index]) if self.max_kb_index is not None else 0.0
+            res_kb = float(tokens[self.res_kb_index]) if self.res_kb_index is not None else 0.0
+            if self.is_class_summary:
+                count = int(tokens[self.count_index]) if self.count_index is not None else 0
+        except ValueError:
+            return None
+        name_tokens = tokens[:-self.num_values]
+        if self.is_class_summary:
+            return ObjClassRow(' '.join(name_tokens), count, num_kb, max_kb, res_kb, self.block)
+        if len(name_tokens) < 2:
+            return None
+        return ObjectRow(name_tokens[0], ' '.join(name_tokens[1:]), num_kb, max_kb, res_kb, self.block)
+
+
+def parse_obj_list_header(line: str, block: int = 0):
+    names = line.split()
+    if not names or names[0] not in ('Class', 'Object') or not any(alias in names for alias in OBJ_LIST_COLUMNS['num_kb']):
+        return None
+    return ObjListHeader(names, block)
+
+
+def iter_memreport_lines(lines: Iterable[str], sections=ALL_SECTIONS) -> Iterator[MemReportRow]:
+    """Yield StatRow, TextureRow, ObjClassRow and ObjectRow tuples from memreport lines in a single pass.
+
+    Only the requested sections are extracted. Stats and textures appear once, so iteration
+    stops as soon as both have been read unless obj lists, which may appear any number of
+    times, were requested too. Raises ValueError if the texture listing was requested but
+    the file ends before its "Total size:" line.
+    """
+    want_stats = STATS in sections
+    want_textures = TEXTURES in sections
+    want_obj_lists = OBJ_LIST in sections
+
+    # Each section moves from waiting -> active -> done independently of the other
+    stats_active = False
+    stats_done = not want_stats
+    textures_active = False
+    textures_done = not want_textures
+
+    # Inside an obj list: waiting for its header until obj_list_header is set
+    obj_list_active = False
+    obj_list_header = None
+    obj_list_block = -1
+
+    for line in lines:
+        if want_obj_lists:
+            if obj_list_active:
+                if OBJ_LIST_TOTAL_MARKER in line or OBJ_LIST_END_MARKER in line:
+                    obj_list_active = False
+                    obj_list_header = None
+                elif obj_list_header is None:
+                    obj_list_header = parse_obj_list_header(line, obj_list_block)
+                elif line.strip():
+                    row = obj_list_header.parse(line)
+                    if row:
+                        yield row
+                    else:
+                        print(f"Could not parse line: '{line.rstrip()}'")
+                if obj_list_active:
+                    continue
+            elif OBJ_LIST_MARKER in line:
+                obj_list_active = True
+                obj_list_block += 1
+                continue
+        elif stats_done and textures_done:
+            return
+
+        if not stats_done:
+            if stats_active:
+                row = parse_stat_line(line)
+                if row:
+                    yield row
+                else:
+                    stats_active = False
+                    stats_done = True
+            if not stats_done and STATS_MARKER in line:
+                stats_active = True
+
+        if not textures_done:
+            if not textures_active:
+                marker_index = line.find(TEXTURES_MARKER)
+                if marker_index == -1:
+                    continue
+                textures_active = True
+                # The listing starts right after the marker, usually on the next line
+                line = line[marker_index + len(TEXTURES_MARKER):]
+
+            end_index = line.find(TEXTURES_END_MARKER)
+            if end_index != -1:
+                line = line[:end_index]
+                textures_active = False
+                textures_done = True
+
+            line = line.rstrip('\n')
+            if len(line) == 0:
+                continue
+            row = parse_texture_line(line)
+            if row:
+                yield row
+            else:
+                print(f"Could not parse line: '{line}'")
+
+    if not textures_done:
+        raise MissingTexturesError("Failed to extract texture report from memreport")
+
+
+def iter_memreport(source_file, sections=ALL_SECTIONS) -> Iterator[MemReportRow]:
+    """Stream the requested sections of a memreport file, reading it exactly once."""
+    with open_text(source_file, 'r', encoding='utf-8') as file:
+        yield from iter_memreport_lines(file, sections)
@@ -0,0 +1,265 @@
+import os
+import sys
+import argparse
+from collections import defaultdict
+from typing import Callable, List
+
+from FilterUsability import filter_assets, read_asset_list
+from MakeFileHierarchy import PathTrie, write_hierarchy, write_trie
+from MemReportParser import STATS, TEXTURES, MissingTexturesError, StatRow, TextureRow, iter_memreport
+from MemReportToStats import write_stats
+from MemReportToTextures import open_texture_csv
+from Profiling import add_profile_arguments, profile_stage, run
+from TextureTable import CATEGORY_COLUMNS, TextureTable
+
+class Stage:
+    """One consumer of the rows of a single memreport pass.
+
+    start() is called when the pass begins, then add() receives every row of the sections
+    the stage lists, in file order. finish() is called once the report is exhausted and
+    returns the stage's result; abort(error) instead, if the pass fails, to clean up
+    partial output.
+    """
+    sections = ()
+
+    def start(self):
+        pass
+
+    def add(self, row):
+        raise NotImplementedError
+
+    def finish(self):
+        return None
+
+    def abort(self, error):
+        pass
+
+class StatsStage(Stage):
+    """Collects the stats block; optionally writes it as MemReportToStats.py would."""
+    sections = (STATS,)
+
+    def __init__(self, csv_path=None):
+        self.csv_path = csv_path
+        self.stats: List[StatRow] = []
+
+    def add(self, row):
+        self.stats.append(row)
+
+    def finish(self):
+        if self.csv_path:
+            write_stats(self.stats, self.csv_path)
+        return self.stats
+
+    def abort(self, error):
+        # The stats are complete when only the texture listing is missing; after any other
+        # error (I/O, decompression, decoding) they may not be, so nothing is written
+        if isinstance(error, MissingTexturesError):
+            self.finish()
+
+class TextureCsvStage(Stage):
+    """Streams textures to a CSV as MemReportToTextures.py writes it; removed if the pass fails."""
+    sections = (TEXTURES,)
+
+    def __init__(self, csv_path):
+        self.csv_path = csv_path
+        self.csvfile = self.writer = None
+
+    def start(self):
+        # Opened by the pass, so a pipeline that never runs leaves no file behind
+        self.csvfile, self.writer = open_texture_csv(self.csv_path)
+
+    def add(self, row):
+        self.writer.writerow(row)
+
+    def finish(self):
+        self.csvfile.close()
+        print(f"Saved texture report to {self.csv_path}")
+        return self.csv_path
+
+    def abort(self, error):
+        if self.csvfile is not None:
+            self.csvfile.close()
+            os.remove(self.csv_path)
+
+class HierarchyStage(Stage):
+    """Builds the PathTrie directly from parsed rows; optionally writes .hierarchy and .trie files."""
+    sections = (TEXTURES,)
+
+    def __init__(self, hierarchy_path=None, trie_path=None):
+        self.hierarchy_path = hierarchy_path
+        self.trie_path = trie_path
+        self.trie = PathTrie()
+
+    def add(self, row):
+        # The string dict the trie would have read back from the texture CSV. Its repetitive
+        # values are shared between rows, as TextureTable's category columns share them.
+        row_dict = row.to_dict()
+        for name in CATEGORY_COLUMNS:
+            row_dict[name] = sys.intern(row_dict[name])
+        self.trie.insert(row_dict)
+
+    def finish(self):
+        if self.hierarchy_path:
+            with profile_stage('write_json', unit='nodes') as stage:
+                write_hierarchy(self.hierarchy_path, self.trie)
+                stage.items += len(self.trie)
+            print(f"Hierarchical visualization with row info written to {self.hierarchy_path}")
+        if self.trie_path:
+            with profile_stage('write_trie', unit='nodes') as stage:
+                write_trie(self.trie_path, self.trie)
+                stage.items += len(self.trie)
+            print(f"Size-aggregated trie written to {self.trie_path}")
+        return self.trie
+
+class TextureTableStage(Stage):
+    """Collects textures into a TextureTable, for the table-based filters and analyses."""
+    sections = (TEXTURES,)
+
+    def __init__(self):
+        self.table = TextureTable(TextureRow._fields)
+        self._appenders = [self.table.columns[name].append for name in TextureRow._fields]
+
+    def add(self, row):
+        for append, value in zip(self._appenders, row):
+            append(value)
+
+    def finish(self):
+        return self.table
+
+class TotalsStage(Stage):
+    """Sums memsize_kb, disksize_kb and the texture count per value of one texture field."""
+    sections = (TEXTURES,)
+
+    def __init__(self, field='texgroup'):
+        self.field_index = TextureRow._fields.index(field)
+        self.totals = defaultdict(lambda: [0, 0, 0])
+
+    def add(self, row):
+        totals = self.totals[row[self.field_index]]
+        totals[0] += row.memsize_kb
+        totals[1] += row.disksize_kb
+        totals[2] += 1
+
+    def finish(self):
+        return dict(self.totals)
+
+class FilterStage(Stage):
+    """Passes the rows matching predicate on to other stages; finish() returns their results."""
+
+    def __init__(self, predicate: Callable, *stages: Stage):
+        self.predicate = predicate
+        self.stages = stages
+        self.sections = tuple(sorted({section for stage in stages for section in stage.sections}))
+
+    def add(self, row):
+        if self.predicate(row):
+            for stage in self.stages:
+                if _section(row) in stage.sections:
+                    stage.add(row)
+
+    def finish(self):
+        return [stage.finish() for stage in self.stages]
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def abort(self, error):
+        for stage in self.stages:
+            stage.abort(error)
+
+class AssetSplitStage(TextureTableStage):
+    """Splits textures by an asset list and writes both CSVs exactly as FilterUsability.py does."""
+
+    def __init__(self, asset_list_path, used_path, unused_path):
+        super().__init__()
+        self.assets = read_asset_list(asset_list_path)
+        self.used_path = used_path
+        self.unused_path = unused_path
+
+    def finish(self):
+        table = self.table
+        used, unused = filter_assets(table, self.assets)
+        for indices, path in ((used, self.used_path), (unused, self.unused_path)):
+            table.write_csv(path, table.argsort('path', indices))
+        print(f"{len(used)} textures in the asset list written to {self.used_path}, {len(unused)} others to {self.unused_path}")
+        return used, unused
+
+def _section(row) -> str:
+    return STATS if isinstance(row, StatRow) else TEXTURES
+
+def run_pipeline(memreport_path, stages: List[Stage]) -> list:
+    """Parse a memreport once, feeding every row to the stages that want it; return their results.
+
+    Only the sections some stage needs are extracted. If the pass fails (e.g. the texture
+    listing is missing, or the file is truncated) every stage is aborted with the error,
+    which is then re-raised.
+    """
+    sections = tuple(sorted({section for stage in stages for section in stage.sections}))
+    consumers = {section: [stage.add for stage in stages if section in stage.sections] for section in sections}
+    stats_consumers = consumers.get(STATS, [])
+    texture_consumers = consumers.get(TEXTURES, [])
+    try:
+        for stage in stages:
+            stage.start()
+        with profile_stage('parse') as parse_stage:
+            for row in iter_memreport(memreport_path, sections):
+                for add in (stats_consumers if isinstance(row, StatRow) else texture_consumers):
+                    add(row)
+                parse_stage.items += 1
+    except Exception as e:
+        for stage in stages:
+            stage.abort(e)
+        raise
+    return [stage.finish() for stage in stages]
+
+def main(memreport_path, stats_path=None, textures_path=None, hierarchy_path=None, trie_path=None,
+         totals_field=None, assets=None, top=0):
+    stages = []
+    if stats_path:
+        stages.append(StatsStage(stats_path))
+    if textures_path:
+        stages.append(TextureCsvStage(textures_path))
+    hierarchy = HierarchyStage(hierarchy_path, trie_path) if hierarchy_path or trie_path or top else None
+    if hierarchy:
+        stages.append(hierarchy)
+    totals = TotalsStage(totals_field) if totals_field else None
+    if totals:
+        stages.append(totals)
+    if assets:
+        stages.append(AssetSplitStage(*assets))
+    if not stages:
+        print("Nothing to do: name at least one output.")
+        sys.exit(1)
+
+    results = run_pipeline(memreport_path, stages)
+
+    if totals:
+        print(f"Totals by {totals_field}:")
+        for value, (memsize_kb, disksize_kb, count) in sorted(results[stages.index(totals)].items(), key=lambda item: -item[1][0]):
+            print(f"{memsize_kb:>12} KB {disksize_kb:>12} KB {count:>8}  {value}")
+    if hierarchy and top:
+        trie = results[stages.index(hierarchy)]
+        memsize_kb, disksize_kb, count = trie.total('/')
+        print(f"Total: {memsize_kb} KB memory, {disksize_kb} KB disk, {count} textures")
+        for path, memsize_kb, disksize_kb, count in trie.top_directories(top):
+            print(f"{memsize_kb:>12} KB {disksize_kb:>12} KB {count:>8}  {path}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Produce every output of a memreport from a single parse, with no intermediate files.")
+    parser.add_argument("memreport", type=str, help="The .memreport (plain or .gz/.bz2/.xz)")
+    parser.add_argument("--stats", type=str, default=None, help="Write the stats CSV here")
+    parser.add_argument("--textures", type=str, default=None, help="Write the texture CSV here")
+    parser.add_argument("--hierarchy", type=str, default=None, help="Write the nested .hierarchy JSON here")
+    parser.add_argument("--trie", type=str, default=None, help="Write the compact size-aggregated .trie here")
+    parser.add_argument("--totals", type=str, default=None, metavar="FIELD", help="Print texture totals per value of FIELD, e.g. texgroup")
+    parser.add_argument("--assets", type=str, nargs=3, default=None, metavar=("ASSET_LIST", "USED_CSV", "UNUSED_CSV"),
+                        help="Split textures by an asset list, as FilterUsability.py does")
+    parser.add_argument("--top", type=int, default=0, help="Print the N directories using the most memory")
+    add_profile_arguments(parser)
+
+    args = parser.parse_args()
+    if args.totals and args.totals not in TextureRow._fields:
+        parser.error(f"--totals must be one of: {', '.join(TextureRow._fields)}")
+    run('MemReportPipeline', main, args.memreport, args.stats, args.textures, args.hierarchy, args.trie,
+        args.totals, args.assets, args.top, profile_path=args.profile, cprofile_path=args.cprofile)
@@ -1,57 +1,48 @@
-import re
 import csv
 import sys
 import os
+import argparse
 
-def parse_memreport(input_file_path):
-    # Strictly check for '.memreport' extension
-    base, ext = os.path.splitext(input_file_path)
+from CompressedIO import COMPRESSIONS, compression_suffix, open_text, split_compression
+from MemReportParser import STATS, iter_memreport
+from Profiling import add_profile_arguments, profile_iter, profile_stage, run
+
+STATS_CSV_HEADER = ['Memory Usage (MB)', 'Stat Name', 'STAT Group', 'STAT Category', 'Description']
+
+def stats_csv_path(input_file_path, compression=None):
+    # Strictly check for '.memreport' extension (a compressed report keeps it before .gz/.bz2/.xz)
+    base, ext = os.path.splitext(split_compression(input_file_path)[0])
     if ext.lower() != '.memreport':
         print("Error: The input file does not have a '.memreport' extension.")
         sys.exit(1)
-    else:
-        output_csv_path = base + '.stats.csv'
-
-    # Regular expression to match memory usage lines with additional columns, including negative values
-    memory_usage_pattern = re.compile(
-        r'^\s*([-+]?\d*\.?\d+)\s*MB\s*-\s*(.*?)\s*-\s*(.*?)\s*-\s*(.*?)\s*-\s*(.*)$',
-        re.MULTILINE
-    )
-
-    stats = []
-
-    with open(input_file_path, 'r', encoding='utf-8') as file:
-        lines = file.readlines()
-        start_parsing = False
-        for line in lines:
-            if start_parsing:
-                match = memory_usage_pattern.match(line)
-                if match:
-                    memory_value = match.group(1).strip()
-                    stat_name = match.group(2).strip()
-                    stat_group = match.group(3).strip()
-                    stat_category = match.group(4).strip()
-                    description = match.group(5).strip()
-                    stats.append((memory_value, stat_name, stat_group, stat_category, description))
-                else:
-                    break
-            if "AssetRegistry memory usage = " in line:
-                start_parsing = True
-
-    # Sort delta stats by the delta memory usage (high to low)
-    stats.sort(key=lambda x: float(x[0]), reverse=True)
+    return base + '.stats.csv' + compression_suffix(compression)
+
+def write_stats(stats, output_csv_path):
+    # Sort stats by memory usage (high to low)
+    with profile_stage('sort') as stage:
+        stats = sorted(stats, key=lambda x: x.memory_mb, reverse=True)
+        stage.items += len(stats)
 
     # Write the extracted stats to a CSV file
-    with open(output_csv_path, 'w', newline='') as csvfile:
+    with profile_stage('write_csv') as stage, open_text(output_csv_path, 'w', newline='') as csvfile:
         csvwriter = csv.writer(csvfile)
-        csvwriter.writerow(['Memory Usage (MB)', 'Stat Name', 'STAT Group', 'STAT Category', 'Description'])
+        csvwriter.writerow(STATS_CSV_HEADER)
         csvwriter.writerows(stats)
+        stage.items += len(stats)
 
     print(f"Memory usage stats have been written to {output_csv_path}.")
 
+def parse_memreport(input_file_path, compression=None):
+    output_csv_path = stats_csv_path(input_file_path, compression)
+    stats = list(profile_iter(iter_memreport(input_file_path, sections=(STATS,)), 'parse'))
+    write_stats(stats, output_csv_path)
+
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        print("Usage: python parse_memreport.py <input_memreport_file>")
-        sys.exit(1)
-    input_file = sys.argv[1]
-    parse_memreport(input_file)
+    parser = argparse.ArgumentParser(description="Extract the stats block of a UE4 .memreport file and save it as CSV.")
+    parser.add_argument("input_file", type=str, help="Path to the UE4 memreport file (may be .gz/.bz2/.xz compressed)")
+    parser.add_argument("--compress", choices=COMPRESSIONS, default=None, help="Compress the stats CSV")
+    add_profile_arguments(parser)
+
+    args = parser.parse_args()
+    run('MemReportToStats', parse_memreport, args.input_file, args.compress,
+        profile_path=args.profile, cprofile_path=args.cprofile)
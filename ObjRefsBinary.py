@@ -0,0 +1,221 @@
+import os
+import sys
+import mmap
+import struct
+import argparse
+from array import array
+from typing import Dict, Optional, Tuple
+
+from CompressedIO import split_compression
+from ObjRefsQuery import ReferenceIndex, load_index
+from ParseObjRefs import ObjRefsGraph
+
+# File layout: a fixed header, then the sections below in order, each starting on an
+# 8-byte boundary. Section sizes follow from the header counts, so no offsets are stored.
+# Arrays use the writing machine's byte order; files are refused on a machine with another.
+MAGIC = b'OBJREFS\x00'
+VERSION = 1
+HEADER = struct.Struct('=8sHH4xqqq')  # magic, version, byte order, num_objects, num_edges, string_bytes
+BYTE_ORDERS = {'little': 1, 'big': 2}
+
+# name -> (array typecode, count as a function of (num_objects, num_edges, string_bytes))
+SECTIONS = (
+    ('string_offsets', 'q', lambda objects, edges, string_bytes: objects + 1),
+    ('sorted_objects', 'i', lambda objects, edges, string_bytes: objects),
+    ('root_flags', 'B', lambda objects, edges, string_bytes: objects),
+    ('forward_offsets', 'q', lambda objects, edges, string_bytes: objects + 1),
+    ('forward_targets', 'i', lambda objects, edges, string_bytes: edges),
+    ('reverse_offsets', 'q', lambda objects, edges, string_bytes: objects + 1),
+    ('reverse_sources', 'i', lambda objects, edges, string_bytes: edges),
+    ('strings', 'B', lambda objects, edges, string_bytes: string_bytes),
+)
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+def _layout(num_objects: int, num_edges: int, string_bytes: int) -> Tuple[Dict[str, Tuple[int, str, int]], int]:
+    """Return ({section: (offset, typecode, count)}, file size)."""
+    layout = {}
+    offset = HEADER.size
+    for name, typecode, count in SECTIONS:
+        offset = _align(offset)
+        count = count(num_objects, num_edges, string_bytes)
+        layout[name] = (offset, typecode, count)
+        offset += count * array(typecode).itemsize
+    return layout, offset
+
+def is_binary_file(file_path) -> bool:
+    if split_compression(file_path)[1]:
+        return False
+    with open(file_path, 'rb') as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+def write_binary(index: ReferenceIndex, output_path):
+    """Write a ReferenceIndex as a file BinaryReferenceIndex can memory-map."""
+    if split_compression(output_path)[1]:
+        raise ValueError(f"{output_path}: binary graphs are memory-mapped and cannot be compressed")
+    num_objects = len(index.object_ids)
+    encoded = [object_id.encode('utf-8') for object_id in index.object_ids]
+    string_offsets = array('q', bytes(8 * (num_objects + 1)))
+    for i, value in enumerate(encoded):
+        string_offsets[i + 1] = string_offsets[i] + len(value)
+
+    sections = {
+        'string_offsets': string_offsets,
+        # Object indices ordered by their UTF-8 path, for binary search lookups
+        'sorted_objects': array('i', sorted(range(num_objects), key=encoded.__getitem__)),
+        'root_flags': array('B', bytes(num_objects)),
+        'forward_offsets': index._forward_offsets,
+        'forward_targets': index._forward_targets,
+        'reverse_offsets': index._reverse_offsets,
+        'reverse_sources': index._reverse_sources,
+        'strings': b''.join(encoded),
+    }
+    for root in index.roots:
+        sections['root_flags'][root] = 1
+
+    layout, size = _layout(num_objects, index.num_edges, string_offsets[-1])
+    with open(output_path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, BYTE_ORDERS[sys.byteorder], num_objects, index.num_edges, string_offsets[-1]))
+        for name, _, _ in SECTIONS:
+            offset = layout[name][0]
+            file.write(bytes(offset - file.tell()))
+            file.write(sections[name])
+        assert file.tell() == size
+
+def write_graph_binary(graph: ObjRefsGraph, output_path):
+    write_binary(ReferenceIndex.from_graph(graph), output_path)
+
+class StringTable:
+    """Read-only sequence of the object paths stored in a binary graph, decoded on access."""
+
+    def __init__(self, offsets: memoryview, data: memoryview):
+        self._offsets = offsets
+        self._data = data
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index: int) -> str:
+        if not 0 <= index < len(self._offsets) - 1:
+            raise IndexError(index)
+        return str(self._data[self._offsets[index]:self._offsets[index + 1]], 'utf-8')
+
+    def encoded(self, index: int) -> bytes:
+        return self._data[self._offsets[index]:self._offsets[index + 1]].tobytes()
+
+class RootFlags:
+    """Set-like view of the root objects of a binary graph: one byte per object."""
+
+    def __init__(self, flags: memoryview):
+        self._flags = flags
+
+    def __contains__(self, index: int) -> bool:
+        return bool(self._flags[index])
+
+    def __len__(self):
+        return len(self._flags) - self._flags.tobytes().count(0)
+
+class BinaryReferenceIndex(ReferenceIndex):
+    """A ReferenceIndex read in place from a file written by write_binary().
+
+    Opening maps the file and reads only its header; the CSR arrays, the string table and
+    the lookup order are memoryviews over the mapping, paged in as queries touch them.
+    Processes that open the same file share its pages. Lookups by path binary-search the
+    sorted object order instead of building a dict.
+    """
+
+    def __init__(self, file_path):
+        with open(file_path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._mmap) < HEADER.size:
+                raise ValueError(f"{file_path}: not a binary obj refs graph")
+            magic, version, byte_order, num_objects, num_edges, string_bytes = HEADER.unpack_from(self._mmap)
+            if magic != MAGIC:
+                raise ValueError(f"{file_path}: not a binary obj refs graph")
+            if version != VERSION:
+                raise ValueError(f"{file_path}: unsupported binary graph version {version}")
+            if byte_order != BYTE_ORDERS[sys.byteorder]:
+                raise ValueError(f"{file_path}: written on a machine with a different byte order")
+            layout, size = _layout(num_objects, num_edges, string_bytes)
+            if len(self._mmap) < size:
+                raise ValueError(f"{file_path}: truncated binary graph")
+        except ValueError:
+            self._mmap.close()
+            raise
+
+        view = memoryview(self._mmap)
+        self._views = [view]
+        sections = {}
+        for name, (offset, typecode, count) in layout.items():
+            section = view[offset:offset + count * array(typecode).itemsize].cast(typecode)
+            self._views.append(section)
+            sections[name] = section
+
+        self.object_ids = StringTable(sections['string_offsets'], sections['strings'])
+        self._sorted_objects = sections['sorted_objects']
+        self.roots = RootFlags(sections['root_flags'])
+        self.num_edges = num_edges
+        self._forward_offsets = sections['forward_offsets']
+        self._forward_targets = sections['forward_targets']
+        self._reverse_offsets = sections['reverse_offsets']
+        self._reverse_sources = sections['reverse_sources']
+
+    def find(self, object_id: str) -> Optional[int]:
+        key = object_id.encode('utf-8')
+        sorted_objects = self._sorted_objects
+        low, high = 0, len(sorted_objects)
+        while low < high:
+            middle = (low + high) // 2
+            if self.object_ids.encoded(sorted_objects[middle]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(sorted_objects) and self.object_ids.encoded(sorted_objects[low]) == key:
+            return sorted_objects[low]
+        return None
+
+    def close(self):
+        """Unmap the file. Slices returned by references() or referenced_by() must be dropped first."""
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def convert(input_file, output_file):
+    index = load_index(input_file)
+    write_binary(index, output_file)
+    print(f"Binary graph of {len(index.object_ids)} objects and {index.num_edges} references written to {output_file}")
+
+def info(file_path):
+    with BinaryReferenceIndex(file_path) as index:
+        print(f"{file_path}: {len(index.object_ids)} objects, {index.num_edges} references, "
+              f"{len(index.roots)} roots, {os.path.getsize(file_path)} bytes")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Memory-mappable binary format for the references parsed from 'obj refs' logs.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = subparsers.add_parser("convert", help="Write a binary graph from a log or ParseObjRefs JSON/NDJSON")
+    convert_parser.add_argument("input_file", type=str)
+    convert_parser.add_argument("output_file", type=str, help="Binary graph to write (uncompressed)")
+
+    info_parser = subparsers.add_parser("info", help="Print the size of a binary graph")
+    info_parser.add_argument("binary_file", type=str)
+
+    args = parser.parse_args()
+    try:
+        if args.command == "convert":
+            convert(args.input_file, args.output_file)
+        else:
+            info(args.binary_file)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
@@ -0,0 +1,202 @@
+import sys
+import json
+import heapq
+import argparse
+from array import array
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from CompressedIO import open_text
+from ParseObjRefs import NO_OBJECT, ObjRefsGraph, parse_log, read_shared
+
+def _build_offsets(num_objects: int, keys: array) -> array:
+    # keys must be sorted; row i then spans offsets[i]:offsets[i + 1]
+    offsets = array('q', bytes(8 * (num_objects + 1)))
+    for key in keys:
+        offsets[key + 1] += 1
+    for i in range(num_objects):
+        offsets[i + 1] += offsets[i]
+    return offsets
+
+class ReferenceIndex:
+    """Forward and reverse adjacency over the distinct object-to-object references.
+
+    Both directions are stored CSR-style: the neighbours of object i are
+    targets[offsets[i]:offsets[i + 1]]. Roots are the objects that start a reference
+    chain, i.e. the targets of parentless references.
+    """
+
+    def __init__(self, object_ids: List[str], edges: Iterable[Tuple[int, int]], roots: Iterable[int]):
+        self.object_ids = object_ids
+        self._object_index: Dict[str, int] = {object_id: i for i, object_id in enumerate(object_ids)}
+        num_objects = len(object_ids)
+
+        # Encode each edge as a single integer so duplicates can be dropped with one sort
+        encoded = sorted({from_index * num_objects + to_index for from_index, to_index in edges})
+        self.num_edges = len(encoded)
+
+        forward_keys = array('i', (code // num_objects for code in encoded))
+        self._forward_targets = array('i', (code % num_objects for code in encoded))
+        self._forward_offsets = _build_offsets(num_objects, forward_keys)
+
+        reverse = sorted(range(self.num_edges), key=self._forward_targets.__getitem__)
+        self._reverse_sources = array('i', (forward_keys[i] for i in reverse))
+        self._reverse_offsets = _build_offsets(num_objects, array('i', (self._forward_targets[i] for i in reverse)))
+
+        self.roots = frozenset(roots)
+
+    @classmethod
+    def from_graph(cls, graph: ObjRefsGraph) -> 'ReferenceIndex':
+        edges = (
+            (from_index, to_index)
+            for from_index, to_index in zip(graph.ref_from, graph.ref_to)
+            if from_index != NO_OBJECT
+        )
+        roots = (to_index for from_index, to_index in zip(graph.ref_from, graph.ref_to) if from_index == NO_OBJECT)
+        return cls(graph.object_ids, edges, set(roots))
+
+    @classmethod
+    def from_references(cls, references: Iterable[Tuple[str, str]]) -> 'ReferenceIndex':
+        """Build the index from (from_object_id, to_object_id) pairs, '' meaning no parent."""
+        object_ids: List[str] = []
+        object_index: Dict[str, int] = {}
+
+        def intern(object_id):
+            index = object_index.get(object_id)
+            if index is None:
+                index = object_index[object_id] = len(object_ids)
+                object_ids.append(object_id)
+            return index
+
+        edges = []
+        roots = set()
+        for from_object_id, to_object_id in references:
+            to_index = intern(to_object_id)
+            if from_object_id:
+                edges.append((intern(from_object_id), to_index))
+            else:
+                roots.add(to_index)
+        return cls(object_ids, edges, roots)
+
+    def find(self, object_id: str) -> Optional[int]:
+        return self._object_index.get(object_id)
+
+    def _index(self, object_id: str) -> int:
+        index = self.find(object_id)
+        if index is None:
+            raise KeyError(f"Unknown object: {object_id}")
+        return index
+
+    def referenced_by(self, index: int):
+        return self._reverse_sources[self._reverse_offsets[index]:self._reverse_offsets[index + 1]]
+
+    def references(self, index: int):
+        return self._forward_targets[self._forward_offsets[index]:self._forward_offsets[index + 1]]
+
+    def in_degree(self, index: int) -> int:
+        return self._reverse_offsets[index + 1] - self._reverse_offsets[index]
+
+    def referencers(self, object_id: str) -> List[str]:
+        """Return every object holding a reference to object_id."""
+        return [self.object_ids[i] for i in self.referenced_by(self._index(object_id))]
+
+    def shortest_path(self, object_id: str) -> Optional[List[str]]:
+        """Return the shortest chain from any root to object_id, or None if no root reaches it.
+
+        Searches backwards from the object over the reverse edges, so only the part of the
+        graph that can actually retain the object is visited.
+        """
+        target = self._index(object_id)
+        next_hop = {target: NO_OBJECT}
+        queue = deque([target])
+        while queue:
+            index = queue.popleft()
+            if index in self.roots:
+                path = []
+                while index != NO_OBJECT:
+                    path.append(self.object_ids[index])
+                    index = next_hop[index]
+                return path
+            for referencer in self.referenced_by(index):
+                if referencer not in next_hop:
+                    next_hop[referencer] = index
+                    queue.append(referencer)
+        return None
+
+    def most_referenced(self, count: int) -> List[Tuple[str, int]]:
+        """Return the count objects with the most distinct referencers, with their referencer counts."""
+        top = heapq.nlargest(count, range(len(self.object_ids)), key=self.in_degree)
+        return [(self.object_ids[i], self.in_degree(i)) for i in top]
+
+def _iter_json_references(data):
+    for object_node in data['objects'].values():
+        for reference in object_node['references']:
+            yield reference['from_object_id'], reference['to_object_id']
+
+def _iter_ndjson_references(file):
+    for line in file:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if 'object' in record:
+            for reference in record['object']['references']:
+                yield reference['from_object_id'], reference['to_object_id']
+
+# Enough of a file to tell its format apart
+SNIFF_CHARS = 4096
+
+def load_index(input_file) -> ReferenceIndex:
+    """Build a ReferenceIndex from an obj refs log or from any ParseObjRefs output format.
+
+    Binary graphs are memory-mapped rather than loaded.
+    """
+    # Imported here: ObjRefsBinary builds on this module
+    from ObjRefsBinary import BinaryReferenceIndex, is_binary_file
+    if is_binary_file(input_file):
+        return BinaryReferenceIndex(input_file)
+    with open_text(input_file, 'r') as infile:
+        # A fixed-size prefix: compact and shared documents are a single line
+        head = infile.read(SNIFF_CHARS)
+        infile.seek(0)
+        # Logs start with a timestamp, ParseObjRefs output always starts with '{'
+        if not head.startswith('{'):
+            return ReferenceIndex.from_graph(parse_log(input_file).graph)
+        if head.startswith(('{"object"', '{"stack"')):
+            return ReferenceIndex.from_references(_iter_ndjson_references(infile))
+        if head.startswith('{"objects":['):
+            return ReferenceIndex.from_graph(read_shared(json.load(infile)))
+        return ReferenceIndex.from_references(_iter_json_references(json.load(infile)))
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the references parsed from an 'obj refs' log.")
+    parser.add_argument("input_file", type=str, help="obj refs log, or any output of ParseObjRefs.py")
+    subparsers = parser.add_subparsers(dest="query", required=True)
+    referencers_parser = subparsers.add_parser("referencers", help="List every object referencing an object")
+    referencers_parser.add_argument("object_id", type=str)
+    path_parser = subparsers.add_parser("path", help="Shortest chain from a root to an object")
+    path_parser.add_argument("object_id", type=str)
+    top_parser = subparsers.add_parser("top", help="Objects with the most distinct referencers")
+    top_parser.add_argument("count", type=int, nargs="?", default=20)
+    args = parser.parse_args()
+
+    index = load_index(args.input_file)
+    try:
+        if args.query == "referencers":
+            for object_id in index.referencers(args.object_id):
+                print(object_id)
+        elif args.query == "path":
+            path = index.shortest_path(args.object_id)
+            if path is None:
+                print(f"No root references {args.object_id}")
+            else:
+                for depth, object_id in enumerate(path):
+                    print(f"{'  ' * depth}{'-> ' if depth else ''}{object_id}")
+        else:
+            for object_id, referencer_count in index.most_referenced(args.count):
+                print(f"{referencer_count}\t{object_id}")
+    except KeyError as e:
+        print(e.args[0])
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,86 +1,350 @@
+import io
+import os
 import re
 import sys
 import json
-from typing import Dict, List, Optional
+import locale
+import argparse
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
-# Classes for Objects and References (unchanged)
+from CompressedIO import open_text, split_compression
+from Profiling import add_profile_arguments, counted, profile_stage, run
+
+# Lightweight views over ObjRefsGraph entries; the graph itself stores no per-object instances
 class ObjectNode:
-    def __init__(self, object_id: str):
+    __slots__ = ('object_id', 'references')
+
+    def __init__(self, object_id: str, references: Optional[List['Reference']] = None):
         self.object_id = object_id
-        self.references: List[Reference] = []
-        self.attributes = {}
+        self.references: List[Reference] = references if references is not None else []
 
     def to_dict(self):
         return {
             'object_id': self.object_id,
             'references': [ref.to_dict() for ref in self.references],
-            'attributes': self.attributes
+            'attributes': {}
         }
 
 class Reference:
+    __slots__ = ('member_name', 'from_object_id', 'to_object_id')
+
     def __init__(self, member_name: str, from_object_id: str, to_object_id: str):
         self.member_name = member_name
         self.from_object_id = from_object_id
         self.to_object_id = to_object_id
-        self.attributes = {}
 
     def to_dict(self):
         return {
             'member_name': self.member_name,
             'from_object_id': self.from_object_id,
             'to_object_id': self.to_object_id,
-            'attributes': self.attributes
+            'attributes': {}
+        }
+
+NO_OBJECT = -1
+
+class GraphPart(NamedTuple):
+    """The parsed content of an ObjRefsGraph without its lookup tables, for sending between processes."""
+    object_ids: List[str]
+    member_names: List[str]
+    ref_from: array
+    ref_to: array
+    ref_member: array
+    stack_starts: array
+    next_ref: array
+    first_ref: array
+    last_ref: array
+
+class ObjRefsGraph:
+    """Compact store for the references parsed from an 'obj refs' log.
+
+    Object paths and member names are interned to integer IDs, in first-seen order.
+    References are kept in parallel arrays (ref_from, ref_to, ref_member) in the order
+    they were parsed; a reference without a parent has ref_from == NO_OBJECT. Every
+    reference belongs to exactly one stack, and stacks are contiguous runs of
+    references, so a stack is fully described by the index of its first reference.
+    The references to each object are chained through _next_ref, which holds the
+    distance to the next reference of the chain (0 ending it). Relative links stay valid
+    when a graph's arrays are appended to another's, so parts merge without rewriting them.
+    """
+
+    def __init__(self):
+        self.object_ids: List[str] = []
+        self._object_index: Dict[str, int] = {}
+        self.member_names: List[str] = ['']
+        self._member_index: Dict[str, int] = {'': 0}
+
+        self.ref_from = array('i')
+        self.ref_to = array('i')
+        self.ref_member = array('i')
+        self._next_ref = array('q')
+
+        # Per-object head and tail of the reference chain
+        self._first_ref = array('q')
+        self._last_ref = array('q')
+
+        self.stack_starts = array('q')
+
+    def __len__(self):
+        return len(self.ref_to)
+
+    @property
+    def num_objects(self) -> int:
+        return len(self.object_ids)
+
+    def intern_object(self, object_id: str) -> int:
+        index = self._object_index.get(object_id)
+        if index is None:
+            index = self._object_index[object_id] = len(self.object_ids)
+            self.object_ids.append(object_id)
+            self._first_ref.append(-1)
+            self._last_ref.append(-1)
+        return index
+
+    def intern_member(self, member_name: str) -> int:
+        index = self._member_index.get(member_name)
+        if index is None:
+            index = self._member_index[member_name] = len(self.member_names)
+            self.member_names.append(member_name)
+        return index
+
+    def find_object(self, object_id: str) -> Optional[int]:
+        return self._object_index.get(object_id)
+
+    def last_object(self) -> int:
+        """Return the target of the most recent reference, i.e. the parent of the next one."""
+        return self.ref_to[-1] if self.ref_to else NO_OBJECT
+
+    def add_reference(self, member_name: str, to_object_id: str, new_stack: bool = False) -> int:
+        """Append a reference from the previous reference's target to to_object_id.
+
+        A new stack is started when new_stack is set (root nodes, which have no parent)
+        or when this is the very first reference.
+        """
+        to_index = self.intern_object(to_object_id)
+        ref_index = len(self.ref_to)
+        if new_stack or ref_index == 0:
+            self.stack_starts.append(ref_index)
+        self.ref_from.append(NO_OBJECT if new_stack else self.last_object())
+        self.ref_to.append(to_index)
+        self.ref_member.append(self.intern_member(member_name))
+        self._next_ref.append(0)
+
+        last_ref = self._last_ref[to_index]
+        if last_ref == -1:
+            self._first_ref[to_index] = ref_index
+        else:
+            self._next_ref[last_ref] = ref_index - last_ref
+        self._last_ref[to_index] = ref_index
+        return ref_index
+
+    def part(self) -> GraphPart:
+        return GraphPart(self.object_ids, self.member_names, self.ref_from, self.ref_to, self.ref_member, self.stack_starts,
+                         self._next_ref, self._first_ref, self._last_ref)
+
+    def extend(self, part: GraphPart):
+        """Append the references of a graph parsed from the log text that follows this one.
+
+        The part must start with a new stack (a root node line), as chunks produced by
+        find_chunk_starts() do. Its objects and members are re-interned in their
+        first-seen order, so the merged graph is the one a single parse would build.
+        Reference chains are spliced per object: the part's own links are relative and
+        are appended unchanged.
+        """
+        if not part.ref_to:
+            return
+        base = len(self.ref_to)
+        if not base:
+            # Nothing to re-intern into: the part becomes the graph
+            self.object_ids.extend(part.object_ids)
+            self._object_index.update((object_id, i) for i, object_id in enumerate(part.object_ids))
+            self.member_names[:] = part.member_names
+            self._member_index.update((member_name, i) for i, member_name in enumerate(part.member_names))
+            for name, values in zip(('ref_from', 'ref_to', 'ref_member', 'stack_starts', '_next_ref', '_first_ref', '_last_ref'),
+                                    part[2:]):
+                getattr(self, name).extend(values)
+            return
+
+        # Re-intern the part's objects in bulk: most of the merge time goes to interning
+        object_index = self._object_index
+        object_ids = self.object_ids
+        first_ref = self._first_ref
+        last_ref = self._last_ref
+        next_ref = self._next_ref
+        found = list(map(object_index.get, part.object_ids))
+        new = [i for i, index in enumerate(found) if index is None]
+        new_indices = range(len(object_ids), len(object_ids) + len(new))
+        if new:
+            part_ids = part.object_ids
+            object_ids.extend(part_ids[i] for i in new)
+            object_index.update(zip(object_ids[new_indices.start:], new_indices))
+            first_ref.extend(array('q', [base + part.first_ref[i] for i in new]))
+            last_ref.extend(array('q', [base + part.last_ref[i] for i in new]))
+        # Objects already in the graph get the part's chain linked after their last reference
+        for index, part_first, part_last in zip(found, part.first_ref, part.last_ref):
+            if index is not None:
+                previous = last_ref[index]
+                next_ref[previous] = base + part_first - previous
+                last_ref[index] = base + part_last
+        # New objects were numbered in the part's order
+        new_index = iter(new_indices)
+        object_map = [index if index is not None else next(new_index) for index in found]
+        member_map = [self.intern_member(member_name) for member_name in part.member_names]
+
+        ref_to = array('i', [object_map[i] for i in part.ref_to])
+        # A reference comes from the previous one's target, except at stack starts
+        ref_from = array('i', [NO_OBJECT]) + ref_to[:-1]
+        for start in part.stack_starts:
+            ref_from[start] = NO_OBJECT
+        self.ref_from.extend(ref_from)
+        self.ref_to.extend(ref_to)
+        self.ref_member.extend(array('i', [member_map[i] for i in part.ref_member]))
+        self.stack_starts.extend(array('q', [base + start for start in part.stack_starts]))
+        self._next_ref.extend(part.next_ref)
+
+    def references_to(self, object_index: int):
+        """Yield the indexes of the references to an object, in parse order."""
+        ref_index = self._first_ref[object_index]
+        if ref_index == -1:
+            return
+        next_ref = self._next_ref
+        while True:
+            yield ref_index
+            step = next_ref[ref_index]
+            if not step:
+                return
+            ref_index += step
+
+    def stack_ranges(self):
+        """Yield (start, stop) reference index ranges, one per stack."""
+        starts = self.stack_starts
+        for i in range(len(starts)):
+            yield starts[i], starts[i + 1] if i + 1 < len(starts) else len(self.ref_to)
+
+    def reference(self, ref_index: int) -> Reference:
+        from_index = self.ref_from[ref_index]
+        return Reference(
+            member_name=self.member_names[self.ref_member[ref_index]],
+            from_object_id=self.object_ids[from_index] if from_index != NO_OBJECT else '',
+            to_object_id=self.object_ids[self.ref_to[ref_index]]
+        )
+
+    def object_node(self, object_index: int) -> ObjectNode:
+        return ObjectNode(self.object_ids[object_index], [self.reference(i) for i in self.references_to(object_index)])
+
+    def reference_dict(self, ref_index: int):
+        return self.reference(ref_index).to_dict()
+
+    def object_dict(self, object_index: int):
+        return {
+            'object_id': self.object_ids[object_index],
+            'references': [self.reference_dict(i) for i in self.references_to(object_index)],
+            'attributes': {}
+        }
+
+    def stack_dicts(self, start: int, stop: int):
+        return [self.reference_dict(i) for i in range(start, stop)]
+
+    def to_dict(self):
+        return {
+            'objects': {object_id: self.object_dict(index) for index, object_id in enumerate(self.object_ids)},
+            'stacks': [self.stack_dicts(start, stop) for start, stop in self.stack_ranges()]
         }
 
-# Data structures (unchanged)
-objects: Dict[str, ObjectNode] = {}
-stacks: List[List[Reference]] = []
-current_stack: List[Reference] = []
+class StackTrie:
+    """The stacks of an ObjRefsGraph as a hash-consed prefix tree.
+
+    A node is a (parent node, object, member) triple and is stored once however many
+    stacks pass through it, so stacks sharing a chain prefix share its nodes and each
+    stack is just its leaf node. Following parents from a leaf back to the root node
+    (parent NO_NODE) gives the stack's references in reverse; a node's reference comes
+    from its parent's object, or from nothing for a root node.
+    """
+
+    NO_NODE = -1
+
+    def __init__(self):
+        self.node_parent = array('i')
+        self.node_object = array('i')
+        self.node_member = array('i')
+        self.stack_leaves = array('i')
+        self._nodes: Dict[int, int] = {}
+
+    def __len__(self):
+        return len(self.node_object)
+
+    def intern(self, parent: int, object_index: int, member_index: int) -> int:
+        # One int per key is far smaller than a tuple; object and member indices fit 32 bits
+        key = (parent + 1) << 64 | object_index << 32 | member_index
+        node = self._nodes.get(key)
+        if node is None:
+            node = self._nodes[key] = len(self.node_object)
+            self.node_parent.append(parent)
+            self.node_object.append(object_index)
+            self.node_member.append(member_index)
+        return node
+
+    @classmethod
+    def from_graph(cls, graph: 'ObjRefsGraph') -> 'StackTrie':
+        # Every stack starts with a parentless reference, so its first node is a root node
+        trie = cls()
+        intern = trie.intern
+        ref_to = graph.ref_to
+        ref_member = graph.ref_member
+        for start, stop in graph.stack_ranges():
+            node = cls.NO_NODE
+            for ref_index in range(start, stop):
+                node = intern(node, ref_to[ref_index], ref_member[ref_index])
+            trie.stack_leaves.append(node)
+        return trie
+
+    def path(self, leaf: int) -> List[int]:
+        """Return the nodes from the root node down to leaf."""
+        nodes = []
+        while leaf != self.NO_NODE:
+            nodes.append(leaf)
+            leaf = self.node_parent[leaf]
+        nodes.reverse()
+        return nodes
 
 # Regular expressions to parse the log lines
-timestamp_regex = r'^\[\d{4}\.\d{2}\.\d{2}-\d{2}\.\d{2}\.\d{2}:\d{3}\]\[\d+\]\s*'
-arrow_line_regex = re.compile(
-    timestamp_regex + r'([->^]+)\s*(.*)'
-)
-reference_line_regex = re.compile(
-    timestamp_regex + r'(.*?)\s*=\s*(\w+)\s+(.*)'
-)
-root_node_regex = re.compile(
-    timestamp_regex + r'(?:\([^\)]*\)\s*)?(.*)'
-)
-
-# Function to check if a line represents a function (now refined)
+timestamp_regex = re.compile(r'^\[\d{4}\.\d{2}\.\d{2}-\d{2}\.\d{2}\.\d{2}:\d{3}\]\[\d+\]\s*')
+# Function signatures often end with '::FunctionName(' or 'FunctionName('. Only the existence
+# of a match matters, so '(?:\w+::)?\w+\s*\(.*\)' reduces to a single word character before '('.
+function_regex = re.compile(r'\w\s*\(.*\)')
+reference_regex = re.compile(r'(.*?)\s*=\s*(\w+)\s+(.*)')
+object_id_regex = re.compile(r'(?:[\w<>]+\s+)?(\/[^\s]+)')
+
+ARROW_CHARS = '->^'
+
+# Function to check if a line represents a function
 def is_function_reference(content: str) -> bool:
     # Check if content contains a function signature
-    # Function signatures often end with '::FunctionName(' or 'FunctionName('
-    function_pattern = r'(?:\w+::)?\w+\s*\(.*\)'
-    if re.search(function_pattern, content):
-        return True
-    else:
-        return False
+    return '(' in content and ')' in content and function_regex.search(content) is not None
 
 # Function to extract object ID and member name from a line
 def extract_reference(line: str) -> Optional[Reference]:
     # Remove timestamp for simplicity
-    line_content = re.sub(timestamp_regex, '', line)
+    line_content = strip_timestamp(line)[0]
     if is_function_reference(line_content):
         return None  # Skip function references
+    match = _match_reference(line_content)
+    if match:
+        member_name, object_id = match
+        return Reference(member_name=member_name, from_object_id='', to_object_id=object_id)
+    return None
 
+def _match_reference(line_content: str) -> Optional[Tuple[str, str]]:
     # Match assignment lines
-    match = re.match(r'(.*?)\s*=\s*(\w+)\s+(.*)', line_content)
+    if '=' not in line_content:
+        return None
+    match = reference_regex.match(line_content)
     if match:
-        member_info = match.group(1).strip()
-        object_type = match.group(2).strip()
-        object_path = match.group(3).strip()
-
-        # The object ID is the object path
-        object_id = object_path
-
-        # Member name is extracted properly, even if it contains '::'
-        member_name = member_info
-
-        # Return a Reference instance
-        return Reference(member_name=member_name, from_object_id='', to_object_id=object_id)
+        # Member name is extracted properly, even if it contains '::'; the object ID is the object path
+        return match.group(1).strip(), match.group(3).strip()
     else:
         # Could not extract a reference
         return None
@@ -88,133 +352,323 @@ def extract_reference(line: str) -> Optional[Reference]:
 def extract_object_id(content: str) -> Optional[str]:
     if is_function_reference(content):
         return None  # Skip function references
+    return _match_object_id(content)
 
+def _match_object_id(content: str) -> Optional[str]:
     # Attempt to extract object path after object type
-    match = re.match(r'(?:[\w<>]+\s+)?(\/[^\s]+)', content)
+    if '/' not in content:
+        return None
+    match = object_id_regex.match(content)
     if match:
-        object_id = match.group(1).strip()
-        return object_id
+        return match.group(1).strip()
     else:
         return None
 
-def process_line(line):
-    global current_stack
+def strip_timestamp(line: str):
+    """Return (content, has_timestamp) for a stripped log line."""
+    if line.startswith('['):
+        match = timestamp_regex.match(line)
+        if match:
+            return line[match.end():], True
+    return line, False
+
+def _root_object_id(line_content: str) -> Optional[str]:
+    # Match root node lines, skipping an optional '(root)'-style prefix
+    content = line_content
+    if content.startswith('('):
+        close_index = content.find(')')
+        if close_index != -1:
+            content = content[close_index + 1:]
+    return _match_object_id(content.strip())
+
+def is_root_line(line: str) -> bool:
+    """Return True for a root node line, which starts a new stack whatever was parsed before it."""
+    line_content, has_timestamp = strip_timestamp(line.strip())
+    if not has_timestamp or not line_content or line_content[0] in ARROW_CHARS:
+        return False
+    if is_function_reference(line_content) or _match_reference(line_content):
+        return False
+    return _root_object_id(line_content) is not None
+
+class ObjRefsParser:
+    """Incremental parser for 'obj refs' logs.
+
+    Each instance fills its own ObjRefsGraph, so several logs can be parsed in the same
+    process. Feed it whole lines with feed_line() or arbitrary text with feed(), then
+    call close() once the log is exhausted.
+    """
+
+    def __init__(self):
+        self.graph = ObjRefsGraph()
+        self._pending = ''
+
+    def feed(self, chunk: str):
+        # Lines may straddle chunks; keep the unterminated tail for the next call
+        lines = (self._pending + chunk).split('\n')
+        self._pending = lines.pop()
+        for line in lines:
+            self.feed_line(line)
+
+    def feed_lines(self, lines):
+        for line in lines:
+            self.feed_line(line)
+
+    def close(self):
+        if self._pending:
+            self.feed_line(self._pending)
+            self._pending = ''
+
+    def feed_line(self, line: str):
+        line = line.strip()
+        if not line:
+            return
+
+        # Remove timestamp once for all the checks below
+        line_content, has_timestamp = strip_timestamp(line)
+
+        # First, check if the line represents a function reference
+        if is_function_reference(line_content):
+            return  # Skip function references
+
+        # Try to extract a reference line; its parent is the previous reference's target
+        reference = _match_reference(line_content)
+        if reference:
+            self.graph.add_reference(*reference)
+            return
+
+        # Arrow and root node lines are only recognised after a timestamp
+        if not has_timestamp or not line_content:
+            return
+
+        if line_content[0] in ARROW_CHARS:
+            # Match arrow lines
+            object_id = _match_object_id(line_content.lstrip(ARROW_CHARS).strip())
+            if object_id:
+                # Create a reference from previous object to current object, or start a new stack
+                self.graph.add_reference('', object_id)
+            return
 
-    line = line.strip()
-    if not line:
-        return
+        object_id = _root_object_id(line_content)
+        if object_id:
+            # Start a new stack with a parentless reference for the root object
+            self.graph.add_reference('', object_id, new_stack=True)
 
-    # Remove timestamp for simplicity
-    line_content = re.sub(timestamp_regex, '', line)
+    def to_dict(self):
+        return self.graph.to_dict()
+
+# Parallel parsing splits the log into at least this many chunks per worker, of at most CHUNK_BYTES
+CHUNKS_PER_WORKER = 4
+CHUNK_BYTES = 64 * 1024 * 1024
+
+def find_chunk_starts(log_file, chunk_count: int) -> List[int]:
+    """Return byte offsets splitting a log into up to chunk_count chunks, each after the first starting at a root node line.
+
+    Root node lines do not depend on anything parsed before them, so each chunk can be
+    parsed on its own. Offsets are searched for from evenly spaced positions; a region
+    without root lines just yields fewer, larger chunks.
+    """
+    size = os.path.getsize(log_file)
+    encoding = locale.getpreferredencoding(False)
+    starts = [0]
+    scanned = 0
+    with open(log_file, 'rb') as file:
+        for i in range(1, chunk_count):
+            offset = size * i // chunk_count
+            if offset < scanned:
+                continue
+            file.seek(offset)
+            file.readline()  # Skip to the start of the next line
+            while True:
+                position = file.tell()
+                line = file.readline()
+                if not line:
+                    return starts
+                if is_root_line(line.decode(encoding, errors='replace')):
+                    starts.append(position)
+                    scanned = position + len(line)
+                    break
+    return starts
+
+def _parse_chunk(log_file, start: int, stop: int) -> Tuple[GraphPart, int]:
+    with open(log_file, 'rb') as file:
+        file.seek(start)
+        data = file.read(stop - start)
+    parser = ObjRefsParser()
+    line_count = 0
+    # Same decoding and newline handling as open() in the serial parse
+    for line_count, line in enumerate(io.TextIOWrapper(io.BytesIO(data)), start=1):
+        parser.feed_line(line)
+    return parser.graph.part(), line_count
+
+def parse_log(log_file, workers: int = 1) -> ObjRefsParser:
+    """Parse an obj refs log, on up to `workers` processes for uncompressed logs.
+
+    A parallel parse splits the log at root node lines, parses the chunks in a process
+    pool and merges them in file order, so the graph is identical to a serial parse.
+    Workers chain their own references; merging re-interns each part's objects and
+    members and links chains per object, and overlaps with the parsing of later chunks.
+    Compressed logs cannot be split and are always parsed serially.
+    """
+    if workers > 1 and not split_compression(log_file)[1]:
+        size = os.path.getsize(log_file)
+        starts = find_chunk_starts(log_file, max(workers * CHUNKS_PER_WORKER, size // CHUNK_BYTES))
+        if len(starts) > 1:
+            parser = ObjRefsParser()
+            with profile_stage('parse', unit='lines') as stage, ProcessPoolExecutor(max_workers=workers) as executor:
+                for part, line_count in executor.map(_parse_chunk, repeat(log_file), starts, starts[1:] + [size]):
+                    parser.graph.extend(part)
+                    stage.items += line_count
+            return parser
+
+    parser = ObjRefsParser()
+    with profile_stage('parse', unit='lines') as stage, open_text(log_file, 'r') as file:
+        parser.feed_lines(counted(file, stage))
+        parser.close()
+    return parser
+
+# Output formats accepted by write_graph
+OUTPUT_FORMATS = ('json', 'compact', 'ndjson', 'shared', 'binary')
+
+COMPACT_SEPARATORS = (',', ':')
+
+def _write_json_container(out, open_char, close_char, items, indent):
+    # Writes one JSON object or array whose members are produced lazily by items
+    first = True
+    for item in items:
+        out.write(open_char if first else ',')
+        first = False
+        if indent is not None:
+            out.write('\n' + ' ' * (2 * indent))
+        out.write(item)
+    if first:
+        out.write(open_char + close_char)
+    elif indent is not None:
+        out.write('\n' + ' ' * indent + close_char)
+    else:
+        out.write(close_char)
 
-    # First, check if the line represents a function reference
-    if is_function_reference(line_content):
-        return  # Skip function references
-
-    # Try to extract a reference line
-    reference = extract_reference(line)
-    if reference:
-        # Add object if not already added
-        if reference.to_object_id not in objects:
-            objects[reference.to_object_id] = ObjectNode(object_id=reference.to_object_id)
-
-        # Set from_object_id based on current stack
-        if current_stack:
-            previous_reference = current_stack[-1]
-            reference.from_object_id = previous_reference.to_object_id
-        else:
-            reference.from_object_id = ''  # No parent
+def write_json(graph: ObjRefsGraph, out, indent: Optional[int] = 4):
+    """Stream the graph as the {'objects': ..., 'stacks': ...} document, one object or stack at a time.
 
-        # Add reference to object
-        objects[reference.to_object_id].references.append(reference)
-        current_stack.append(reference)
+    With indent=4 the output is identical to json.dump(graph.to_dict(), out, indent=4);
+    with indent=None it is written without any whitespace.
+    """
+    if indent is None:
+        dumps = lambda value: json.dumps(value, separators=COMPACT_SEPARATORS)
+        key_separator = ':'
     else:
-        # Match arrow lines
-        arrow_match = arrow_line_regex.match(line)
-        if arrow_match:
-            arrow_type = arrow_match.group(1).strip()
-            content = arrow_match.group(2).strip()
-
-            object_id = extract_object_id(content)
-            if object_id:
-                # Add object if not already added
-                if object_id not in objects:
-                    objects[object_id] = ObjectNode(object_id=object_id)
-
-                # Create a reference from previous object to current object
-                if current_stack:
-                    previous_reference = current_stack[-1]
-                    parent_object_id = previous_reference.to_object_id
-                    reference = Reference(member_name='', from_object_id=parent_object_id, to_object_id=object_id)
-                    objects[object_id].references.append(reference)
-                    current_stack.append(reference)
-                else:
-                    # No parent object; start a new stack
-                    reference = Reference(member_name='', from_object_id='', to_object_id=object_id)
-                    objects[object_id].references.append(reference)
-                    current_stack.append(reference)
-            else:
-                # Unable to extract object ID
-                pass
+        # Members sit two levels deep, so nested lines need two extra levels of indentation
+        nested_indent = '\n' + ' ' * (2 * indent)
+        dumps = lambda value: json.dumps(value, indent=indent).replace('\n', nested_indent)
+        key_separator = ': '
+
+    objects = (
+        json.dumps(object_id) + key_separator + dumps(graph.object_dict(index))
+        for index, object_id in enumerate(graph.object_ids)
+    )
+    stacks = (dumps(graph.stack_dicts(start, stop)) for start, stop in graph.stack_ranges())
+
+    newline = '' if indent is None else '\n' + ' ' * indent
+    out.write('{' + newline + '"objects"' + key_separator)
+    _write_json_container(out, '{', '}', objects, indent)
+    out.write(',' + newline + '"stacks"' + key_separator)
+    _write_json_container(out, '[', ']', stacks, indent)
+    out.write('' if indent is None else '\n')
+    out.write('}')
+
+def write_ndjson(graph: ObjRefsGraph, out):
+    """Write one JSON document per line: {"object": ...} for each object, then {"stack": [...]} for each stack."""
+    for index in range(graph.num_objects):
+        out.write(json.dumps({'object': graph.object_dict(index)}, separators=COMPACT_SEPARATORS))
+        out.write('\n')
+    for start, stop in graph.stack_ranges():
+        out.write(json.dumps({'stack': graph.stack_dicts(start, stop)}, separators=COMPACT_SEPARATORS))
+        out.write('\n')
+
+def write_shared(graph: ObjRefsGraph, out):
+    """Write the graph with its stacks deduplicated through a StackTrie, without whitespace.
+
+    The document is {"objects": [path, ...], "members": [name, ...], "nodes": [[parent,
+    object, member], ...], "stacks": [leaf node, ...]}, all cross-references being list
+    indices. Objects are listed in the order the other formats use. Each object's
+    reference list is not stored: it is every occurrence of a node with that object
+    along the stacks, in stack order, which read_shared() rebuilds.
+    """
+    trie = StackTrie.from_graph(graph)
+    dumps = json.dumps
+    out.write('{"objects":')
+    _write_json_container(out, '[', ']', map(dumps, graph.object_ids), None)
+    out.write(',"members":')
+    _write_json_container(out, '[', ']', map(dumps, graph.member_names), None)
+    out.write(',"nodes":')
+    _write_json_container(out, '[', ']', (
+        f'[{parent},{object_index},{member}]'
+        for parent, object_index, member in zip(trie.node_parent, trie.node_object, trie.node_member)
+    ), None)
+    out.write(',"stacks":')
+    _write_json_container(out, '[', ']', map(str, trie.stack_leaves), None)
+    out.write('}')
+
+def read_shared(data) -> ObjRefsGraph:
+    """Rebuild the ObjRefsGraph a 'shared' document was written from."""
+    object_ids = data['objects']
+    member_names = data['members']
+    nodes = data['nodes']
+    graph = ObjRefsGraph()
+    for leaf in data['stacks']:
+        path = []
+        while leaf != StackTrie.NO_NODE:
+            path.append(nodes[leaf])
+            leaf = nodes[leaf][0]
+        new_stack = True
+        for _, object_index, member in reversed(path):
+            graph.add_reference(member_names[member], object_ids[object_index], new_stack)
+            new_stack = False
+    return graph
+
+def write_graph(graph: ObjRefsGraph, output_file, output_format='json'):
+    if output_format == 'binary':
+        # Imported here: the binary format is built on ObjRefsQuery, which imports this module
+        from ObjRefsBinary import write_graph_binary
+        with profile_stage('write_binary', unit='references') as stage:
+            stage.items += len(graph)
+            write_graph_binary(graph, output_file)
+        return
+    with profile_stage('write_' + output_format, unit='references') as stage, open_text(output_file, 'w') as out_file:
+        stage.items += len(graph)
+        if output_format == 'ndjson':
+            write_ndjson(graph, out_file)
+        elif output_format == 'shared':
+            write_shared(graph, out_file)
         else:
-            # Match root node lines
-            root_match = root_node_regex.match(line)
-            if root_match:
-                content = root_match.group(1).strip()
-
-                object_id = extract_object_id(content)
-                if object_id:
-                    # Start a new stack
-                    if current_stack:
-                        stacks.append(current_stack)
-                    current_stack = []
-
-                    # Add object if not already added
-                    if object_id not in objects:
-                        objects[object_id] = ObjectNode(object_id=object_id)
-                    # No parent in root node
-                    previous_object_id = None
-
-                    # Create a reference for the root object
-                    reference = Reference(member_name='', from_object_id='', to_object_id=object_id)
-                    objects[object_id].references.append(reference)
-                    current_stack.append(reference)
-                else:
-                    # Unable to extract object ID
-                    pass
-            else:
-                # Line didn't match any expected patterns; skip
-                pass
+            write_json(graph, out_file, indent=None if output_format == 'compact' else 4)
 
 def main():
-    if len(sys.argv) != 3:
-        print("Usage: python script.py <log_file> <output_json_file>")
-        sys.exit(1)
-
-    log_file = sys.argv[1]
-    output_file = sys.argv[2]
+    arg_parser = argparse.ArgumentParser(description="Parse an 'obj refs' log into objects and reference stacks.")
+    arg_parser.add_argument("log_file", type=str, help="Path to the obj refs log")
+    arg_parser.add_argument("output_file", type=str, help="Path of the JSON (or binary) file to write")
+    arg_parser.add_argument("--format", choices=OUTPUT_FORMATS, default='json',
+                            help="json: indented document (default), compact: document without whitespace, ndjson: one object or stack per line, "
+                                 "shared: compact document with stacks stored once per distinct prefix, "
+                                 "binary: memory-mappable reference index for ObjRefsQuery.py (distinct references and roots only)")
+    arg_parser.add_argument("-j", "--workers", type=int, default=1,
+                            help="Parse an uncompressed log on this many processes (default: 1)")
+    add_profile_arguments(arg_parser)
+    args = arg_parser.parse_args()
+    if args.format == 'binary' and split_compression(args.output_file)[1]:
+        arg_parser.error("binary output is memory-mapped and cannot be compressed")
+
+    log_file = args.log_file
+    output_file = args.output_file
+
+    def parse_and_write():
+        parser = parse_log(log_file, args.workers)
+
+        # Stream the objects and stacks to the output file
+        write_graph(parser.graph, output_file, args.format)
 
     try:
-        with open(log_file, 'r') as file:
-            for line in file:
-                process_line(line)
-
-        # Add the last stack if not empty
-        if current_stack:
-            stacks.append(current_stack)
-
-        # Prepare data for JSON serialization
-        data = {
-            'objects': {object_id: obj_node.to_dict() for object_id, obj_node in objects.items()},
-            'stacks': [
-                [ref.to_dict() for ref in stack]
-                for stack in stacks
-            ]
-        }
-
-        # Write to JSON file
-        with open(output_file, 'w') as out_file:
-            json.dump(data, out_file, indent=4)
+        run('ParseObjRefs', parse_and_write, profile_path=args.profile, cprofile_path=args.cprofile)
 
         print(f"Data structures have been written to {output_file}")
 
@@ -0,0 +1,240 @@
+import os
+import sys
+import json
+import time
+import resource
+import cProfile
+from datetime import datetime, timezone
+
+PROFILE_FLAG = '--profile'
+CPROFILE_FLAG = '--cprofile'
+
+def peak_rss_mb():
+    """Peak resident set size of this process, in MB."""
+    # On Linux ru_maxrss survives fork+exec, so a spawned child would report its parent's
+    # peak; VmHWM belongs to the current address space only
+    try:
+        with open('/proc/self/status', 'r') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def _reset_peak_rss():
+    # Linux 4.0+: writing 5 to clear_refs resets VmHWM, so each stage gets its own peak
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+        return True
+    except OSError:
+        return False
+
+class Stage:
+    """Timing record for one stage. Code inside the stage adds to items as it works.
+
+    within names the stage that was open when this one started; its time includes this one's.
+    """
+
+    def __init__(self, name, unit, within=None):
+        self.name = name
+        self.unit = unit
+        self.within = within
+        self.items = 0
+        self.seconds = 0.0
+        self.peak_rss_mb = 0.0
+        self._children_peak_rss_mb = 0.0
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'seconds': round(self.seconds, 6),
+            'items': self.items,
+            'unit': self.unit,
+            'items_per_second': round(self.items / self.seconds, 1) if self.items and self.seconds else None,
+            'peak_rss_mb': round(self.peak_rss_mb, 1),
+            'within': self.within,
+        }
+
+class _NullStage:
+    # Stands in for Stage when profiling is off, so instrumented code needs no checks
+    __slots__ = ()
+    items = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+NULL_STAGE = _NullStage()
+
+class _StageContext:
+    def __init__(self, profiler, stage):
+        self.profiler = profiler
+        self.stage = stage
+
+    def __enter__(self):
+        profiler = self.profiler
+        # The reset below loses the peak so far: credit it to the open stages and the run first
+        peak = peak_rss_mb()
+        for stage in profiler._open:
+            stage.peak_rss_mb = max(stage.peak_rss_mb, peak)
+        profiler._peak_rss_mb = max(profiler._peak_rss_mb, peak)
+        profiler._open.append(self.stage)
+        profiler._peak_resets = _reset_peak_rss()
+        self._start = time.perf_counter()
+        return self.stage
+
+    def __exit__(self, *exc_info):
+        stage = self.stage
+        stage.seconds += time.perf_counter() - self._start
+        stage.peak_rss_mb = max(stage.peak_rss_mb, peak_rss_mb(), stage._children_peak_rss_mb)
+        self.profiler._open.pop()
+        if self.profiler._open:
+            parent = self.profiler._open[-1]
+            parent._children_peak_rss_mb = max(parent._children_peak_rss_mb, stage.peak_rss_mb)
+        return False
+
+class Profiler:
+    """Collects named stages for one tool run and writes them as a JSON sidecar."""
+
+    def __init__(self, tool):
+        self.tool = tool
+        self.stages = []
+        self._open = []
+        self._peak_resets = False
+        self._peak_rss_mb = 0.0  # Peak up to the last reset
+        self.started = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+
+    def record(self, name, unit='rows'):
+        # Stages of the same name (e.g. one per input file) accumulate into one record
+        for stage in self.stages:
+            if stage.name == name and stage not in self._open:
+                return stage
+        stage = Stage(name, unit, self._open[-1].name if self._open else None)
+        self.stages.append(stage)
+        return stage
+
+    def stage(self, name, unit='rows'):
+        return _StageContext(self, self.record(name, unit))
+
+    def to_dict(self):
+        return {
+            'tool': self.tool,
+            'argv': sys.argv[1:],
+            'started': self.started.isoformat(timespec='seconds'),
+            'wall_seconds': round(time.perf_counter() - self._start, 6),
+            'peak_rss_mb': round(max([peak_rss_mb(), self._peak_rss_mb] + [stage.peak_rss_mb for stage in self.stages]), 1),
+            'per_stage_peak_rss': self._peak_resets,
+            'stages': [stage.to_dict() for stage in self.stages],
+        }
+
+    def write(self, profile_path):
+        # A directory collects one timestamped file per run, ready to be graphed over time
+        if os.path.isdir(profile_path):
+            file_name = f"{self.tool}-{self.started.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}.json"
+            profile_path = os.path.join(profile_path, file_name)
+        with open(profile_path, 'w') as outfile:
+            json.dump(self.to_dict(), outfile, indent=4)
+        return profile_path
+
+_active_profiler = None
+
+def profile_stage(name, unit='rows'):
+    """Context manager timing a stage of the active profiler; a no-op when profiling is off."""
+    if _active_profiler is None:
+        return NULL_STAGE
+    return _active_profiler.stage(name, unit)
+
+def profile_iter(iterable, name, unit='rows'):
+    """Pass iterable through, timing only the work done to produce its items as stage name.
+
+    This splits a streaming loop into its producer (e.g. reading and regex matching) and the
+    enclosing stage that consumes the items (e.g. CSV writing).
+    """
+    if _active_profiler is None:
+        return iterable
+    return _timed(iter(iterable), _active_profiler.record(name, unit))
+
+def _timed(iterator, stage):
+    clock = time.perf_counter
+    while True:
+        start = clock()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            stage.seconds += clock() - start
+            break
+        stage.seconds += clock() - start
+        stage.items += 1
+        yield item
+    stage.peak_rss_mb = max(stage.peak_rss_mb, peak_rss_mb())
+
+def counted(iterable, stage):
+    """Pass iterable through, adding one to stage.items per item (untouched when profiling is off)."""
+    if stage is NULL_STAGE:
+        return iterable
+    return _count(iterable, stage)
+
+def _count(iterable, stage):
+    for item in iterable:
+        stage.items += 1
+        yield item
+
+def run(tool, function, *args, profile_path=None, cprofile_path=None, **kwargs):
+    """Call function(*args, **kwargs) with stage timing and/or cProfile enabled as requested.
+
+    The stage report goes to profile_path (a file, or a directory for one file per run) and
+    the cProfile statistics to cprofile_path, in pstats format.
+    """
+    global _active_profiler
+    if not profile_path and not cprofile_path:
+        return function(*args, **kwargs)
+
+    _active_profiler = Profiler(tool) if profile_path else None
+    profiler = cProfile.Profile() if cprofile_path else None
+    try:
+        if profiler:
+            return profiler.runcall(function, *args, **kwargs)
+        return function(*args, **kwargs)
+    finally:
+        if profiler:
+            profiler.dump_stats(cprofile_path)
+            print(f"cProfile statistics written to {cprofile_path}")
+        if _active_profiler:
+            written = _active_profiler.write(profile_path)
+            print(f"Stage profile written to {written}")
+        _active_profiler = None
+
+def add_profile_arguments(parser):
+    parser.add_argument(PROFILE_FLAG, type=str, default=None, metavar="PATH",
+                        help="Write per-stage time, throughput and peak RSS as JSON to PATH (a directory gets one file per run)")
+    parser.add_argument(CPROFILE_FLAG, type=str, default=None, metavar="PATH",
+                        help="Also dump cProfile statistics (pstats format) to PATH")
+
+def pop_profile_args(argv):
+    """Remove --profile/--cprofile PATH from a sys.argv-style list for scripts without argparse.
+
+    Returns (remaining argv, profile path, cprofile path).
+    """
+    remaining = []
+    paths = {PROFILE_FLAG: None, CPROFILE_FLAG: None}
+    arguments = iter(argv)
+    for argument in arguments:
+        flag, _, value = argument.partition('=')
+        if flag in paths:
+            paths[flag] = value or next(arguments, None)
+            if not paths[flag]:
+                print(f"Error: {flag} needs a path.")
+                sys.exit(1)
+        else:
+            remaining.append(argument)
+    return remaining, paths[PROFILE_FLAG], paths[CPROFILE_FLAG]
@@ -0,0 +1,253 @@
+import re
+import random
+import argparse
+
+from CompressedIO import open_text
+
+# Flush generated lines to disk in batches of this many
+WRITE_BATCH_LINES = 10000
+
+# Bumped whenever the same size and seed generate different content, so benchmark inputs
+# and results from another version are not mistaken for comparable ones.
+# 2: memreports include an obj list section
+GENERATOR_VERSION = 2
+
+SIZE_UNITS = {'': 1, 'B': 1, 'KB': 1024, 'MB': 1024 ** 2, 'GB': 1024 ** 3}
+size_regex = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([KMG]?B?)\s*$', re.IGNORECASE)
+
+TEXTURE_FORMATS = ('PF_DXT1', 'PF_DXT5', 'PF_BC5', 'PF_BC7', 'PF_B8G8R8A8', 'PF_G8', 'PF_FloatRGBA')
+TEXTURE_GROUPS = ('World', 'WorldNormalMap', 'Character', 'CharacterNormalMap', 'UI', 'Effects', 'Lightmap', 'Shadowmap')
+TOP_FOLDERS = ('/Game/Characters', '/Game/Environment', '/Game/UI', '/Game/Effects', '/Game/Maps', '/Engine/EngineResources')
+OBJECT_CLASSES = ('Texture2D', 'Material', 'MaterialInstanceConstant', 'StaticMesh', 'SkeletalMesh', 'World', 'Package', 'BP_Pickup_C')
+
+def parse_size(text):
+    """Parse a size such as '10MB', '1.5GB' or '4096' into bytes."""
+    match = size_regex.match(text)
+    if not match:
+        raise ValueError(f"Invalid size: '{text}'")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).upper()])
+
+def format_size(size):
+    for unit in ('GB', 'MB', 'KB'):
+        if size >= SIZE_UNITS[unit] and size % SIZE_UNITS[unit] == 0:
+            return f"{size // SIZE_UNITS[unit]}{unit}"
+    return f"{size}B"
+
+class _LineWriter:
+    """Buffered line writer that tracks how many bytes have been written."""
+
+    def __init__(self, file):
+        self.file = file
+        self.lines = []
+        self.bytes_written = 0
+
+    def write(self, line):
+        self.lines.append(line)
+        self.bytes_written += len(line) + 1
+        if len(self.lines) >= WRITE_BATCH_LINES:
+            self.flush()
+
+    def flush(self):
+        if self.lines:
+            self.file.write('\n'.join(self.lines) + '\n')
+            self.lines = []
+
+def make_directories(count, depth, seed=0):
+    """Return count distinct content directories up to depth levels below the top folders."""
+    rng = random.Random(seed)
+    directories = set()
+    while len(directories) < count:
+        parts = [rng.choice(TOP_FOLDERS)]
+        for level in range(rng.randint(1, depth)):
+            parts.append(f"Folder{level}_{rng.randint(0, max(2, count // depth))}")
+        directories.add('/'.join(parts))
+    return sorted(directories)
+
+OBJ_LIST_SIZE_COLUMNS = ('NumKB', 'MaxKB', 'ResExcKB', 'ResExcDedSysKB', 'ResExcShrSysKB', 'ResExcDedVidKB', 'ResExcShrVidKB', 'ResExcUnkKB')
+
+def _obj_list_sizes(rng, scale):
+    num_kb = rng.uniform(0.1, 4.0) * scale
+    res_kb = rng.uniform(0, 60.0) * scale if rng.random() < 0.4 else 0.0
+    return [num_kb, num_kb * rng.uniform(1.0, 1.5), res_kb, res_kb, 0.0, 0.0, 0.0, 0.0]
+
+def _write_obj_list(writer, command, first_column, rows):
+    # rows yields (name, [count,] sizes); laid out like the engine's 'obj list' output
+    writer.write(f'MemReport: Begin command "{command}"')
+    writer.write('')
+    writer.write(f"Obj List: {command[len('obj list '):]}")
+    writer.write('Objects:')
+    writer.write('')
+    header = f"{first_column:>60}" + (f" {'Count':>8}" if first_column == 'Class' else '')
+    writer.write(header + ''.join(f" {name:>14}" for name in OBJ_LIST_SIZE_COLUMNS))
+    total_objects = 0
+    totals = [0.0] * len(OBJ_LIST_SIZE_COLUMNS)
+    for name, count, sizes in rows:
+        total_objects += count
+        totals = [total + size for total, size in zip(totals, sizes)]
+        count_column = f" {count:>8}" if first_column == 'Class' else ''
+        writer.write(f"{name:>60}{count_column}" + ''.join(f" {size:>14.2f}" for size in sizes))
+    writer.write(f"{total_objects:>8} Objects (Total: {totals[0] / 1024:.3f}M / Max: {totals[1] / 1024:.3f}M / Res: {totals[2] / 1024:.3f}M)")
+    writer.write(f'MemReport: End command "{command}"')
+    writer.write('')
+
+def _write_class_summary(writer, rng, class_count=400):
+    # Output of 'obj list', which the texture and stats parsers have to skip over
+    def rows():
+        for i in range(class_count):
+            count = rng.randint(1, 20000)
+            name = OBJECT_CLASSES[i] if i < len(OBJECT_CLASSES) else f"GeneratedClass{i}"
+            yield name, count, _obj_list_sizes(rng, count)
+    _write_obj_list(writer, 'obj list -alphasort', 'Class', rows())
+
+def _write_object_listing(writer, rng, line_count):
+    # A per-object 'obj list' listing, the bulk of a large report besides the textures
+    def rows():
+        for i in range(line_count):
+            class_name = rng.choice(OBJECT_CLASSES)
+            yield f"{class_name} {rng.choice(TOP_FOLDERS)}/Dir{i % 89}/Obj{i}.Obj{i}", 1, _obj_list_sizes(rng, 1)
+    _write_obj_list(writer, 'obj list -resourcesizesort', 'Object', rows())
+
+def _texture_line(rng, path):
+    size_x = 2 ** rng.randint(3, 12)
+    size_y = size_x if rng.random() < 0.8 else size_x // 2
+    disksize_kb = max(1, size_x * size_y // 1024)
+    streaming = rng.random() < 0.7
+    # Streamed textures are typically resident a few mips below their full size
+    dropped = rng.randint(0, 2) if streaming else 0
+    mem_x, mem_y = max(1, size_x >> dropped), max(1, size_y >> dropped)
+    memsize_kb = max(1, disksize_kb >> (2 * dropped))
+    mips = max(1, size_x.bit_length() - dropped)
+    return (
+        f"{size_x}x{size_y} ({disksize_kb} KB, {rng.choice(('0', '1', '?'))}), {mem_x}x{mem_y} ({memsize_kb} KB), "
+        f"{rng.choice(TEXTURE_FORMATS)}, TEXTUREGROUP_{rng.choice(TEXTURE_GROUPS)}, {path}, "
+        f"{'YES' if streaming else 'NO'}, NO, NO, {rng.randint(0, 12)}, {mips}, {'YES' if rng.random() < 0.1 else 'NO'}"
+    )
+
+def generate_memreport(output_path, target_bytes, seed=0, stat_count=2000, directory_count=500,
+                       directory_depth=4, keep_ratio=0.9, filler_ratio=0.1):
+    """Write a .memreport of roughly target_bytes with a stats block and a NONVT texture listing.
+
+    Texture i lives at the same path for every seed and is kept with probability keep_ratio,
+    so reports generated with different seeds share most of their textures (as consecutive
+    captures of one project do) while their sizes and formats vary.
+    Returns a summary dict with the byte, stat and texture counts.
+    """
+    rng = random.Random(seed)
+    directories = make_directories(directory_count, directory_depth)
+    texture_count = 0
+
+    with open_text(output_path, 'w') as file:
+        writer = _LineWriter(file)
+        writer.write('MemReport: Begin command "stat levels"')
+        _write_class_summary(writer, rng)
+
+        writer.write(f"AssetRegistry memory usage = {rng.uniform(10, 90):.2f}MB")
+        for i in range(stat_count):
+            writer.write(f"  {rng.uniform(-20, 800):.2f} MB - Stat{i} - STATGROUP_Group{i % 37} - STATCAT_Category{i % 11} - Description of stat {i}")
+        writer.write('')
+
+        _write_object_listing(writer, rng, int(target_bytes * filler_ratio) // 190)
+
+        writer.write('Listing NONVT textures.')
+        writer.write('MaxAllowedSize: Width x Height (Size in KB, Authored Bias), Current/InMem: Width x Height (Size in KB), '
+                     'Format, LODGroup, Name, Streaming, UnknownRef, VT, Usage Count, NumMips, Uncompressed')
+        index = 0
+        while writer.bytes_written < target_bytes:
+            index += 1
+            if rng.random() >= keep_ratio:
+                continue
+            directory = directories[(index * 7919) % len(directories)]
+            writer.write(_texture_line(rng, f"{directory}/T_Texture{index}.T_Texture{index}"))
+            texture_count += 1
+        writer.write(f"Total size: InMem= {rng.uniform(100, 2000):.2f} MB  OnDisk= {rng.uniform(100, 4000):.2f} MB  Count={texture_count}")
+        writer.write('MemReport: End command "ListTextures nonvt"')
+        writer.flush()
+
+    return {'bytes': writer.bytes_written, 'stats': stat_count, 'textures': texture_count}
+
+def generate_objrefs_log(output_path, target_bytes, seed=0, depth=8, fanout=4, object_count=100000, shared_prefix=0.0):
+    """Write a UE 'obj refs' log of roughly target_bytes.
+
+    Each root object gets fanout reference chains of up to depth links. Links alternate
+    between '->' arrow lines and 'Owner::Member = Class /Path' property lines, with the
+    occasional AddReferencedObjects() line the parser must skip. Objects are drawn from a
+    pool of object_count paths, so chains share objects. With probability shared_prefix a
+    chain starts by repeating the links of the root's previous chain, as chains through
+    the same owners do in real dumps.
+    Returns a summary dict with the byte, root and line counts.
+    """
+    rng = random.Random(seed)
+    objects = [
+        f"{rng.choice(OBJECT_CLASSES)} {rng.choice(TOP_FOLDERS)}/Dir{i % 97}/Asset{i}.Asset{i}"
+        for i in range(object_count)
+    ]
+    root_count = 0
+    line_count = 0
+    tick = 0
+
+    def timestamp():
+        nonlocal tick
+        tick += 1
+        return f"[2024.05.01-{(tick // 3600000) % 24:02d}.{(tick // 60000) % 60:02d}.{(tick // 1000) % 60:02d}:{tick % 1000:03d}][{tick % 1000:3d}]"
+
+    with open_text(output_path, 'w') as file:
+        writer = _LineWriter(file)
+        while writer.bytes_written < target_bytes:
+            root = rng.choice(objects)
+            root_count += 1
+            writer.write(f"{timestamp()}LogReferenceChain: Shortest path from root to {root}")
+            previous_links = []
+            for _ in range(fanout):
+                writer.write(f"{timestamp()}({rng.choice(('root', 'standalone', 'root, standalone'))}) {root}")
+                links = []
+                if shared_prefix and previous_links and rng.random() < shared_prefix:
+                    links = previous_links[:rng.randint(1, len(previous_links))]
+                    for link in links:
+                        writer.write(timestamp() + link)
+                    line_count += len(links)
+                for level in range(len(links), len(links) + rng.randint(1, depth)):
+                    roll = rng.random()
+                    if roll < 0.45:
+                        link = f"   -> {rng.choice(objects)}"
+                    elif roll < 0.9:
+                        link = f"      UObject* UOwner{level % 13}::Member{level} = {rng.choice(objects)}"
+                    else:
+                        link = "   -> UObject::AddReferencedObjects(FReferenceCollector& Collector)"
+                    writer.write(timestamp() + link)
+                    links.append(link)
+                    line_count += 1
+                previous_links = links
+                line_count += 1
+            writer.write('')
+            line_count += 2
+        writer.flush()
+
+    return {'bytes': writer.bytes_written, 'roots': root_count, 'lines': line_count}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate seeded synthetic memreports and obj refs logs for benchmarking.")
+    subparsers = parser.add_subparsers(dest="kind", required=True)
+
+    memreport_parser = subparsers.add_parser("memreport", help="Stats block and NONVT texture listing")
+    memreport_parser.add_argument("output_file", type=str)
+    memreport_parser.add_argument("--size", type=parse_size, default=parse_size('10MB'), help="Target size, e.g. 10MB or 1GB")
+    memreport_parser.add_argument("--seed", type=int, default=0)
+    memreport_parser.add_argument("--stats", type=int, default=2000, help="Number of stat lines")
+    memreport_parser.add_argument("--directories", type=int, default=500, help="Number of distinct texture directories")
+    memreport_parser.add_argument("--depth", type=int, default=4, help="Maximum directory depth below the top folders")
+
+    objrefs_parser = subparsers.add_parser("objrefs", help="UE obj refs log")
+    objrefs_parser.add_argument("output_file", type=str)
+    objrefs_parser.add_argument("--size", type=parse_size, default=parse_size('10MB'), help="Target size, e.g. 10MB or 1GB")
+    objrefs_parser.add_argument("--seed", type=int, default=0)
+    objrefs_parser.add_argument("--depth", type=int, default=8, help="Maximum links per reference chain")
+    objrefs_parser.add_argument("--fanout", type=int, default=4, help="Reference chains per root object")
+    objrefs_parser.add_argument("--objects", type=int, default=100000, help="Size of the object pool chains draw from")
+    objrefs_parser.add_argument("--shared-prefix", type=float, default=0.0, help="Probability a chain repeats a prefix of its root's previous chain")
+
+    args = parser.parse_args()
+    if args.kind == "memreport":
+        summary = generate_memreport(args.output_file, args.size, args.seed, args.stats, args.directories, args.depth)
+    else:
+        summary = generate_objrefs_log(args.output_file, args.size, args.seed, args.depth, args.fanout, args.objects, args.shared_prefix)
+    print(f"Wrote {args.output_file}: " + ', '.join(f"{value} {key}" for key, value in summary.items()))
@@ -0,0 +1,262 @@
+import csv
+import argparse
+from array import array
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from CompressedIO import open_text
+from Profiling import add_profile_arguments, profile_stage, run
+from TextureTable import TextureTable
+
+# Columns the budget, outlier listing and scenarios need; outlier CSVs need every column
+BUDGET_COLUMNS = ('memsize_kb', 'disksize_kb', 'texformat', 'texgroup', 'path', 'bstreaming', 'num_mips', 'uncompressed')
+DIMENSIONS = ('texgroup', 'texformat')
+
+BUDGET_HEADER = [
+    'dimension', 'name', 'count', 'memsize_kb', 'disksize_kb', 'share_pct',
+    'nonstreaming_count', 'nonstreaming_kb', 'uncompressed_count', 'uncompressed_kb'
+]
+SCENARIO_HEADER = ['scenario', 'texgroup', 'baseline_kb', 'projected_kb', 'delta_kb']
+
+DROP_MIPS = 'drop-mips'
+FORCE_STREAMING = 'force-streaming'
+ALL_GROUPS = '*'
+DEFAULT_MIN_KB = 1024
+
+class BudgetRow(NamedTuple):
+    dimension: str
+    name: str
+    count: int
+    memsize_kb: int
+    disksize_kb: int
+    nonstreaming_count: int
+    nonstreaming_kb: int
+    uncompressed_count: int
+    uncompressed_kb: int
+
+class ScenarioStep(NamedTuple):
+    kind: str
+    group: str
+    mips: int = 0
+
+class Scenario(NamedTuple):
+    """A what-if, e.g. 'drop-mips:UI:1+force-streaming:World'; steps apply left to right."""
+    name: str
+    steps: Tuple[ScenarioStep, ...]
+
+def parse_scenario(text: str) -> Scenario:
+    """Parse 'drop-mips:GROUP:N' and 'force-streaming:GROUP' steps joined by '+'. GROUP may be '*'."""
+    steps = []
+    for part in text.split('+'):
+        fields = part.split(':')
+        if fields[0] == DROP_MIPS and len(fields) == 3 and fields[2].isdigit():
+            steps.append(ScenarioStep(DROP_MIPS, fields[1], int(fields[2])))
+        elif fields[0] == FORCE_STREAMING and len(fields) == 2:
+            steps.append(ScenarioStep(FORCE_STREAMING, fields[1]))
+        else:
+            raise ValueError(f"Bad scenario step '{part}': expected {DROP_MIPS}:GROUP:N or {FORCE_STREAMING}:GROUP")
+    return Scenario(text, tuple(steps))
+
+def budget(table: TextureTable, dimension: str) -> List[BudgetRow]:
+    """Per-value totals of one category column, largest memsize first, in one pass over the columns."""
+    column = table[dimension]
+    size = len(column.categories)
+    count = array('q', bytes(8 * size))
+    memsize = array('q', bytes(8 * size))
+    disksize = array('q', bytes(8 * size))
+    nonstreaming_count = array('q', bytes(8 * size))
+    nonstreaming_kb = array('q', bytes(8 * size))
+    uncompressed_count = array('q', bytes(8 * size))
+    uncompressed_kb = array('q', bytes(8 * size))
+    nonstreaming_code = table['bstreaming'].code('NO')
+    uncompressed_code = table['uncompressed'].code('YES')
+
+    for code, mem_kb, disk_kb, streaming, uncompressed in zip(
+            column.codes, table['memsize_kb'], table['disksize_kb'], table['bstreaming'].codes, table['uncompressed'].codes):
+        count[code] += 1
+        memsize[code] += mem_kb
+        disksize[code] += disk_kb
+        if streaming == nonstreaming_code:
+            nonstreaming_count[code] += 1
+            nonstreaming_kb[code] += mem_kb
+        if uncompressed == uncompressed_code:
+            uncompressed_count[code] += 1
+            uncompressed_kb[code] += mem_kb
+
+    rows = [
+        BudgetRow(dimension, name, count[code], memsize[code], disksize[code], nonstreaming_count[code],
+                  nonstreaming_kb[code], uncompressed_count[code], uncompressed_kb[code])
+        for code, name in enumerate(column.categories)
+    ]
+    rows.sort(key=lambda row: (-row.memsize_kb, row.name))
+    return rows
+
+def find_outliers(table: TextureTable, min_kb=DEFAULT_MIN_KB) -> Tuple[List[int], List[int]]:
+    """Return (non-streaming, uncompressed) row indices of at least min_kb, largest first."""
+    memsize = table['memsize_kb']
+    large = table.where(mem_kb >= min_kb for mem_kb in memsize)
+    nonstreaming = [index for index in large if table['bstreaming'][index] == 'NO']
+    uncompressed = [index for index in large if table['uncompressed'][index] == 'YES']
+    return table.argsort('memsize_kb', nonstreaming, reverse=True), table.argsort('memsize_kb', uncompressed, reverse=True)
+
+class ScenarioModel:
+    """Projects texture memory under what-if scenarios.
+
+    Row indices are bucketed by texgroup once, so a scenario step only touches the rows of
+    the group it names. Each scenario starts from copies of the memsize_kb and num_mips
+    arrays.
+
+    drop-mips removes up to N top mips from each texture, never its last mip, counting the
+    mips earlier steps dropped; each mip dropped divides the texture's memory by four.
+    force-streaming scales the memory of non-streaming textures by the resident/disk ratio
+    streaming textures of the same group achieve in this report, or of all streaming
+    textures when the group has none.
+    """
+
+    def __init__(self, table: TextureTable):
+        self.table = table
+        self.memsize = table['memsize_kb']
+        self.num_mips = table['num_mips']
+        self.texgroup = table['texgroup']
+        self.group_rows = self.texgroup.group_indices()
+        nonstreaming_code = table['bstreaming'].code('NO')
+        self.nonstreaming = bytearray(code == nonstreaming_code for code in table['bstreaming'].codes)
+        self.streaming_ratios = self._streaming_ratios(table['disksize_kb'])
+
+    def _streaming_ratios(self, disksize) -> Dict[Optional[int], float]:
+        resident = {}
+        on_disk = {}
+        for code, flag, mem_kb, disk_kb in zip(self.texgroup.codes, self.nonstreaming, self.memsize, disksize):
+            if not flag:
+                resident[code] = resident.get(code, 0) + mem_kb
+                on_disk[code] = on_disk.get(code, 0) + disk_kb
+        ratios = {code: resident[code] / on_disk[code] for code in resident if on_disk[code]}
+        total_on_disk = sum(on_disk.values())
+        ratios[None] = sum(resident.values()) / total_on_disk if total_on_disk else 1.0
+        return ratios
+
+    def rows(self, group: str) -> Sequence[int]:
+        if group == ALL_GROUPS:
+            return range(len(self.memsize))
+        code = self.texgroup.code(group)
+        return self.group_rows[code] if code is not None else ()
+
+    def project(self, scenario: Scenario) -> array:
+        """Return the projected memsize_kb of every row under scenario."""
+        projected = array('q', self.memsize)
+        nonstreaming = bytearray(self.nonstreaming)
+        # Mips left after the scenario's earlier steps, so chained drops keep the last one
+        remaining = array('i', self.num_mips)
+        for step in scenario.steps:
+            rows = self.rows(step.group)
+            if step.kind == DROP_MIPS:
+                for index in rows:
+                    drop = min(step.mips, remaining[index] - 1)
+                    if drop > 0:
+                        if projected[index]:
+                            projected[index] = max(projected[index] >> (2 * drop), 1)
+                        remaining[index] -= drop
+            else:
+                texgroup_codes = self.texgroup.codes
+                ratios = self.streaming_ratios
+                for index in rows:
+                    if nonstreaming[index]:
+                        ratio = ratios.get(texgroup_codes[index], ratios[None])
+                        projected[index] = round(projected[index] * ratio)
+                        nonstreaming[index] = 0
+        return projected
+
+    def by_group(self, projected: array) -> array:
+        totals = array('q', bytes(8 * len(self.texgroup.categories)))
+        for code, mem_kb in zip(self.texgroup.codes, projected):
+            totals[code] += mem_kb
+        return totals
+
+def _write_budget(output_path, budgets: List[List[BudgetRow]], total_kb):
+    with open_text(output_path, 'w', newline='') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(BUDGET_HEADER)
+        for rows in budgets:
+            for row in rows:
+                share = round(100.0 * row.memsize_kb / total_kb, 2) if total_kb else 0.0
+                writer.writerow([row.dimension, row.name, row.count, row.memsize_kb, row.disksize_kb, share,
+                                 row.nonstreaming_count, row.nonstreaming_kb, row.uncompressed_count, row.uncompressed_kb])
+
+def _print_outliers(table, title, indices, top):
+    print(f"{title}: {len(indices)} textures, {table.sum('memsize_kb', indices)} KB")
+    for index in indices[:top]:
+        print(f"{table['memsize_kb'][index]:>10} KB  {table['texformat'][index]:<16} {table['texgroup'][index]:<20} {table['path'][index]}")
+
+def main(textures_csv, output_file, outliers_file=None, min_kb=DEFAULT_MIN_KB, scenarios=(), scenario_output=None, top=10):
+    with profile_stage('read_csv') as stage:
+        usecols = None if outliers_file else BUDGET_COLUMNS
+        table = TextureTable.read_csv(textures_csv, usecols)
+        stage.items += len(table)
+
+    total_kb = table.sum('memsize_kb')
+    with profile_stage('budget') as stage:
+        budgets = [budget(table, dimension) for dimension in DIMENSIONS]
+        stage.items += len(table) * len(DIMENSIONS)
+    _write_budget(output_file, budgets, total_kb)
+    print(f"Texture budget for {len(table)} textures ({total_kb} KB) written to {output_file}")
+    for row in budgets[0][:top]:
+        print(f"{row.memsize_kb:>12} KB {row.count:>8}  {row.name}")
+
+    with profile_stage('outliers') as stage:
+        nonstreaming, uncompressed = find_outliers(table, min_kb)
+        stage.items += len(table)
+    if top:
+        _print_outliers(table, f"Non-streaming textures of {min_kb} KB or more", nonstreaming, top)
+        _print_outliers(table, f"Uncompressed textures of {min_kb} KB or more", uncompressed, top)
+    if outliers_file:
+        outliers = table.argsort('memsize_kb', set(nonstreaming).union(uncompressed), reverse=True)
+        table.write_csv(outliers_file, outliers)
+        print(f"{len(outliers)} outliers written to {outliers_file}")
+
+    if not scenarios:
+        return
+    with profile_stage('scenarios', unit='scenarios') as stage:
+        model = ScenarioModel(table)
+        baseline = model.by_group(model.memsize)
+        results = []
+        for scenario in scenarios:
+            for step in scenario.steps:
+                if step.group != ALL_GROUPS and model.texgroup.code(step.group) is None:
+                    print(f"Warning: no textures in group '{step.group}' ({scenario.name})")
+            results.append((scenario, model.by_group(model.project(scenario))))
+            stage.items += 1
+
+    print(f"{'Scenario':<48} {'Projected KB':>14} {'Saved KB':>12} {'Saved':>8}")
+    for scenario, projected in results:
+        projected_kb = sum(projected)
+        saved = total_kb - projected_kb
+        print(f"{scenario.name:<48} {projected_kb:>14} {saved:>12} {100.0 * saved / total_kb if total_kb else 0.0:>7.2f}%")
+    if scenario_output:
+        with open_text(scenario_output, 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(SCENARIO_HEADER)
+            for scenario, projected in results:
+                for code, group in enumerate(model.texgroup.categories):
+                    writer.writerow([scenario.name, group, baseline[code], projected[code], projected[code] - baseline[code]])
+        print(f"Scenario projections written to {scenario_output}")
+
+def _scenario_argument(text):
+    try:
+        return parse_scenario(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Texture memory budget per group and format, outliers, and what-if scenarios.")
+    parser.add_argument("textures_csv", type=str, help="Texture CSV written by MemReportToTextures")
+    parser.add_argument("output_file", type=str, help="Budget CSV, one row per texgroup and texformat")
+    parser.add_argument("--outliers", type=str, default=None, help="Also write large non-streaming and uncompressed textures to this texture CSV")
+    parser.add_argument("--min-kb", type=int, default=DEFAULT_MIN_KB, help=f"Smallest memsize counted as an outlier (default: {DEFAULT_MIN_KB})")
+    parser.add_argument("--scenario", type=_scenario_argument, action="append", default=[],
+                        help=f"What-if to project, e.g. {DROP_MIPS}:World:1 or {FORCE_STREAMING}:UI+{DROP_MIPS}:*:1; join steps with '+'; GROUP may be '*'. Repeatable")
+    parser.add_argument("--scenario-output", type=str, default=None, help="Per-texgroup projections of every scenario as CSV")
+    parser.add_argument("--top", type=int, default=10, help="Rows to print per listing (default: 10)")
+    add_profile_arguments(parser)
+
+    args = parser.parse_args()
+    run('TextureBudget', main, args.textures_csv, args.output_file, args.outliers, args.min_kb, args.scenario,
+        args.scenario_output, args.top, profile_path=args.profile, cprofile_path=args.cprofile)
@@ -0,0 +1,161 @@
+import csv
+from array import array
+from itertools import compress
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from CompressedIO import open_text
+from MemReportParser import TextureRow
+
+# Columns of the texture CSV written by MemReportToTextures, by storage type
+INT_COLUMNS = ('disksize_x', 'disksize_y', 'disksize_kb', 'memsize_x', 'memsize_y', 'memsize_kb', 'usagecount', 'num_mips')
+CATEGORY_COLUMNS = ('bias', 'texformat', 'texgroup', 'bstreaming', 'unknown_ref', 'vt', 'uncompressed')
+
+class CategoryColumn:
+    """A string column stored as small integer codes into a list of distinct values."""
+
+    def __init__(self, values: Iterable[str] = ()):
+        self.categories: List[str] = []
+        self._codes_by_value: Dict[str, int] = {}
+        self.codes = array('I')
+        for value in values:
+            self.append(value)
+
+    def code(self, value: str) -> Optional[int]:
+        return self._codes_by_value.get(value)
+
+    def append(self, value: str):
+        code = self._codes_by_value.get(value)
+        if code is None:
+            code = self._codes_by_value[value] = len(self.categories)
+            self.categories.append(value)
+        self.codes.append(code)
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index: int) -> str:
+        return self.categories[self.codes[index]]
+
+    def __iter__(self):
+        categories = self.categories
+        return (categories[code] for code in self.codes)
+
+    def take(self, indices: Iterable[int]) -> 'CategoryColumn':
+        # Keeps the category list so codes stay comparable between a table and its subsets
+        column = CategoryColumn()
+        column.categories = self.categories
+        column._codes_by_value = self._codes_by_value
+        codes = self.codes
+        column.codes = array('I', (codes[i] for i in indices))
+        return column
+
+    def group_indices(self) -> List[List[int]]:
+        """Return, for each category code, the indices of the rows holding that value."""
+        groups = [[] for _ in self.categories]
+        appenders = [group.append for group in groups]
+        for index, code in enumerate(self.codes):
+            appenders[code](index)
+        return groups
+
+    def mask(self, values: Iterable[str]) -> List[bool]:
+        """Return a per-row mask of the rows whose value is one of values."""
+        wanted = {self._codes_by_value[value] for value in values if value in self._codes_by_value}
+        return [code in wanted for code in self.codes]
+
+def _new_column(name: str):
+    if name in INT_COLUMNS:
+        return array('q')
+    if name in CATEGORY_COLUMNS:
+        return CategoryColumn()
+    return []
+
+class TextureTable:
+    """Texture rows stored column by column.
+
+    Size, dimension, usage and mip columns are int arrays. Low-cardinality string columns
+    such as texformat and texgroup are category-coded, and path (plus any unknown column)
+    is a plain list of strings. Rows are addressed by index; filters produce index lists
+    that can be fed back to take(), rows() or write_csv().
+    """
+
+    def __init__(self, fieldnames: Sequence[str] = TextureRow._fields):
+        self.fieldnames = list(fieldnames)
+        self.columns = {name: _new_column(name) for name in self.fieldnames}
+
+    @classmethod
+    def read_csv(cls, file_path, usecols: Optional[Sequence[str]] = None) -> 'TextureTable':
+        """Load a texture CSV, optionally keeping only the columns in usecols."""
+        with open_text(file_path, newline='') as csvfile:
+            reader = csv.reader(csvfile, delimiter=',')
+            header = next(reader, [])
+            keep = [i for i, name in enumerate(header) if usecols is None or name in usecols]
+            table = cls([header[i] for i in keep])
+            appenders = [table.columns[header[i]].append for i in keep]
+            converters = [int if header[i] in INT_COLUMNS else str for i in keep]
+            for line_number, row in enumerate(reader, start=2):
+                try:
+                    for i, append, convert in zip(keep, appenders, converters):
+                        append(convert(row[i]))
+                except (ValueError, IndexError) as e:
+                    raise ValueError(f"{file_path}:{line_number}: malformed texture row ({e})")
+        return table
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[TextureRow]) -> 'TextureTable':
+        table = cls(TextureRow._fields)
+        appenders = [table.columns[name].append for name in TextureRow._fields]
+        for row in rows:
+            for append, value in zip(appenders, row):
+                append(value)
+        return table
+
+    def __len__(self):
+        return len(self.columns[self.fieldnames[0]]) if self.fieldnames else 0
+
+    def __getitem__(self, name: str):
+        return self.columns[name]
+
+    def take(self, indices: Iterable[int]) -> 'TextureTable':
+        indices = list(indices)
+        table = TextureTable(self.fieldnames)
+        for name, column in self.columns.items():
+            if isinstance(column, CategoryColumn):
+                table.columns[name] = column.take(indices)
+            elif isinstance(column, array):
+                table.columns[name] = array(column.typecode, (column[i] for i in indices))
+            else:
+                table.columns[name] = [column[i] for i in indices]
+        return table
+
+    def where(self, mask: Iterable[bool]) -> List[int]:
+        """Return the indices of the rows selected by a per-row boolean mask."""
+        return list(compress(range(len(self)), mask))
+
+    def argsort(self, name: str, indices: Optional[Iterable[int]] = None, reverse: bool = False) -> List[int]:
+        """Return row indices (all rows, or the given ones) stably sorted by a column."""
+        column = self.columns[name]
+        indices = range(len(self)) if indices is None else indices
+        return sorted(indices, key=column.__getitem__, reverse=reverse)
+
+    def sum(self, name: str, indices: Optional[Iterable[int]] = None) -> int:
+        column = self.columns[name]
+        if indices is None:
+            return sum(column)
+        return sum(column[i] for i in indices)
+
+    def row_dict(self, index: int) -> Dict[str, str]:
+        """Return a row as the string dict csv.DictReader would have produced."""
+        return {name: str(self.columns[name][index]) for name in self.fieldnames}
+
+    def rows(self, indices: Optional[Iterable[int]] = None):
+        indices = range(len(self)) if indices is None else indices
+        for index in indices:
+            yield self.row_dict(index)
+
+    def write_csv(self, file_path, indices: Optional[Iterable[int]] = None):
+        indices = range(len(self)) if indices is None else indices
+        columns = [self.columns[name] for name in self.fieldnames]
+        with open_text(file_path, mode='w', newline='') as csvfile:
+            writer = csv.writer(csvfile, delimiter=',')
+            writer.writerow(self.fieldnames)
+            writer.writerows([column[index] for column in columns] for index in indices)
@@ -0,0 +1,185 @@
+import os
+import sys
+import time
+import signal
+import argparse
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from AllMemReportsToCSVs import DEFAULT_MANIFEST_NAME, TOOL_VERSION, _convert_task, output_paths
+from CompressedIO import COMPRESSIONS, split_compression
+from MemReportManifest import MemReportManifest
+
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_SETTLE_SECONDS = 2.0
+
+def scan_memreports(input_directory):
+    """Yield (path, size, mtime_ns) for every (possibly compressed) .memreport under input_directory."""
+    directories = [input_directory]
+    while directories:
+        directory = directories.pop()
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue  # Removed or unreadable since it was listed
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(entry.path)
+                elif split_compression(entry.name)[0].lower().endswith('.memreport') and entry.is_file():
+                    st = entry.stat()
+                    yield entry.path, st.st_size, st.st_mtime_ns
+            except OSError:
+                continue
+
+def _init_worker():
+    # Workers finish their current report; only the watcher decides when to stop
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+class MemReportWatcher:
+    """Polls a folder and converts each new or changed .memreport once it has stopped growing.
+
+    A report is ready when its size and mtime are unchanged across polls spanning at least
+    settle_seconds. Ready reports are converted on at most `workers` processes. Results are
+    recorded in the same manifest AllMemReportsToCSVs.py --incremental uses, saved after
+    every conversion, so a restarted watcher (or a batch run) skips everything already done.
+    A report that fails is not retried until it changes.
+    """
+
+    def __init__(self, input_directory, workers=2, poll_interval=DEFAULT_POLL_INTERVAL,
+                 settle_seconds=DEFAULT_SETTLE_SECONDS, manifest_path=None, compression=None):
+        self.input_directory = input_directory
+        self.compression = compression
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self.manifest = MemReportManifest(manifest_path or os.path.join(input_directory, DEFAULT_MANIFEST_NAME), TOOL_VERSION)
+        self.observed = {}   # path -> (size, mtime_ns, monotonic time first seen in that state)
+        self.settled = {}    # path -> (size, mtime_ns) it was converted (or failed) at
+        self.ready = deque()
+        self.queued = set()
+        self.in_flight = {}  # future -> (path, (size, mtime_ns))
+        self.converted = 0
+        self.failed = 0
+        self.stopping = False
+
+    def poll(self):
+        """Scan once, moving reports that have settled onto the ready queue."""
+        now = time.monotonic()
+        busy = self.queued.union(path for path, _ in self.in_flight.values())
+        seen = set()
+        for path, size, mtime_ns in scan_memreports(self.input_directory):
+            seen.add(path)
+            state = (size, mtime_ns)
+            if path in busy or self.settled.get(path) == state:
+                continue
+            previous = self.observed.get(path)
+            if previous is None or previous[:2] != state:
+                # New, or still being written
+                self.observed[path] = (size, mtime_ns, now)
+                continue
+            if now - previous[2] < self.settle_seconds:
+                continue
+            del self.observed[path]
+            # A report that cannot be checked is skipped until it changes, like a failed conversion
+            try:
+                up_to_date = self.manifest.is_up_to_date(path, output_paths(path, self.compression))
+            except Exception as e:
+                print(f"Failed '{path}': {type(e).__name__}: {e}")
+                self.manifest.forget(path)
+                self.settled[path] = state
+                self.failed += 1
+                continue
+            if up_to_date:
+                self.settled[path] = state
+                continue
+            self.ready.append((path, state))
+            self.queued.add(path)
+
+        # Forget reports that disappeared before settling
+        for path in [path for path in self.observed if path not in seen]:
+            del self.observed[path]
+
+    def submit_ready(self, executor):
+        while self.ready and len(self.in_flight) < self.workers:
+            path, state = self.ready.popleft()
+            self.queued.discard(path)
+            print(f"Processing '{path}'...")
+            self.in_flight[executor.submit(_convert_task, path, True, self.compression)] = (path, state)
+
+    def collect(self, futures):
+        for future in futures:
+            path, state = self.in_flight.pop(future)
+            _, error, signature = future.result()
+            self.settled[path] = state
+            if error:
+                print(f"Failed '{path}': {error}")
+                self.manifest.forget(path)
+                self.failed += 1
+            else:
+                try:
+                    self.manifest.record(path, output_paths(path, self.compression), signature)
+                except Exception as e:
+                    print(f"Converted '{path}' but could not record it: {type(e).__name__}: {e}")
+                    self.manifest.forget(path)
+                else:
+                    print(f"Converted '{path}'")
+                self.converted += 1
+        if futures:
+            self.manifest.save()
+
+    def is_idle(self):
+        return not (self.observed or self.ready or self.in_flight)
+
+    def run(self, once=False):
+        """Watch until stopped (SIGTERM/Ctrl-C), or with once=True until every report present is handled."""
+        if not os.path.isdir(self.input_directory):
+            print(f"Error: The directory '{self.input_directory}' does not exist.")
+            sys.exit(1)
+
+        def request_stop(signum, frame):
+            self.stopping = True
+        previous_handler = signal.signal(signal.SIGTERM, request_stop)
+
+        print(f"Watching '{self.input_directory}' with {self.workers} worker(s)...")
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as executor:
+                try:
+                    while not self.stopping:
+                        self.poll()
+                        self.submit_ready(executor)
+                        if once and self.is_idle():
+                            break
+                        if self.in_flight:
+                            # Wake up as soon as a conversion finishes, or at the next poll
+                            done, _ = wait(self.in_flight, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                            self.collect(done)
+                        else:
+                            time.sleep(self.poll_interval)
+                except KeyboardInterrupt:
+                    self.stopping = True
+                if self.in_flight:
+                    print("Stopping: waiting for conversions in progress...")
+                    self.collect(wait(self.in_flight).done)
+        finally:
+            signal.signal(signal.SIGTERM, previous_handler)
+            self.manifest.save()
+        print(f"Converted {self.converted} memreport(s), {self.failed} failed.")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Watch a folder and convert each new .memreport once it has finished uploading.")
+    parser.add_argument("input_directory", type=str, help="Folder (searched recursively) that memreports are uploaded to")
+    parser.add_argument("-j", "--workers", type=int, default=2, help="Maximum reports converted at once (default: 2)")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL, help="Seconds between folder scans")
+    parser.add_argument("--settle-seconds", type=float, default=DEFAULT_SETTLE_SECONDS,
+                        help="How long a report's size and mtime must stay unchanged before it is converted")
+    parser.add_argument("--manifest", type=str, default=None, help=f"State file (default: <input_directory>/{DEFAULT_MANIFEST_NAME}, shared with --incremental batches)")
+    parser.add_argument("--once", action="store_true", help="Convert what is already there, then exit")
+    parser.add_argument("--compress", choices=COMPRESSIONS, default=None, help="Write every output compressed with this format")
+
+    args = parser.parse_args()
+    watcher = MemReportWatcher(args.input_directory, args.workers, args.poll_interval, args.settle_seconds, args.manifest, args.compress)
+    watcher.run(once=args.once)
+    if args.once and watcher.failed:
+        sys.exit(1)
@@ -0,0 +1,41 @@
+import csv
+import os
+import tempfile
+import unittest
+
+from DeltaMemStats import build_timeline, write_timeline
+
+HEADER = ['Memory Usage (MB)', 'Stat Name', 'STAT Group', 'STAT Category', 'Description']
+
+class WriteTimelineTest(unittest.TestCase):
+    def timeline_rows(self, *snapshots):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for number, stats in enumerate(snapshots):
+                path = os.path.join(directory, f'snapshot{number}.stats.csv')
+                with open(path, 'w', newline='', encoding='utf-8') as file:
+                    csvwriter = csv.writer(file)
+                    csvwriter.writerow(HEADER)
+                    for stat_name, memory_usage in stats.items():
+                        csvwriter.writerow([memory_usage, stat_name, 'STATGROUP_Memory', 'STATCAT_Advanced', ''])
+                paths.append(path)
+            output_path = os.path.join(directory, 'timeline.csv')
+            write_timeline(build_timeline(paths), output_path)
+            with open(output_path, newline='', encoding='utf-8') as file:
+                return list(csv.reader(file))
+
+    def test_spike_that_returns_ranks_as_a_mover(self):
+        rows = self.timeline_rows(
+            {'Spike': 10.0, 'Drift': 10.0, 'Flat': 5.0},
+            {'Spike': 100.0, 'Drift': 12.0, 'Flat': 5.0},
+            {'Spike': 10.0, 'Drift': 14.0, 'Flat': 5.0},
+        )
+        header, body = rows[0], rows[1:]
+        self.assertIn('Range (MB, sort order)', header)
+        self.assertEqual([row[0] for row in body], ['Spike', 'Drift', 'Flat'])
+        spike = dict(zip(header, body[0]))
+        self.assertEqual(float(spike['Total Delta (MB)']), 0.0)
+        self.assertEqual(float(spike['Range (MB, sort order)']), 90.0)
+
+if __name__ == '__main__':
+    unittest.main()
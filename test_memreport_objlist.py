@@ -0,0 +1,66 @@
+import os
+import tempfile
+import unittest
+
+from MemReportObjList import class_summaries, read_obj_lists
+
+CLASS_BLOCK = """MemReport: Begin command "obj list {args}"
+
+Obj List: {args}
+Objects:
+
+                                                       Class    Count          NumKB          MaxKB       ResExcKB
+                                                   Texture2D       10         100.00         150.00         500.00
+                                                    Material        4          20.00          30.00           0.00
+      14 Objects (Total: 0.117M / Max: 0.176M / Res: 0.488M)
+MemReport: End command "obj list {args}"
+
+"""
+
+OBJECT_BLOCK = """MemReport: Begin command "obj list {args}"
+
+Obj List: {args}
+Objects:
+
+                                                      Object          NumKB          MaxKB       ResExcKB
+                        Texture2D /Game/UI/T_Icon.T_Icon          10.00          15.00         300.00
+                        Texture2D /Game/UI/T_Logo.T_Logo          10.00          12.00         200.00
+       2 Objects (Total: 0.020M / Max: 0.026M / Res: 0.488M)
+MemReport: End command "obj list {args}"
+
+"""
+
+class ClassSummariesTest(unittest.TestCase):
+    def summaries(self, *blocks):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'report.memreport')
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(''.join(blocks))
+            return {summary.class_name: summary for summary in class_summaries(*read_obj_lists(path))}
+
+    def test_class_summary_blocks_are_not_summed(self):
+        summaries = self.summaries(CLASS_BLOCK.format(args='-alphasort'), CLASS_BLOCK.format(args='-resourcesizesort'))
+        texture = summaries['Texture2D']
+        self.assertEqual(texture.count, 10)
+        self.assertEqual(texture.num_kb, 100.0)
+        self.assertEqual(texture.max_kb, 150.0)
+        self.assertEqual(texture.res_kb, 500.0)
+        self.assertEqual(summaries['Material'].count, 4)
+
+    def test_objects_listed_twice_are_counted_once(self):
+        summaries = self.summaries(OBJECT_BLOCK.format(args='-alphasort'), OBJECT_BLOCK.format(args='-resourcesizesort'))
+        texture = summaries['Texture2D']
+        self.assertEqual(texture.count, 2)
+        self.assertEqual(texture.num_kb, 20.0)
+        self.assertEqual(texture.max_kb, 15.0)
+        self.assertEqual(texture.res_kb, 500.0)
+        self.assertEqual(texture.max_res_kb, 300.0)
+
+    def test_largest_object_comes_from_any_per_object_block(self):
+        summaries = self.summaries(CLASS_BLOCK.format(args=''), OBJECT_BLOCK.format(args='class=Texture2D'))
+        texture = summaries['Texture2D']
+        self.assertEqual(texture.count, 10)
+        self.assertEqual(texture.max_res_kb, 300.0)
+
+if __name__ == '__main__':
+    unittest.main()